@@ -0,0 +1,256 @@
+"""Нагрузочные тесты страниц posts.
+
+Запуск из корня репозитория:
+
+    pytest benchmarks --bench-posts=5000 --bench-output=bench.json \
+        --bench-compare=previous.json
+
+С --bench-parallel=index,post те же страницы отдают варианты
+представлений с параллельными запросами (PARALLEL_VIEWS).
+
+Данные создаются один раз на сессию фикстурами mixer, каждый тест
+гоняет одну страницу через тестовый клиент и копит время ответа и
+число SQL-запросов. В конце сессии отчёт пишется в JSON, а с
+--bench-compare печатается изменение p95 относительно прошлого прогона.
+"""
+import io
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.test.utils import setup_databases, teardown_databases
+from mixer.backend.django import mixer
+from PIL import Image
+
+from posts.models import Comment, Follow, Group, Post, User
+
+VOLUMES = {
+    "users": 50,
+    "groups": 5,
+    "posts": 1000,
+    "follows": 200,
+    "comments": 2000,
+    "images": 50,
+}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("bench", "нагрузочные тесты")
+    for name, default in VOLUMES.items():
+        group.addoption(
+            f"--bench-{name}", type=int, default=default,
+            help=f"Сколько создать: {name} (по умолчанию {default}).",
+        )
+    group.addoption(
+        "--bench-requests", type=int, default=50,
+        help="Запросов к каждой странице.",
+    )
+    group.addoption(
+        "--bench-parallel", default="",
+        help="Имена URL через запятую для PARALLEL_VIEWS.",
+    )
+    group.addoption(
+        "--bench-output", default="bench-results.json",
+        help="Куда записать отчёт в JSON.",
+    )
+    group.addoption(
+        "--bench-compare", default=None,
+        help="Отчёт прошлого прогона для сравнения.",
+    )
+
+
+def percentile(values, share):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, round(share * len(ordered) + 0.5))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, name, seconds, queries):
+        self.samples.setdefault(name, []).append((seconds, queries))
+
+    def summary(self):
+        report = {}
+        for name, samples in self.samples.items():
+            latencies = [seconds * 1000 for seconds, _ in samples]
+            queries = [count for _, count in samples]
+            report[name] = {
+                "requests": len(samples),
+                "p50_ms": round(percentile(latencies, 0.50), 3),
+                "p95_ms": round(percentile(latencies, 0.95), 3),
+                "p99_ms": round(percentile(latencies, 0.99), 3),
+                "mean_ms": round(sum(latencies) / len(latencies), 3),
+                "queries_per_request": round(sum(queries) / len(queries), 2),
+                "max_queries": max(queries),
+                "throughput_rps": round(len(latencies) * 1000
+                                        / sum(latencies), 1),
+            }
+        return report
+
+
+def pytest_configure(config):
+    config.bench_recorder = Recorder()
+
+
+@pytest.fixture(scope="session")
+def recorder(request):
+    return request.config.bench_recorder
+
+
+@pytest.fixture(scope="session")
+def volumes(request):
+    return {
+        name: request.config.getoption(f"--bench-{name}")
+        for name in VOLUMES
+    }
+
+
+def make_image(path):
+    buffer = io.BytesIO()
+    Image.new("RGB", (1600, 1200), (90, 140, 200)).save(buffer, "JPEG")
+    with open(path, "wb") as image:
+        image.write(buffer.getvalue())
+
+
+def seed(volumes):
+    users = mixer.cycle(volumes["users"]).blend(
+        User, username=mixer.sequence("bench_{0}")
+    )
+    mixer.cycle(volumes["groups"]).blend(
+        Group, slug=mixer.sequence("bench-{0}")
+    )
+    mixer.cycle(volumes["posts"]).blend(
+        Post, author=mixer.SELECT, group=mixer.SELECT, image=None
+    )
+    rng = random.Random(0)
+    pairs = rng.sample(
+        [(user, author) for user, author in itertools.permutations(users, 2)],
+        min(volumes["follows"], len(users) * (len(users) - 1)),
+    )
+    if pairs:
+        mixer.cycle(len(pairs)).blend(
+            Follow,
+            user=(user for user, _ in pairs),
+            author=(author for _, author in pairs),
+        )
+    mixer.cycle(volumes["comments"]).blend(
+        Comment, post=mixer.SELECT, author=mixer.SELECT
+    )
+    directory = f"{settings.MEDIA_ROOT}/posts"
+    os.makedirs(directory, exist_ok=True)
+    posts = Post.objects.order_by("?")[:volumes["images"]]
+    for number, post in enumerate(posts):
+        make_image(f"{directory}/bench_{number}.jpg")
+        post.image = f"posts/bench_{number}.jpg"
+        post.save()
+
+
+def parallel_views(config):
+    return sorted(
+        name for name in config.getoption("--bench-parallel").split(",")
+        if name
+    )
+
+
+@pytest.fixture(scope="session")
+def django_db_setup(django_test_environment, django_db_blocker, volumes,
+                    request):
+    """Тестовая база с данными на всю сессию.
+
+    Тесты обращаются к ней вне транзакций (см. bench_client), поэтому
+    база создаётся здесь, а не фикстурой pytest-django, которая готовит
+    только базы, нужные тестам с маркером django_db.
+    """
+    media_root = settings.MEDIA_ROOT
+    settings.MEDIA_ROOT = tempfile.mkdtemp()
+    settings.PARALLEL_VIEWS = frozenset(parallel_views(request.config))
+    with django_db_blocker.unblock():
+        databases = setup_databases(verbosity=0, interactive=False)
+        seed(volumes)
+    yield
+    with django_db_blocker.unblock():
+        teardown_databases(databases, verbosity=0)
+    shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+    settings.MEDIA_ROOT = media_root
+
+
+@pytest.fixture
+def bench_client(client, django_db_setup, django_db_blocker):
+    """Клиент без транзакции теста, как в работающем сайте.
+
+    Иначе не выполняются хуки on_commit, а потоки posts.parallel не
+    видят данных и варианты из PARALLEL_VIEWS работают последовательно.
+    Записи из нагрузочных тестов остаются в базе до конца сессии.
+    """
+    cache.clear()
+    with django_db_blocker.unblock():
+        yield client
+
+
+@pytest.fixture
+def login(bench_client):
+    """Входит под пользователем, у которого больше всего подписок."""
+    user = User.objects.order_by("-stats__following_count").first()
+    bench_client.force_login(user)
+    return user
+
+
+@pytest.fixture
+def bench_requests(request):
+    return request.config.getoption("--bench-requests")
+
+
+def pytest_sessionfinish(session):
+    recorder = getattr(session.config, "bench_recorder", None)
+    if recorder is None or not recorder.samples:
+        return
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "volumes": {
+            name: session.config.getoption(f"--bench-{name}")
+            for name in VOLUMES
+        },
+        "parallel_views": parallel_views(session.config),
+        "results": recorder.summary(),
+    }
+    with open(session.config.getoption("--bench-output"), "w") as output:
+        json.dump(report, output, ensure_ascii=False, indent=2)
+    session.config.bench_report = report
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    report = getattr(config, "bench_report", None)
+    if report is None:
+        return
+    previous = {}
+    if config.getoption("--bench-compare"):
+        with open(config.getoption("--bench-compare")) as baseline:
+            previous = json.load(baseline)["results"]
+    write = terminalreporter.write_line
+    write("")
+    write(
+        f"{'url':14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'queries':>10}{'rps':>10}{'p95 Δ':>10}"
+    )
+    for name, row in report["results"].items():
+        delta = ""
+        if name in previous and previous[name]["p95_ms"]:
+            change = row["p95_ms"] / previous[name]["p95_ms"] - 1
+            delta = f"{change:+.0%}"
+        write(
+            f"{name:14}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+            f"{row['p99_ms']:>10.1f}{row['queries_per_request']:>10.1f}"
+            f"{row['throughput_rps']:>10.1f}{delta:>10}"
+        )
+    write(f"Отчёт: {config.getoption('--bench-output')}")
@@ -0,0 +1,85 @@
+import random
+import time
+
+from django.db import connection
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+
+class QueryCounter:
+    """Считает SQL-запросы, в том числе из потоков posts.parallel."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run(recorder, name, client, requests, make_request):
+    """Выполняет запросы к странице и записывает время и число SQL."""
+    rng = random.Random(name)
+    for _ in range(requests):
+        method, url, data = make_request(rng)
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            elapsed = time.perf_counter() - started
+        assert response.status_code in (200, 302), url
+        recorder.add(name, elapsed, queries.count)
+
+
+def pages(count, per_page=10):
+    return max(1, (count + per_page - 1) // per_page)
+
+
+def test_index(bench_client, recorder, bench_requests):
+    last = pages(Post.objects.count())
+    run(recorder, "index", bench_client, bench_requests, lambda rng: (
+        "get", reverse("index"), {"page": rng.randint(1, last)}
+    ))
+
+
+def test_group_posts(bench_client, recorder, bench_requests):
+    slugs = list(Group.objects.values_list("slug", flat=True))
+    run(recorder, "group_posts", bench_client, bench_requests, lambda rng: (
+        "get", reverse("group", args=[rng.choice(slugs)]), {}
+    ))
+
+
+def test_profile(bench_client, recorder, bench_requests):
+    usernames = list(User.objects.values_list("username", flat=True))
+    run(recorder, "profile", bench_client, bench_requests, lambda rng: (
+        "get", reverse("profile", args=[rng.choice(usernames)]), {}
+    ))
+
+
+def test_post_view(bench_client, recorder, bench_requests):
+    posts = list(Post.objects.values_list("author__username", "pk"))
+    run(recorder, "post_view", bench_client, bench_requests, lambda rng: (
+        "get", reverse("post", args=rng.choice(posts)), {}
+    ))
+
+
+def test_follow_index(bench_client, login, recorder, bench_requests):
+    run(recorder, "follow_index", bench_client, bench_requests, lambda rng: (
+        "get", reverse("follow_index"), {"page": rng.randint(1, 3)}
+    ))
+
+
+def test_add_comment(bench_client, login, recorder, bench_requests):
+    posts = list(Post.objects.values_list("author__username", "pk"))
+    run(recorder, "add_comment", bench_client, bench_requests, lambda rng: (
+        "post",
+        reverse("add_comment", args=rng.choice(posts)),
+        {"text": "Нагрузочный комментарий"},
+    ))
+
+
+def test_new_post(bench_client, login, recorder, bench_requests):
+    run(recorder, "new_post", bench_client, bench_requests, lambda rng: (
+        "post", reverse("post_new"), {"text": "Нагрузочный пост"}
+    ))
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Group, Post, Follow, Comment
+from .models import Group, Post, Follow, Comment, Task
 
 empty_value_display_constant = "-пусто-"
 
@@ -32,3 +32,10 @@ class GroupAdmin(admin.ModelAdmin):
     list_display = ("post", "author", "text", "created")
     search_fields = ("text",)
     empty_value_display = empty_value_display_constant
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("pk", "name", "args", "status", "attempts", "run_after")
+    list_filter = ("status", "name")
+    empty_value_display = empty_value_display_constant
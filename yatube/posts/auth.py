@@ -0,0 +1,94 @@
+"""Пользователь запроса без запросов к базе.
+
+Сессии лежат в кэше (SESSION_ENGINE cached_db), а
+CachedAuthenticationMiddleware держит в памяти процесса поля недавно
+заходивших пользователей. Ключ записи — id пользователя, бэкенд и хэш
+авторизации из сессии и версия «user:<id>» из posts.caching. Сигнал
+user_saved меняет версию при каждом сохранении пользователя, в том
+числе при смене пароля, поэтому старая запись перестаёт находиться во
+всех процессах сразу. Дальше django.contrib.auth проверяет хэш сессии
+по новому паролю и завершает чужие сессии, как обычно. Выход из
+аккаунта удаляет сессию, и по её cookie пользователь больше не найдётся.
+Удаление пользователя тоже меняет версию. Изменения в обход сигналов
+(queryset.update(is_active=False)) подхватываются, когда запись
+устаревает: она живёт не дольше AUTH_USER_CACHE_TIMEOUT секунд.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.db import router
+from django.utils.functional import SimpleLazyObject
+
+from . import caching
+
+_lock = threading.Lock()
+_users = OrderedDict()
+
+
+def _remember(key, user):
+    fields = user._meta.concrete_fields
+    values = tuple(getattr(user, field.attname) for field in fields)
+    expires = time.monotonic() + settings.AUTH_USER_CACHE_TIMEOUT
+    with _lock:
+        _users[key] = (expires, values)
+        _users.move_to_end(key)
+        while len(_users) > settings.AUTH_USER_CACHE_SIZE:
+            _users.popitem(last=False)
+
+
+def _recall(key):
+    with _lock:
+        expires, values = _users.get(key, (0, None))
+        if expires < time.monotonic():
+            _users.pop(key, None)
+            return None
+        _users.move_to_end(key)
+    # Каждому запросу свой объект: представления могут его менять.
+    User = auth.get_user_model()
+    return User.from_db(
+        router.db_for_read(User),
+        [field.attname for field in User._meta.concrete_fields],
+        values,
+    )
+
+
+def clear():
+    with _lock:
+        _users.clear()
+
+
+def get_user(request):
+    session = request.session
+    try:
+        user_id = str(session[auth.SESSION_KEY])
+        backend = session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    name = f"user:{user_id}"
+    key = (
+        user_id,
+        backend,
+        session.get(auth.HASH_SESSION_KEY),
+        caching.get_versions([name])[name],
+    )
+    user = _recall(key)
+    if user is None:
+        # Обычная проверка: бэкенд, хэш пароля, сброс чужой сессии.
+        user = auth.get_user(request)
+        if user.is_authenticated:
+            _remember(key, user)
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    def process_request(self, request):
+        assert hasattr(request, "session"), (
+            "CachedAuthenticationMiddleware требует SessionMiddleware "
+            "перед собой в MIDDLEWARE."
+        )
+        request.user = SimpleLazyObject(lambda: get_user(request))
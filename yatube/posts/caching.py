@@ -0,0 +1,251 @@
+"""Кэш фрагментов постов, списков постов лент и авторов.
+
+Ключи кэша содержат токены версий объектов. Сигналы из posts.signals
+меняют токены при изменении постов, комментариев, групп, подписок и
+пользователей, поэтому старые записи перестают читаться сразу, а не по
+истечении TTL, и TTL можно держать большим. Внутри транзакции токены
+меняются ещё раз после COMMIT, см. repeat_after_commit.
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from django.http import Http404
+
+from .models import Comment, Post, ProfileStats, User
+from .paginators import WindowPaginator, get_page
+
+INDEX_FEED = "index"
+# Поля автора, которые нужны страницам профиля и поста. Пароль, почта и
+# остальные поля пользователя в общий кэш не попадают.
+AUTHOR_FIELDS = ("id", "username", "first_name", "last_name")
+AUTHOR_STATS = ("posts_count", "followers_count", "following_count")
+
+
+def group_feed(group_id):
+    return f"group:{group_id}"
+
+
+def profile_feed(author_id):
+    return f"profile:{author_id}"
+
+
+def profile_page(author_id):
+    return f"page:profile:{author_id}"
+
+
+def group_page(group_id):
+    return f"page:group:{group_id}"
+
+
+def post_pages(author_id, *group_ids):
+    """Версии страниц профиля и групп, на которых показан пост."""
+    return [profile_page(author_id)] + [
+        group_page(group_id) for group_id in group_ids if group_id
+    ]
+
+
+def bump_user_pages(user_id):
+    """Меняет версии чужих страниц, на которых видно имя пользователя:
+    групп с его постами и постов с его комментариями.
+    """
+    group_ids = Post.objects.filter(author=user_id).exclude(
+        group=None
+    ).values_list("group_id", flat=True).distinct()
+    post_ids = Comment.objects.filter(author=user_id).values_list(
+        "post_id", flat=True
+    ).distinct()
+    bump(
+        *(group_page(group_id) for group_id in group_ids),
+        *(f"post:{post_id}" for post_id in post_ids),
+    )
+
+
+def bump_group_pages(group_id):
+    """Меняет версии профилей авторов, у которых есть посты в группе."""
+    author_ids = Post.objects.filter(group=group_id).values_list(
+        "author_id", flat=True
+    ).distinct()
+    bump(*(profile_page(author_id) for author_id in author_ids))
+
+
+def repeat_after_commit(func, *args):
+    """Вызывает func сейчас и, если идёт транзакция, ещё раз после COMMIT.
+
+    Читатель, который между первым вызовом и COMMIT видит старые данные,
+    положит их в кэш уже под новой версией; второй вызов делает такую
+    запись недостижимой.
+    """
+    func(*args)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: func(*args))
+
+
+def _version_key(name):
+    return f"version:{name}"
+
+
+def _new_token():
+    # Время смены версии в начале токена: по нему posts.conditional
+    # отдаёт Last-Modified.
+    return f"{int(time.time()):x}-{uuid.uuid4().hex[:8]}"
+
+
+def token_time(token):
+    """Unix-время смены версии из токена _new_token."""
+    try:
+        return int(token.split("-", 1)[0], 16)
+    except ValueError:
+        return None
+
+
+def get_versions(names):
+    """Текущие токены версий; недостающие создаются."""
+    keys = {name: _version_key(name) for name in names}
+    found = cache.get_many(keys.values())
+    versions, missing = {}, {}
+    for name, key in keys.items():
+        if key in found:
+            versions[name] = found[key]
+        else:
+            versions[name] = missing[key] = _new_token()
+    if missing:
+        cache.set_many(missing, None)
+    return versions
+
+
+def _set_new_versions(names):
+    cache.set_many({_version_key(name): _new_token() for name in names}, None)
+
+
+def bump(*names):
+    """Инвалидирует всё, что закэшировано под этими версиями."""
+    repeat_after_commit(_set_new_versions, names)
+
+
+def prepare_posts(posts, user):
+    """Проставляет постам ключи для кэширования фрагментов шаблона.
+
+    cache_version меняется при изменении поста, его группы или автора,
+    viewer_variant — от того, кто смотрит: гость, автор или другой
+    пользователь.
+    """
+    names = set()
+    for post in posts:
+        names.update((
+            f"post:{post.pk}",
+            f"group:{post.group_id}",
+            f"user:{post.author_id}",
+        ))
+    versions = get_versions(names)
+    for post in posts:
+        post.cache_version = ".".join((
+            versions[f"post:{post.pk}"],
+            versions[f"group:{post.group_id}"],
+            versions[f"user:{post.author_id}"],
+        ))
+        if not user.is_authenticated:
+            post.viewer_variant = "guest"
+        elif user.pk == post.author_id:
+            post.viewer_variant = "author"
+        else:
+            post.viewer_variant = "user"
+    return posts
+
+
+def _page_number(value):
+    """Номер страницы из ?page=; не число — первая, как у Paginator."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 1
+
+
+def get_feed_page(request, feed, object_list, per_page=None,
+                  paginate=get_page):
+    """Страница ленты со списком id постов из кэша.
+
+    Кэшируются количество постов и id постов страницы, поэтому при
+    попадании в кэш вместо COUNT(*) и сортировки с OFFSET выполняется
+    только выборка постов по первичному ключу. Keyset-страницы и так
+    дешёвые и не кэшируются. При промахе страницу строит paginate, а
+    запись кэша получает номер отданной страницы: «01», мусор и номера
+    за концом ленты не заводят новых записей.
+    """
+    per_page = per_page or settings.ELEMENTS_PAGINATOR
+    if settings.PAGINATION_MODE == "cursor":
+        page = paginate(request, object_list, per_page)
+        prepare_posts(page.object_list, request.user)
+        return page
+    number = _page_number(request.GET.get("page"))
+    version = get_versions([f"feed:{feed}"])[f"feed:{feed}"]
+    prefix = f"feed-page:{feed}:{version}:{per_page}"
+    cached = cache.get(f"{prefix}:{number}")
+    if cached is None:
+        page = paginate(request, object_list, per_page)
+        page.object_list = list(page.object_list)
+        cache.set(
+            f"{prefix}:{page.number}",
+            (page.paginator.count, page.paginator.count_exact,
+             [post.pk for post in page.object_list]),
+            settings.FEED_CACHE_TIMEOUT,
+        )
+    else:
+        count, count_exact, ids = cached
+        paginator = WindowPaginator(object_list, per_page)
+        paginator.count = count
+        paginator.count_exact = count_exact
+        posts = object_list.filter(pk__in=ids).in_bulk()
+        page = paginator.make_page(
+            [posts[pk] for pk in ids if pk in posts], number
+        )
+    prepare_posts(page.object_list, request.user)
+    return page
+
+
+def _author_key(user_id):
+    return f"author:{user_id}"
+
+
+def _build_author(values):
+    # Остальные поля пользователя отложены и загрузятся при обращении.
+    size = len(AUTHOR_FIELDS)
+    db = router.db_for_read(User)
+    author = User.from_db(db, AUTHOR_FIELDS, values[:size])
+    if values[size] is not None:
+        author.stats = ProfileStats.from_db(
+            db, ("user_id",) + AUTHOR_STATS, (author.pk, *values[size:])
+        )
+    return author
+
+
+def author_rows(username):
+    return User.objects.filter(username=username).values_list(
+        *AUTHOR_FIELDS, *(f"stats__{field}" for field in AUTHOR_STATS)
+    )
+
+
+def get_author_or_404(username):
+    """Автор вместе со счётчиками ProfileStats из кэша."""
+    user_id = cache.get(f"author-id:{username}")
+    values = cache.get(_author_key(user_id)) if user_id else None
+    if values is None or values[1] != username:
+        values = author_rows(username).first()
+        if values is None:
+            raise Http404
+        cache.set_many(
+            {
+                f"author-id:{username}": values[0],
+                _author_key(values[0]): values,
+            },
+            settings.FEED_CACHE_TIMEOUT,
+        )
+    return _build_author(values)
+
+
+def forget_authors(*user_ids):
+    repeat_after_commit(
+        cache.delete_many, [_author_key(user_id) for user_id in user_ids]
+    )
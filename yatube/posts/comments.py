@@ -0,0 +1,50 @@
+"""Комментарии поста порциями по ключу (created, id).
+
+Страница поста показывает первые COMMENTS_FIRST_PAGE комментариев,
+остальные подгружаются по курсору порциями COMMENTS_PER_PAGE через
+представление post_comments. Выборка идёт по индексу
+comment_post_created_id без OFFSET и COUNT(*), поэтому время ответа не
+зависит от числа комментариев.
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Comment
+from .paginators import NEXT, decode_cursor, encode_key
+
+
+def comments_after(post_id, key=None):
+    """Комментарии поста по убыванию (created, id) после ключа key."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        "author"
+    ).order_by("-created", "-pk")
+    if key is not None:
+        created, pk = key
+        comments = comments.filter(
+            Q(created__lt=created) | Q(created=created, pk__lt=pk)
+        )
+    return comments
+
+
+def parse_cursor(cursor):
+    """Ключ (created, id) из курсора порции или None для мусора."""
+    decoded = decode_cursor(cursor) if cursor else None
+    # Порции идут только вперёд: курсор назад — такой же мусор, как битый.
+    if decoded is None or decoded[0] != NEXT:
+        return None
+    return decoded[1:]
+
+
+def get_comments(post_id, cursor=None, per_page=None):
+    """Возвращает (комментарии, курсор следующей порции или None).
+
+    С битым курсором возвращается первая порция.
+    """
+    per_page = per_page or settings.COMMENTS_PER_PAGE
+    key = parse_cursor(cursor)
+    comments = list(comments_after(post_id, key)[:per_page + 1])
+    if len(comments) <= per_page:
+        return comments, None
+    comments = comments[:per_page]
+    last = comments[-1]
+    return comments, encode_key(NEXT, last.created, last.pk)
@@ -0,0 +1,103 @@
+"""Условные GET для страниц поста, профиля и группы.
+
+ETag и Last-Modified считаются по токенам версий из posts.caching:
+сигналы меняют их при каждом изменении, видимом на странице, — пост,
+комментарии, превью, группа, профиль, счётчики (stats:<id>). Имена
+авторов и комментаторов и названия групп видны и на чужих страницах:
+при их смене задачи caching.bump_user_pages и bump_group_pages меняют
+версии и этих страниц. Если ничего не изменилось, condition() отвечает
+304 до рендеринга шаблона и запросов ленты. ETag зависит от того, кто
+смотрит, поэтому Last-Modified отдаётся только гостям: после входа
+страница должна перерисоваться, даже если клиент прислал только
+If-Modified-Since.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from django.http import Http404
+from django.views.decorators.http import condition
+
+from . import caching
+from .models import Group
+
+
+def _validators(request, get_names):
+    """(ETag, Last-Modified) страницы; считаются один раз на запрос."""
+    cached = getattr(request, "_page_validators", None)
+    if cached is not None:
+        return cached
+    names = get_names()
+    if names is None:
+        request._page_validators = (None, None)
+        return request._page_validators
+    user = request.user
+    if user.is_authenticated:
+        names = [*names, f"stats:{user.pk}"]
+    versions = caching.get_versions(names)
+    raw = "|".join((
+        str(user.pk or ""),
+        request.get_full_path(),
+        *(f"{name}={versions[name]}" for name in sorted(versions)),
+    ))
+    modified = None
+    if not user.is_authenticated:
+        times = [caching.token_time(token) for token in versions.values()]
+        if None not in times:
+            modified = datetime.fromtimestamp(max(times), timezone.utc)
+    request._page_validators = (hashlib.md5(raw.encode()).hexdigest(),
+                                modified)
+    return request._page_validators
+
+
+def _author_id(username):
+    try:
+        return caching.get_author_or_404(username).pk
+    except Http404:
+        return None
+
+
+def _post_names(request, username, post_id):
+    author_id = _author_id(username)
+    if author_id is None:
+        return None
+    return [f"post:{post_id}", f"user:{author_id}", f"stats:{author_id}"]
+
+
+def _profile_names(request, username):
+    author_id = _author_id(username)
+    if author_id is None:
+        return None
+    return [
+        caching.profile_page(author_id),
+        f"user:{author_id}",
+        f"stats:{author_id}",
+    ]
+
+
+def _group_names(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        "pk", flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return [f"group:{group_id}", caching.group_page(group_id)]
+
+
+def _conditional(get_names):
+    # strategy из posts.parallel на версии страницы не влияет.
+    def etag(request, *args, strategy=None, **kwargs):
+        return _validators(
+            request, lambda: get_names(request, *args, **kwargs)
+        )[0]
+
+    def last_modified(request, *args, strategy=None, **kwargs):
+        return _validators(
+            request, lambda: get_names(request, *args, **kwargs)
+        )[1]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+post_page = _conditional(_post_names)
+profile_page = _conditional(_profile_names)
+group_page = _conditional(_group_names)
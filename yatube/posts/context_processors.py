@@ -0,0 +1,5 @@
+from django.conf import settings
+
+
+def cache_timeouts(request):
+    return {"FRAGMENT_CACHE_TIMEOUT": settings.FRAGMENT_CACHE_TIMEOUT}
@@ -0,0 +1,111 @@
+"""Денормализованные счётчики постов, подписок и комментариев.
+
+Счётчики меняются сигналами из posts.signals внутри транзакции,
+в которой создаётся или удаляется запись. Записи, созданные в обход
+сигналов (bulk_create, raw SQL), чинит команда recount_counters.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, ProfileStats, User
+
+BATCH_SIZE = 500
+
+PROFILE_COUNTERS = {
+    "posts_count": (Post, "author"),
+    "followers_count": (Follow, "author"),
+    "following_count": (Follow, "user"),
+}
+
+
+def _change(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def change_profile(user_id, field, delta):
+    if user_id is not None:
+        _change(ProfileStats.objects.filter(user_id=user_id), field, delta)
+
+
+def change_comments(post_id, delta):
+    if post_id is not None:
+        _change(Post.objects.filter(pk=post_id), "comment_count", delta)
+
+
+def _count(model, field):
+    rows = (
+        model.objects.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def recount_profiles(users=None, dry_run=False):
+    """Пересчитывает ProfileStats, возвращает число исправленных строк."""
+    if users is None:
+        users = User.objects.all()
+    users = users.annotate(**{
+        f"actual_{field}": _count(model, fk)
+        for field, (model, fk) in PROFILE_COUNTERS.items()
+    }).select_related("stats").order_by()
+    repaired = 0
+    to_create, to_update = [], []
+
+    def flush():
+        if not dry_run:
+            ProfileStats.objects.bulk_create(
+                to_create, ignore_conflicts=True
+            )
+            ProfileStats.objects.bulk_update(
+                to_update, list(PROFILE_COUNTERS)
+            )
+        to_create.clear()
+        to_update.clear()
+
+    for user in users.iterator():
+        actual = {
+            field: getattr(user, f"actual_{field}")
+            for field in PROFILE_COUNTERS
+        }
+        try:
+            stats = user.stats
+        except ProfileStats.DoesNotExist:
+            to_create.append(ProfileStats(user=user, **actual))
+        else:
+            if all(getattr(stats, k) == v for k, v in actual.items()):
+                continue
+            for field, value in actual.items():
+                setattr(stats, field, value)
+            to_update.append(stats)
+        repaired += 1
+        if len(to_create) + len(to_update) >= BATCH_SIZE:
+            flush()
+    flush()
+    return repaired
+
+
+def recount_comments(posts=None, dry_run=False):
+    """Пересчитывает Post.comment_count, возвращает число исправлений."""
+    if posts is None:
+        posts = Post.objects.all()
+    posts = posts.annotate(
+        actual=_count(Comment, "post")
+    ).exclude(comment_count=F("actual")).only("pk", "comment_count")
+    repaired = 0
+    drifted = []
+    for post in posts.order_by().iterator():
+        post.comment_count = post.actual
+        drifted.append(post)
+        repaired += 1
+        if len(drifted) >= BATCH_SIZE:
+            if not dry_run:
+                Post.objects.bulk_update(drifted, ["comment_count"])
+            drifted.clear()
+    if drifted and not dry_run:
+        Post.objects.bulk_update(drifted, ["comment_count"])
+    return repaired
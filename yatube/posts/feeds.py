@@ -0,0 +1,14 @@
+from .models import Post
+
+
+def feed_queryset(queryset=None):
+    """Посты для ленты вместе с автором и группой.
+
+    Шаблоны лент обращаются к post.author и post.group у каждого поста;
+    без этого страница из ELEMENTS_PAGINATOR постов выполняет по
+    несколько запросов на пост. Количество комментариев хранится
+    в Post.comment_count.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    return queryset.select_related("author", "group")
@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import images
 from .models import Comment, Post
 
 
@@ -19,6 +21,22 @@ class PostForm(forms.ModelForm):
             raise forms.ValidationError("Введите текст")
         return data
 
+    def clean_image(self):
+        image = self.cleaned_data["image"]
+        self.prepared_image = None
+        if isinstance(image, UploadedFile):
+            try:
+                self.prepared_image = images.prepare(image)
+            except images.ImageError as error:
+                raise forms.ValidationError(str(error))
+        return image
+
+    def save(self, commit=True):
+        # Файл пишется только для формы без ошибок.
+        if self.prepared_image:
+            self.instance.image = images.store(*self.prepared_image)
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
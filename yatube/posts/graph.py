@@ -0,0 +1,160 @@
+"""Граф подписок со списками смежности в кэше.
+
+Для каждого пользователя кэш хранит два отсортированных массива id
+(array("I"), 4 байта на подписку): на кого он подписан и кто подписан
+на него. Проверка подписки — двоичный поиск, подписки, подписчики и
+взаимные подписки — один проход по массивам. Сигналы на Follow
+сбрасывают массивы обоих участников, ещё раз — после COMMIT.
+
+Рекомендации «кого почитать» считает команда
+rebuild_follow_suggestions: авторы, на которых подписаны подписки
+пользователя, по числу таких подписок. Результат лежит в
+FollowSuggestion.
+"""
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .caching import repeat_after_commit
+from .models import Follow, FollowSuggestion, User
+
+TYPECODE = "I"
+BATCH_SIZE = 500
+
+FOLLOWING = "following"
+FOLLOWERS = "followers"
+# Вид списка: (поле владельца списка, поле соседа) в Follow.
+FIELDS = {
+    FOLLOWING: ("user", "author"),
+    FOLLOWERS: ("author", "user"),
+}
+
+
+def _key(kind, user_id):
+    return f"graph:{kind}:{user_id}"
+
+
+def _unpack(raw):
+    ids = array(TYPECODE)
+    ids.frombytes(raw)
+    return ids
+
+
+def adjacency_rows(kind, user_ids):
+    """Пары (владелец, сосед) из Follow для списков вида kind."""
+    owner, neighbour = FIELDS[kind]
+    return Follow.objects.filter(**{f"{owner}__in": user_ids}).order_by(
+        owner, neighbour
+    ).values_list(owner, neighbour)
+
+
+def load(kind, user_ids):
+    """Списки смежности вида kind: {user_id: array}."""
+    keys = {user_id: _key(kind, user_id) for user_id in user_ids}
+    found = cache.get_many(keys.values())
+    lists, missing = {}, []
+    for user_id, key in keys.items():
+        if key in found:
+            lists[user_id] = _unpack(found[key])
+        else:
+            missing.append(user_id)
+    for start in range(0, len(missing), BATCH_SIZE):
+        batch = missing[start:start + BATCH_SIZE]
+        loaded = {user_id: array(TYPECODE) for user_id in batch}
+        for owner_id, neighbour_id in adjacency_rows(kind, batch).iterator():
+            loaded[owner_id].append(neighbour_id)
+        cache.set_many(
+            {_key(kind, user_id): ids.tobytes()
+             for user_id, ids in loaded.items()},
+            settings.GRAPH_CACHE_TIMEOUT,
+        )
+        lists.update(loaded)
+    return lists
+
+
+def following(user_id):
+    return load(FOLLOWING, [user_id])[user_id]
+
+
+def followers(user_id):
+    return load(FOLLOWERS, [user_id])[user_id]
+
+
+def is_following(user_id, author_id):
+    ids = following(user_id)
+    index = bisect_left(ids, author_id)
+    return index < len(ids) and ids[index] == author_id
+
+
+def mutual(user_id):
+    """id пользователей, с которыми подписки взаимные."""
+    outgoing, incoming = following(user_id), followers(user_id)
+    result = []
+    left = right = 0
+    while left < len(outgoing) and right < len(incoming):
+        if outgoing[left] == incoming[right]:
+            result.append(outgoing[left])
+            left += 1
+            right += 1
+        elif outgoing[left] < incoming[right]:
+            left += 1
+        else:
+            right += 1
+    return result
+
+
+def forget(*user_ids):
+    # Иначе список, прочитанный до COMMIT, пролежал бы в кэше
+    # GRAPH_CACHE_TIMEOUT.
+    repeat_after_commit(cache.delete_many, [
+        _key(kind, user_id) for kind in FIELDS for user_id in user_ids
+    ])
+
+
+def compute_suggestions(user_id, limit=None):
+    """Друзья друзей: [(author_id, score)] по убыванию score."""
+    limit = limit or settings.FOLLOW_SUGGESTIONS
+    followed = following(user_id)
+    scores = Counter()
+    for ids in load(FOLLOWING, followed).values():
+        scores.update(ids)
+    known = set(followed)
+    known.add(user_id)
+    return heapq.nsmallest(
+        limit,
+        ((author_id, score) for author_id, score in scores.items()
+         if author_id not in known),
+        key=lambda item: (-item[1], item[0]),
+    )
+
+
+def rebuild_suggestions(users=None, limit=None):
+    """Пересчитывает FollowSuggestion, возвращает число пользователей."""
+    if users is None:
+        users = User.objects.all()
+    count = 0
+    for user_id in users.values_list("pk", flat=True).iterator():
+        suggestions = [
+            FollowSuggestion(user_id=user_id, author_id=author_id,
+                             score=score)
+            for author_id, score in compute_suggestions(user_id, limit)
+        ]
+        FollowSuggestion.objects.filter(user_id=user_id).delete()
+        FollowSuggestion.objects.bulk_create(suggestions)
+        count += 1
+    return count
+
+
+def suggestions(user_id, limit=None):
+    """Рекомендованные авторы из последнего пересчёта."""
+    limit = limit or settings.FOLLOW_SUGGESTIONS
+    return [
+        suggestion.author
+        for suggestion in FollowSuggestion.objects.filter(
+            user_id=user_id
+        ).select_related("author").order_by("-score", "author")[:limit]
+    ]
@@ -0,0 +1,110 @@
+"""Приём картинок постов из формы.
+
+Загрузка по частям переписывается во временный файл, из него Pillow
+читает картинку, уменьшает её до IMAGE_MAX_SIZE и кодирует заново: в
+JPEG, а если есть прозрачность — в PNG. EXIF и прочие метаданные при
+этом отбрасываются, поворот из EXIF применяется к пикселям.
+
+Готовый файл хранится под именем из хэша содержимого, поэтому
+одинаковые картинки разных постов — один файл. ImageBlob.refs считает
+посты, которые на него ссылаются (см. posts.signals); когда ссылок не
+остаётся, файл удаляется после коммита.
+"""
+import hashlib
+import io
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from PIL import Image, ImageOps
+
+from .models import ImageBlob
+
+UPLOAD_TO = "posts"
+
+
+class ImageError(ValueError):
+    pass
+
+
+def _has_alpha(image):
+    if image.mode == "P":
+        image = image.convert("RGBA")
+    if image.mode not in ("RGBA", "LA"):
+        return False
+    return image.getchannel("A").getextrema()[0] < 255
+
+
+def _encode(image):
+    """Байты и расширение перекодированной картинки."""
+    buffer = io.BytesIO()
+    if _has_alpha(image):
+        image.convert("RGBA").save(buffer, "PNG", optimize=True, exif=b"")
+        return buffer.getvalue(), "png"
+    image.convert("RGB").save(
+        buffer, "JPEG", quality=settings.IMAGE_QUALITY,
+        optimize=True, progressive=True, exif=b"",
+    )
+    return buffer.getvalue(), "jpg"
+
+
+def prepare(upload):
+    """Имя и содержимое файла для загруженной картинки.
+
+    ImageError, если это не картинка или она слишком велика.
+    """
+    with tempfile.TemporaryFile() as spool:
+        for chunk in upload.chunks():
+            spool.write(chunk)
+        spool.seek(0)
+        try:
+            image = Image.open(spool)
+            if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+                raise ImageError("Слишком большое разрешение картинки")
+            # JPEG умеет декодироваться сразу в уменьшенном виде.
+            image.draft("RGB", settings.IMAGE_MAX_SIZE)
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail(settings.IMAGE_MAX_SIZE, Image.LANCZOS)
+            content, extension = _encode(image)
+        except (OSError, SyntaxError, Image.DecompressionBombError):
+            raise ImageError("Не удалось прочитать картинку")
+    digest = hashlib.sha256(content).hexdigest()
+    return f"{UPLOAD_TO}/{digest[:2]}/{digest}.{extension}", content
+
+
+def store(name, content):
+    """Сохраняет файл, если такого ещё нет, и возвращает его имя."""
+    ImageBlob.objects.get_or_create(name=name, defaults={"size": len(content)})
+    if not default_storage.exists(name):
+        saved = default_storage.save(name, ContentFile(content))
+        if saved != name:
+            # Такой же файл только что сохранил параллельный запрос.
+            default_storage.delete(saved)
+    return name
+
+
+def acquire(name):
+    """Пост стал ссылаться на файл name."""
+    if name:
+        ImageBlob.objects.filter(name=name).update(refs=F("refs") + 1)
+
+
+def release(name):
+    """Пост перестал ссылаться на файл name."""
+    if not name:
+        return
+    ImageBlob.objects.filter(name=name, refs__gt=0).update(
+        refs=F("refs") - 1
+    )
+    deleted, _ = ImageBlob.objects.filter(name=name, refs=0).delete()
+    if deleted:
+        transaction.on_commit(lambda: _delete_file(name))
+
+
+def _delete_file(name):
+    # Пока ждали коммита, ту же картинку могли загрузить снова.
+    if not ImageBlob.objects.filter(name=name).exists():
+        default_storage.delete(name)
@@ -0,0 +1,43 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+COLUMNS = ("hits", "misses", "evictions", "entries", "bytes")
+
+
+class Command(BaseCommand):
+    help = (
+        "Показывает попадания, промахи и вытеснения кэша "
+        "по префиксам ключей."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Обнулить накопленную статистику.",
+        )
+
+    def handle(self, *args, **options):
+        if not hasattr(cache, "stats"):
+            raise CommandError(
+                f"{type(cache).__name__} не собирает статистику, "
+                "используйте бэкенд yatube.cache.SQLiteCache."
+            )
+        if options["reset"]:
+            cache.reset_stats()
+            self.stdout.write("Статистика кэша обнулена.")
+            return
+        report = cache.stats()
+        self.stdout.write(
+            f"{'prefix':40}" + "".join(f"{name:>12}" for name in COLUMNS)
+            + f"{'hit ratio':>12}"
+        )
+        for prefix in sorted(report):
+            row = report[prefix]
+            lookups = row["hits"] + row["misses"]
+            ratio = f"{row['hits'] / lookups:.1%}" if lookups else "-"
+            self.stdout.write(
+                f"{prefix:40}"
+                + "".join(f"{row[name] or 0:>12}" for name in COLUMNS)
+                + f"{ratio:>12}"
+            )
@@ -0,0 +1,82 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from posts.caching import author_rows
+from posts.comments import comments_after
+from posts.feeds import feed_queryset
+from posts.graph import FOLLOWING, adjacency_rows
+from posts.models import Follow, Group, Post, User
+from posts.resolvers import post_queryset
+from posts.timeline import get_follow_feed
+
+FULL_SCAN = re.compile(r"\bSCAN\b(?!.*\bUSING (COVERING )?INDEX\b)")
+TEMP_SORT = re.compile(r"USE TEMP B-TREE FOR ORDER BY")
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет EXPLAIN для запросов представлений posts "
+        "и отмечает полные сканирования таблиц."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--strict",
+            action="store_true",
+            help="Завершиться с ошибкой, если найдено полное сканирование.",
+        )
+
+    def get_querysets(self):
+        """Запросы, которые выполняют представления, — теми же
+        функциями, что и сами представления.
+        """
+        per_page = settings.ELEMENTS_PAGINATOR
+        comments_per_page = settings.COMMENTS_PER_PAGE
+        group = Group.objects.first() or Group(pk=0)
+        author = User.objects.first() or User(pk=0, username="")
+        post = Post.objects.first() or Post(pk=0)
+        return {
+            "index": feed_queryset()[:per_page],
+            "cached feed page": feed_queryset().filter(pk__in=[post.pk]),
+            "group_posts": feed_queryset(group.posts.all())[:per_page],
+            "profile author": author_rows(author.username)[:1],
+            "profile": feed_queryset(author.posts.all())[:per_page],
+            "profile following": adjacency_rows(FOLLOWING, [author.pk]),
+            "post_view": post_queryset(post.pk)[:1],
+            "post_view comments": comments_after(
+                post.pk
+            )[:comments_per_page + 1],
+            "post_comments": comments_after(
+                post.pk, (timezone.now(), post.pk)
+            )[:comments_per_page + 1],
+            "follow_index": feed_queryset(
+                get_follow_feed(author)
+            )[:per_page],
+            "fan-out followers": Follow.objects.filter(
+                author=author
+            ).values_list("user_id", flat=True),
+        }
+
+    def handle(self, *args, **options):
+        flagged = []
+        for name, queryset in self.get_querysets().items():
+            plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for line in plan.splitlines():
+                if FULL_SCAN.search(line):
+                    flagged.append(name)
+                    self.stdout.write(self.style.ERROR(f"  {line}"))
+                elif TEMP_SORT.search(line):
+                    self.stdout.write(self.style.WARNING(f"  {line}"))
+                else:
+                    self.stdout.write(f"  {line}")
+        if not flagged:
+            self.stdout.write(self.style.SUCCESS("Полных сканирований нет."))
+            return
+        message = "Полные сканирования: " + ", ".join(sorted(set(flagged)))
+        if options["strict"]:
+            raise CommandError(message)
+        self.stdout.write(self.style.ERROR(message))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает пользователей, группы, посты, комментарии или подписки "
+        "в NDJSON или CSV, не загружая таблицу в память."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=transfer.KINDS)
+        parser.add_argument(
+            "--format",
+            choices=transfer.FORMATS,
+            default="ndjson",
+            help="Формат файла.",
+        )
+        parser.add_argument(
+            "--output",
+            help="Файл для записи; по умолчанию stdout.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Сколько строк читать из базы за раз.",
+        )
+
+    def handle(self, *args, **options):
+        rows = transfer.export_rows(options["kind"], options["batch_size"])
+        if not options["output"]:
+            transfer.write_records(
+                self.stdout, options["format"], options["kind"], rows
+            )
+            return
+        with open(options["output"], "w", newline="",
+                  encoding="utf-8") as output:
+            count = transfer.write_records(
+                output, options["format"], options["kind"], rows
+            )
+        self.stderr.write(f"Выгружено записей: {count}")
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает пользователей, группы, посты, комментарии или подписки "
+        "из NDJSON или CSV пачками bulk_create. Порядок загрузки: users, "
+        "groups, posts, comments, follows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=transfer.KINDS)
+        parser.add_argument("path", help="Файл, выгруженный export_data.")
+        parser.add_argument(
+            "--format",
+            choices=transfer.FORMATS,
+            default="ndjson",
+            help="Формат файла.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Сколько записей вставлять одним bulk_create.",
+        )
+        parser.add_argument(
+            "--images-dir",
+            help="Каталог с картинками постов, которые нужно скопировать "
+                 "в MEDIA_ROOT.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Сколько потоков копируют картинки и строят превью.",
+        )
+
+    def handle(self, *args, **options):
+        importer = transfer.Importer(
+            options["kind"],
+            batch_size=options["batch_size"],
+            images_dir=options["images_dir"],
+            workers=options["workers"],
+        )
+        with open(options["path"], newline="", encoding="utf-8") as source:
+            try:
+                count = importer.run(
+                    transfer.read_records(source, options["format"])
+                )
+            except (KeyError, ValueError) as error:
+                raise CommandError(f"Ошибка в файле: {error}")
+        self.stdout.write(f"Загружено записей: {count}")
+        if importer.skipped:
+            self.stdout.write(f"Уже были в базе: {importer.skipped}")
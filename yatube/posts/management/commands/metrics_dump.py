@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from yatube import metrics
+
+COLUMNS = ("count", "mean", "p50", "p95", "p99", "max")
+
+
+class Command(BaseCommand):
+    help = (
+        "Показывает гистограммы метрик запросов всех процессов "
+        "по именам URL (см. METRICS_SAMPLE_RATE)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--json",
+            action="store_true",
+            help="Вывести сводку в JSON.",
+        )
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Удалить накопленные снимки метрик.",
+        )
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            metrics.reset()
+            self.stdout.write("Метрики удалены.")
+            return
+        report = {
+            name: {
+                metric: histogram.summary()
+                for metric, histogram in histograms.items()
+            }
+            for name, histograms in sorted(metrics.collect().items())
+        }
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        if not report:
+            self.stdout.write(
+                "Метрик нет: включите METRICS_SAMPLE_RATE "
+                "и дождитесь METRICS_FLUSH_INTERVAL."
+            )
+            return
+        self.stdout.write(
+            f"{'url':16}{'metric':14}"
+            + "".join(f"{name:>10}" for name in COLUMNS)
+        )
+        for name, rows in report.items():
+            for metric in metrics.METRICS:
+                if metric not in rows:
+                    continue
+                row = rows[metric]
+                self.stdout.write(
+                    f"{name:16}{metric:14}"
+                    + "".join(f"{row[column]:>10.1f}" for column in COLUMNS)
+                )
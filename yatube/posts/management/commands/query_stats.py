@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from yatube import querylog
+
+
+class Command(BaseCommand):
+    help = (
+        "Показывает отпечатки SQL-запросов с наибольшим суммарным "
+        "временем по представлениям всех процессов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--view",
+            help="Только запросы этого представления (имя URL).",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=20,
+            help="Сколько отпечатков показать.",
+        )
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Удалить накопленную статистику.",
+        )
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            querylog.reset()
+            self.stdout.write("Статистика запросов удалена.")
+            return
+        rows = querylog.collect()
+        if options["view"]:
+            rows = [row for row in rows if row["view"] == options["view"]]
+        self.stdout.write(
+            f"{'id':14}{'view':16}{'count':>8}{'total ms':>12}"
+            f"{'mean ms':>10}{'max ms':>10}  fingerprint"
+        )
+        for row in rows[:options["limit"]]:
+            self.stdout.write(
+                f"{row['id']:14}{row['view'] or '-':16}{row['count']:>8}"
+                f"{row['total_ms']:>12.1f}"
+                f"{row['total_ms'] / row['count']:>10.2f}"
+                f"{row['max_ms']:>10.1f}  {row['fingerprint']}"
+            )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from posts.graph import rebuild_suggestions
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает рекомендации «кого почитать» по подпискам "
+        "подписок пользователей."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames",
+            nargs="*",
+            help="Пересчитать только для этих пользователей.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            help="Сколько рекомендаций хранить (FOLLOW_SUGGESTIONS).",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+        count = rebuild_suggestions(users, options["limit"])
+        self.stdout.write(f"Рекомендации пересчитаны: {count}")
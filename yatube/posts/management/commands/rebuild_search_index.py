@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.search import rebuild, use_fts
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает поисковый индекс постов и комментариев: "
+        "таблицу FTS5 или, без неё, SearchTerm."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild()
+        backend = "FTS5" if use_fts() else "SearchTerm"
+        self.stdout.write(f"Постов проиндексировано ({backend}): {count}")
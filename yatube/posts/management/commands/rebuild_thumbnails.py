@@ -0,0 +1,33 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        "Строит превью картинок всех постов в нескольких процессах и "
+        "удаляет файлы превью, на которые не ссылается ни один пост."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Сколько процессов строят превью.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Строить заново и те превью, файлы которых уже есть.",
+        )
+
+    def handle(self, *args, **options):
+        built = thumbnails.rebuild_all(
+            options["processes"], force=options["force"]
+        )
+        self.stdout.write(f"Превью готовы для постов: {built}")
+        removed = thumbnails.sweep()
+        self.stdout.write(f"Удалено ненужных файлов: {removed}")
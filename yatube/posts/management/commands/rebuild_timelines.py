@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import User
+from posts.timeline import rebuild
+
+
+class Command(BaseCommand):
+    help = "Пересобирает материализованные ленты подписок пользователей."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames",
+            nargs="*",
+            help="Пересобрать ленты только этих пользователей.",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+        count = 0
+        for user_id in users.values_list("pk", flat=True).iterator():
+            rebuild(user_id)
+            count += 1
+        self.stdout.write(f"Лент пересобрано: {count}")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_comments, recount_profiles
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает счётчики постов, подписок и комментариев "
+        "и исправляет расхождения."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать количество расхождений.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        profiles = recount_profiles(dry_run=dry_run)
+        comments = recount_comments(dry_run=dry_run)
+        verb = "Найдено" if dry_run else "Исправлено"
+        self.stdout.write(
+            f"{verb} расхождений: профили — {profiles}, "
+            f"комментарии — {comments}"
+        )
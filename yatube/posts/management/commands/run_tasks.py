@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import tasks
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет задачи из очереди posts.tasks в нескольких процессах. "
+        "Нужен, если YATUBE_TASKS_EAGER=0."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=settings.TASKS_WORKERS,
+            help="Сколько процессов выполняют задачи (TASKS_WORKERS).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10,
+            help="Сколько задач процесс забирает за раз.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выйти, когда готовых задач не останется.",
+        )
+
+    def handle(self, *args, **options):
+        released = tasks.release_stale()
+        if released:
+            self.stdout.write(f"Возвращено в очередь задач: {released}")
+        work_options = {
+            "batch_size": options["batch_size"],
+            "once": options["once"],
+        }
+        if options["processes"] > 1:
+            done = tasks.work_in_processes(
+                options["processes"], **work_options
+            )
+        else:
+            done = tasks.work(**work_options)
+        self.stdout.write(f"Выполнено задач: {done}")
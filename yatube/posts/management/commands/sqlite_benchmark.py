@@ -0,0 +1,155 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from yatube.sqlite.base import apply_pragmas
+
+# Упрощённые таблицы постов и комментариев с теми же индексами:
+# бенчмарк сравнивает режимы SQLite, а не ORM.
+SCHEMA = """
+CREATE TABLE post (
+    id INTEGER PRIMARY KEY,
+    author_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    pub_date REAL NOT NULL,
+    comment_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX post_pub_date ON post (pub_date DESC, id DESC);
+CREATE TABLE comment (
+    id INTEGER PRIMARY KEY,
+    post_id INTEGER NOT NULL REFERENCES post (id),
+    author_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX comment_post_created ON comment (post_id, created DESC);
+"""
+
+MODES = ("default", "tuned")
+
+
+def _prepare(path, posts):
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    now = time.time()
+    connection.executemany(
+        "INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)",
+        ((pk % 50, "x" * 200, now - pk) for pk in range(posts)),
+    )
+    connection.commit()
+    connection.close()
+
+
+def _worker(path, mode, duration, write_ratio, posts, seed):
+    rng = random.Random(seed)
+    # timeout=5 — как у стандартного бэкенда Django.
+    connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+    begin = "BEGIN"
+    if mode == "tuned":
+        apply_pragmas(connection, settings.SQLITE_PRAGMAS)
+        if settings.SQLITE_IMMEDIATE_TRANSACTIONS:
+            begin = "BEGIN IMMEDIATE"
+    reads = writes = errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        post_id = rng.randint(1, posts)
+        try:
+            if rng.random() < write_ratio:
+                connection.execute(begin)
+                connection.execute(
+                    "INSERT INTO comment (post_id, author_id, text, created) "
+                    "VALUES (?, ?, ?, ?)",
+                    (post_id, seed, "comment", time.time()),
+                )
+                connection.execute(
+                    "UPDATE post SET comment_count = comment_count + 1 "
+                    "WHERE id = ?",
+                    (post_id,),
+                )
+                connection.execute("COMMIT")
+                writes += 1
+            else:
+                connection.execute(
+                    "SELECT id, author_id, text, comment_count FROM post "
+                    "ORDER BY pub_date DESC, id DESC LIMIT 10 OFFSET ?",
+                    (rng.randrange(0, posts, 10),),
+                ).fetchall()
+                connection.execute(
+                    "SELECT author_id, text FROM comment WHERE post_id = ? "
+                    "ORDER BY created DESC",
+                    (post_id,),
+                ).fetchall()
+                reads += 1
+        except sqlite3.OperationalError:
+            errors += 1
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+    connection.close()
+    return reads, writes, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность SQLite со стандартными "
+        "настройками и с прагмами из SQLITE_PRAGMAS при параллельных "
+        "чтениях и записях."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=8,
+            help="Число параллельных процессов.",
+        )
+        parser.add_argument(
+            "--duration", type=float, default=5,
+            help="Длительность прогона каждого режима, секунд.",
+        )
+        parser.add_argument(
+            "--write-ratio", type=float, default=0.2,
+            help="Доля операций записи.",
+        )
+        parser.add_argument(
+            "--posts", type=int, default=5000,
+            help="Число постов в тестовой базе.",
+        )
+
+    def run_mode(self, mode, options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f"{mode}.sqlite3")
+            _prepare(path, options["posts"])
+            arguments = [
+                (path, mode, options["duration"], options["write_ratio"],
+                 options["posts"], seed)
+                for seed in range(options["workers"])
+            ]
+            with multiprocessing.Pool(options["workers"]) as pool:
+                results = pool.starmap(_worker, arguments)
+        reads, writes, errors = (sum(column) for column in zip(*results))
+        return {
+            "reads": reads,
+            "writes": writes,
+            "errors": errors,
+            "ops/s": (reads + writes) / options["duration"],
+        }
+
+    def handle(self, *args, **options):
+        columns = ("reads", "writes", "errors", "ops/s")
+        self.stdout.write(
+            f"{'mode':10}" + "".join(f"{name:>12}" for name in columns)
+        )
+        report = {}
+        for mode in MODES:
+            report[mode] = row = self.run_mode(mode, options)
+            self.stdout.write(
+                f"{mode:10}"
+                + "".join(f"{row[name]:>12.0f}" for name in columns)
+            )
+        if report["default"]["ops/s"]:
+            speedup = report["tuned"]["ops/s"] / report["default"]["ops/s"]
+            self.stdout.write(f"Ускорение: {speedup:.2f}x")
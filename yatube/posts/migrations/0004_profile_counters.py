@@ -0,0 +1,70 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_rows(model, field):
+    rows = (
+        model.objects.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    Follow = apps.get_model("posts", "Follow")
+    ProfileStats = apps.get_model("posts", "ProfileStats")
+    users = User.objects.annotate(
+        posts_total=count_rows(Post, "author"),
+        followers_total=count_rows(Follow, "author"),
+        following_total=count_rows(Follow, "user"),
+    )
+    ProfileStats.objects.bulk_create(
+        (
+            ProfileStats(
+                user_id=user.pk,
+                posts_count=user.posts_total,
+                followers_count=user.followers_total,
+                following_count=user.following_total,
+            )
+            for user in users.iterator()
+        ),
+        batch_size=500,
+    )
+    Post.objects.update(comment_count=count_rows(Comment, "post"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0003_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+                ('followers_count', models.PositiveIntegerField(default=0)),
+                ('following_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
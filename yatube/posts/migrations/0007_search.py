@@ -0,0 +1,81 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:15
+
+import re
+import unicodedata
+
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+WORD = re.compile(r"\w+")
+MAX_TERM_LENGTH = 64
+
+
+def tokenize(text):
+    # Копия posts.search.tokenize на момент миграции: данные в индексе
+    # не должны зависеть от того, как код поиска изменится потом.
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(
+        char for char in decomposed if not unicodedata.combining(char)
+    )
+    return [
+        word for word in WORD.findall(stripped)
+        if len(word) <= MAX_TERM_LENGTH
+    ]
+
+
+def create_fts_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+    Comment = apps.get_model("posts", "Comment")
+    Post = apps.get_model("posts", "Post")
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE posts_search "
+                "USING fts5(text, comments, pub_date UNINDEXED)"
+            )
+        except OperationalError:
+            # SQLite собран без FTS5: posts.search использует SearchTerm,
+            # который заполняет команда rebuild_search_index.
+            return
+        for post in Post.objects.iterator():
+            comments = Comment.objects.filter(post_id=post.pk).values_list(
+                "text", flat=True
+            )
+            cursor.execute(
+                "INSERT INTO posts_search (rowid, text, comments, pub_date) "
+                "VALUES (%s, %s, %s, %s)",
+                [post.pk, " ".join(tokenize(post.text)),
+                 " ".join(tokenize(" ".join(comments))),
+                 post.pub_date.timestamp()],
+            )
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS posts_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term'),
+        ),
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
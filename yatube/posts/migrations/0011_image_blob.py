@@ -0,0 +1,21 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_task_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('refs', models.PositiveIntegerField(default=0)),
+                ('size', models.PositiveIntegerField()),
+            ],
+        ),
+    ]
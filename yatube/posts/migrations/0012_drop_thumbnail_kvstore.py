@@ -0,0 +1,20 @@
+# Generated by Django 2.2.6 on 2026-10-18 21:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """sorl.thumbnail убран из INSTALLED_APPS: превью строит
+    posts.thumbnails, а его KV-хранилище в базе больше не нужно.
+    """
+
+    dependencies = [
+        ("posts", "0011_image_blob"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "DROP TABLE IF EXISTS thumbnail_kvstore",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.6 on 2026-10-18 19:14
+
+import json
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def count_references(apps, schema_editor):
+    # Путь превью: thumbnails/ab/<sha256>/960x339c-q85.webp.
+    Post = apps.get_model('posts', 'Post')
+    ThumbnailSet = apps.get_model('posts', 'ThumbnailSet')
+    refs = Counter()
+    for renditions in Post.objects.exclude(renditions='').values_list(
+        'renditions', flat=True
+    ).iterator():
+        refs.update({
+            path.split('/')[2]
+            for formats in json.loads(renditions).values()
+            for path in formats.values()
+        })
+    ThumbnailSet.objects.bulk_create(
+        ThumbnailSet(digest=digest, refs=count)
+        for digest, count in refs.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_drop_thumbnail_kvstore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThumbnailSet',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('refs', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.6 on 2026-10-18 19:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_pulled(apps, schema_editor):
+    # До этой миграции режим определялся числом подписчиков при чтении.
+    ProfileStats = apps.get_model('posts', 'ProfileStats')
+    ProfileStats.objects.filter(
+        followers_count__gt=settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+    ).update(timeline_pulled=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_thumbnail_set'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profilestats',
+            name='timeline_pulled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_pulled, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,10 @@
+import json
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 User = get_user_model()
 
@@ -28,12 +33,65 @@ class Post(models.Model):
         null=True,
         related_name="posts")
     image = models.ImageField(upload_to="posts/", blank=True, null=True)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Пути готовых превью картинки в JSON, см. posts.thumbnails.
+    renditions = models.TextField(blank=True, default="", editable=False)
 
     def __str__(self):
         return self.text[:15]
 
+    @cached_property
+    def thumbnails(self):
+        """URL превью: {"feed": {"jpg": ..., "webp": ...}, ...}."""
+        if not self.renditions:
+            return {}
+        return {
+            name: {
+                extension: default_storage.url(path)
+                for extension, path in formats.items()
+            }
+            for name, formats in json.loads(self.renditions).items()
+        }
+
+    # Эти поля меняют только UPDATE из posts.counters и posts.thumbnails.
+    # Полное сохранение загруженного поста их не пишет: иначе значения,
+    # прочитанные до нового комментария или сборки превью, затрут
+    # настоящие.
+    DERIVED_FIELDS = ("comment_count", "renditions")
+
+    def save(self, *args, **kwargs):
+        if (
+            not args
+            and not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.DERIVED_FIELDS
+            ]
+        # Счётчики обновляются в post_save: держим их в одной транзакции
+        # с самой записью.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         ordering = ("-pub_date",)
+        indexes = [
+            models.Index(
+                fields=("-pub_date", "-id"),
+                name="post_pub_date"
+            ),
+            models.Index(
+                fields=("author", "-pub_date", "-id"),
+                name="post_author_pub_date"
+            ),
+            models.Index(
+                fields=("group", "-pub_date", "-id"),
+                name="post_group_pub_date"
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -53,8 +111,18 @@ class Comment(models.Model):
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         ordering = ("-created",)
+        indexes = [
+            models.Index(
+                fields=("post", "-created", "-id"),
+                name="comment_post_created_id"
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -69,6 +137,10 @@ class Follow(models.Model):
         null=True,
         related_name="following")
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -76,3 +148,171 @@ class Follow(models.Model):
                 name="unique_list"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=("author", "user"),
+                name="follow_author_user"
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline")
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries")
+    pub_date = models.DateTimeField("date published")
+
+    class Meta:
+        ordering = ("-pub_date",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "post"),
+                name="unique_timeline_entry"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=("user", "-pub_date", "-post"),
+                name="timeline_user_pub_date"
+            )
+        ]
+
+
+class ProfileStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats")
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    # Посты автора подмешиваются в ленты при чтении, а не раскладываются
+    # (posts.timeline).
+    timeline_pulled = models.BooleanField(default=False)
+
+
+class SearchTerm(models.Model):
+    """Вхождение слова в пост для поиска без FTS5 (posts.search)."""
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="search_terms")
+    weight = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=("term", "post"),
+                name="unique_search_term"
+            )
+        ]
+
+
+class FollowSuggestion(models.Model):
+    """Автор, которого стоит почитать пользователю (posts.graph).
+
+    score — сколько авторов из подписок пользователя подписаны на него.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="follow_suggestions")
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+")
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "author"),
+                name="unique_follow_suggestion"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=("user", "-score"),
+                name="follow_suggestion_user_score"
+            )
+        ]
+
+
+class ImageBlob(models.Model):
+    """Файл картинки, общий для постов с одинаковой картинкой.
+
+    refs — сколько постов на него ссылается, см. posts.images.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    refs = models.PositiveIntegerField(default=0)
+    size = models.PositiveIntegerField()
+
+    def __str__(self):
+        return self.name
+
+
+class ThumbnailSet(models.Model):
+    """Превью одной исходной картинки, общие для постов с ней.
+
+    digest — sha256 исходника из путей превью, refs — сколько постов
+    ссылается на превью, см. posts.thumbnails.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
+    refs = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.digest
+
+
+class Task(models.Model):
+    """Отложенная работа после записи, см. posts.tasks.
+
+    key — ключ идемпотентности: пока задача с ключом ждёт в очереди,
+    такая же задача второй раз не ставится.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUSES = (
+        (QUEUED, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (FAILED, "Не выполнена"),
+    )
+
+    name = models.CharField(max_length=100)
+    args = models.TextField(default="[]")
+    key = models.CharField(max_length=200, blank=True, null=True)
+    status = models.CharField(
+        max_length=10, choices=STATUSES, default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default="")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=("key",),
+                condition=models.Q(status="queued"),
+                name="unique_queued_task_key"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=("status", "run_after"),
+                name="task_status_run_after"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.name}{self.args}"
@@ -0,0 +1,224 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+NEXT = "n"
+PREVIOUS = "p"
+# Больше целого в SQLite не бывает: такой id из курсора или OFFSET
+# страницы переполнил бы запрос.
+MAX_PK = 2 ** 63 - 1
+
+
+def encode_key(direction, moment, pk):
+    raw = f"{direction}|{moment.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def encode_cursor(direction, post):
+    return encode_key(direction, post.pub_date, post.pk)
+
+
+def decode_cursor(cursor):
+    """Возвращает (направление, pub_date, pk) или None для мусора."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split("|")
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None
+    if not 0 < pk <= MAX_PK:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage(Page):
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return "<Cursor page>"
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по (pub_date, id) без OFFSET.
+
+    Страница выбирается условием по ключу последней показанной записи,
+    поэтому глубокие страницы стоят столько же, сколько первая. Общее
+    количество записей считается, только если with_count=True и
+    шаблон к нему обращается.
+    """
+    keyset = True
+
+    def __init__(self, object_list, per_page, with_count=True):
+        super().__init__(
+            object_list.order_by("-pub_date", "-pk"), per_page
+        )
+        self.with_count = with_count
+
+    @cached_property
+    def count(self):
+        if not self.with_count:
+            return None
+        return super().count
+
+    def get_page(self, cursor):
+        decoded = decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            return self._page_after(None)
+        direction, pub_date, pk = decoded
+        if direction == PREVIOUS:
+            return self._page_before(pub_date, pk)
+        return self._page_after((pub_date, pk))
+
+    def _page_after(self, key):
+        items = self.object_list
+        if key is not None:
+            pub_date, pk = key
+            items = items.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )
+        items = list(items[:self.per_page + 1])
+        has_next = len(items) > self.per_page
+        items = items[:self.per_page]
+        return self._build_page(items, has_next, key is not None)
+
+    def _page_before(self, pub_date, pk):
+        items = self.object_list.filter(
+            Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+        ).reverse()
+        items = list(items[:self.per_page + 1])
+        has_previous = len(items) > self.per_page
+        items = items[:self.per_page][::-1]
+        if not items:
+            return self._page_after(None)
+        return self._build_page(items, True, has_previous)
+
+    def _build_page(self, items, has_next, has_previous):
+        next_cursor = previous_cursor = None
+        if items and has_next:
+            next_cursor = encode_cursor(NEXT, items[-1])
+        if items and has_previous:
+            previous_cursor = encode_cursor(PREVIOUS, items[0])
+        return CursorPage(items, self, next_cursor, previous_cursor)
+
+
+class WindowPaginator(Paginator):
+    """Пагинатор с номерами страниц только вокруг текущей.
+
+    elided_page_range даёт первую и последнюю страницы и по window
+    страниц с каждой стороны от текущей, пропуски обозначены ELLIPSIS.
+    С count_limit COUNT(*) считает строки не дальше
+    max(count_limit, конец окна за текущей страницей): на больших
+    таблицах count тогда — нижняя оценка, count_exact равен False,
+    а номер последней страницы не показывается. Оценка всё равно
+    покрывает окно за текущей страницей, поэтому has_next() верен и
+    листать можно до конца ленты.
+    """
+    ELLIPSIS = "…"
+
+    def __init__(self, object_list, per_page, count_limit=None,
+                 window=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_limit = count_limit
+        self.window = window or settings.PAGINATION_WINDOW
+        self.count_exact = True
+        self.requested = 1
+
+    def set_requested(self, number):
+        """Запоминает номер страницы из запроса, по нему count_bound
+        решает, сколько строк считать.
+
+        Номер ограничен только так, чтобы LIMIT и OFFSET помещались в
+        целое SQLite: ?page=10**20 ведёт на последнюю страницу.
+        """
+        try:
+            self.requested = max(int(number), 1)
+        except (TypeError, ValueError):
+            pass
+        self.requested = min(
+            self.requested, MAX_PK // self.per_page - self.window - 1
+        )
+        return self.requested
+
+    def get_page(self, number):
+        self.set_requested(number)
+        return super().get_page(number)
+
+    def count_bound(self):
+        """Сколько строк достаточно, чтобы показать окно страниц."""
+        return max(
+            self.count_limit,
+            (self.requested + self.window) * self.per_page + 1,
+        )
+
+    @cached_property
+    def count(self):
+        if self.count_limit is None:
+            return super().count
+        bound = self.count_bound()
+        count = self.object_list[:bound].count()
+        self.count_exact = count < bound
+        return count
+
+    def make_page(self, object_list, number):
+        """Страница из уже выбранных записей, например из кэша.
+
+        Обычный Page: номера страниц для шаблона в атрибуте page_links.
+        """
+        page = Page(object_list, number, self)
+        page.page_links = list(self.elided_page_range(number))
+        return page
+
+    def _get_page(self, object_list, number, paginator):
+        return self.make_page(object_list, number)
+
+    def elided_page_range(self, number):
+        window = self.window
+        last = self.num_pages
+        # Многоточие заменяет не меньше двух страниц, как в Django 3.2.
+        if number - window > 3:
+            yield 1
+            yield self.ELLIPSIS
+            yield from range(number - window, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if not self.count_exact:
+            yield from range(number + 1, min(number + window, last) + 1)
+            yield self.ELLIPSIS
+        elif number + window < last - 2:
+            yield from range(number + 1, number + window + 1)
+            yield self.ELLIPSIS
+            yield last
+        else:
+            yield from range(number + 1, last + 1)
+
+
+def get_page(request, object_list, per_page=None):
+    """Страница постов в режиме пагинации из settings.PAGINATION_MODE."""
+    per_page = per_page or settings.ELEMENTS_PAGINATOR
+    if settings.PAGINATION_MODE == "cursor":
+        paginator = CursorPaginator(
+            object_list, per_page, with_count=settings.PAGINATION_COUNT
+        )
+        return paginator.get_page(request.GET.get("cursor"))
+    paginator = WindowPaginator(
+        object_list, per_page, count_limit=settings.PAGINATION_COUNT_LIMIT
+    )
+    return paginator.get_page(request.GET.get("page"))
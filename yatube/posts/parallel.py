@@ -0,0 +1,134 @@
+"""Параллельное выполнение независимых запросов к базе.
+
+Django 2.2 не умеет асинхронных представлений, поэтому представления
+из posts.views принимают стратегию strategy: как выбирать страницу
+(paginate) и как выполнять независимые запросы (gather). SEQUENTIAL
+выполняет их по очереди, PARALLEL отдаёт пулу потоков: у каждого
+потока своё соединение с базой, а SQLite в режиме WAL читает в
+нескольких соединениях одновременно. PARALLEL получают URL, имена
+которых перечислены в PARALLEL_VIEWS, см. switchable.
+"""
+import contextvars
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+
+from . import paginators
+from .paginators import CursorPaginator, WindowPaginator
+
+Strategy = namedtuple("Strategy", ("paginate", "gather"))
+
+_executor = None
+_in_worker = contextvars.ContextVar("parallel_in_worker", default=False)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PARALLEL_QUERY_WORKERS,
+            thread_name_prefix="queries",
+        )
+    return _executor
+
+
+def _run(call, wrappers):
+    # Соединение потока пула живёт, пока жив поток: потоков не больше
+    # PARALLEL_QUERY_WORKERS, и новое соединение на каждый вызов стоило
+    # бы дороже самого запроса. Закрывается только сломанное.
+    if connection.errors_occurred:
+        if connection.is_usable():
+            connection.errors_occurred = False
+        else:
+            connection.close()
+    # Обёртки execute_wrapper (метрики, журнал запросов) стоят на
+    # соединении вызывающего потока; повторяем их на соединении пула.
+    _in_worker.set(True)
+    with ExitStack() as stack:
+        for wrapper in wrappers:
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        return call()
+
+
+def sequential(*calls):
+    """Результаты вызовов по очереди, в текущем потоке."""
+    return [call() for call in calls]
+
+
+def gather(*calls):
+    """Результаты вызовов в том же порядке.
+
+    Внутри транзакции другие соединения не видят её изменений, поэтому
+    там, как и без PARALLEL_QUERY_WORKERS, вызовы идут по очереди. Так
+    же и в потоках пула: ожидание пула из пула может занять все потоки.
+    """
+    if (
+        len(calls) < 2
+        or not settings.PARALLEL_QUERY_WORKERS
+        or connection.in_atomic_block
+        or _in_worker.get()
+    ):
+        return sequential(*calls)
+    wrappers = list(connection.execute_wrappers)
+    futures = [
+        _get_executor().submit(
+            contextvars.copy_context().run, _run, call, wrappers
+        )
+        for call in calls
+    ]
+    return [future.result() for future in futures]
+
+
+def get_page(request, object_list, per_page=None):
+    """Как paginators.get_page, но COUNT(*) идёт параллельно со строками."""
+    per_page = per_page or settings.ELEMENTS_PAGINATOR
+    if settings.PAGINATION_MODE == "cursor":
+        paginator = CursorPaginator(
+            object_list, per_page, with_count=settings.PAGINATION_COUNT
+        )
+        page, _ = gather(
+            lambda: paginator.get_page(request.GET.get("cursor")),
+            lambda: paginator.count,
+        )
+        return page
+    paginator = WindowPaginator(
+        object_list, per_page, count_limit=settings.PAGINATION_COUNT_LIMIT
+    )
+    try:
+        number = int(request.GET.get("page") or 1)
+    except ValueError:
+        number = 1
+    if number < 1:
+        return paginator.get_page(number)
+    number = paginator.set_requested(number)
+    bottom = (number - 1) * per_page
+    _, posts = gather(
+        lambda: paginator.count,
+        lambda: list(object_list[bottom:bottom + per_page]),
+    )
+    if not posts and number > 1:
+        # Номер за последней страницей: Paginator вернёт последнюю,
+        # количество у него уже посчитано.
+        return paginator.get_page(number)
+    return paginator.make_page(posts, number)
+
+
+SEQUENTIAL = Strategy(paginators.get_page, sequential)
+PARALLEL = Strategy(get_page, gather)
+
+
+def switchable(view):
+    """Представление URL, которое получает strategy=PARALLEL, если имя
+    URL перечислено в PARALLEL_VIEWS.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        match = request.resolver_match
+        if match is not None and match.url_name in settings.PARALLEL_VIEWS:
+            kwargs["strategy"] = PARALLEL
+        return view(request, *args, **kwargs)
+    return wrapper
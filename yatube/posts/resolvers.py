@@ -0,0 +1,71 @@
+"""Пост по адресу /<username>/<post_id>/... одним запросом.
+
+Пост выбирается вместе с автором, его счётчиками и группой. Пост
+определяется по post_id, а username в адресе только повторяет имя
+автора: если оно устарело (автор переименован) или неверно, GET и HEAD
+получают постоянный редирект на канонический адрес, а остальные методы
+обрабатываются как обычно.
+"""
+from functools import partial, wraps
+
+from django.http import Http404, HttpResponsePermanentRedirect
+from django.urls import reverse
+
+from .models import Post
+from .parallel import SEQUENTIAL
+
+
+def post_queryset(post_id):
+    return Post.objects.select_related("author__stats", "group").filter(
+        pk=post_id, author__isnull=False
+    )
+
+
+def find_post(post_id):
+    """Пост с автором и группой или None."""
+    return post_queryset(post_id).first()
+
+
+def canonical_redirect(request, post, username):
+    """Редирект на адрес с настоящим именем автора или None."""
+    if post.author.username == username or request.method not in (
+        "GET", "HEAD"
+    ):
+        return None
+    match = request.resolver_match
+    url = reverse(
+        match.view_name,
+        args=match.args,
+        kwargs={**match.kwargs, "username": post.author.username},
+    )
+    query = request.META.get("QUERY_STRING")
+    return HttpResponsePermanentRedirect(f"{url}?{query}" if query else url)
+
+
+def resolved_post(view=None, *, along=None):
+    """Передаёт представлению пост вместо username и post_id из адреса.
+
+    along(request, post_id) — запрос, которому пост не нужен: стратегия
+    из posts.parallel выполняет его вместе с выборкой поста, а результат
+    передаётся представлению аргументом после поста.
+    """
+    if view is None:
+        return partial(resolved_post, along=along)
+
+    @wraps(view)
+    def wrapper(request, username, post_id, *args, strategy=SEQUENTIAL,
+                **kwargs):
+        if along is None:
+            post = find_post(post_id)
+        else:
+            post, extra = strategy.gather(
+                lambda: find_post(post_id), lambda: along(request, post_id)
+            )
+            args = (extra, *args)
+        if post is None:
+            raise Http404
+        response = canonical_redirect(request, post, username)
+        if response is not None:
+            return response
+        return view(request, post, *args, **kwargs)
+    return wrapper
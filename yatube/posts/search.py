@@ -0,0 +1,289 @@
+"""Полнотекстовый поиск по постам и комментариям к ним.
+
+Индекс обновляется сигналами из posts.signals. Если SQLite собран с
+FTS5, документы лежат в виртуальной таблице posts_search (её создаёт
+миграция 0007), иначе — в инвертированном индексе SearchTerm, который
+строится на Python. Новый или удалённый комментарий меняет только свои
+слова в индексе поста (add_comment, remove_comment): остальные
+комментарии из базы не читаются и заново не разбираются.
+
+Ранжируются только SEARCH_CANDIDATES самых новых совпадений, поэтому
+время поиска не растёт вместе с таблицей постов. К релевантности
+добавляется дата публикации: пост на SEARCH_RECENCY_SCALE секунд
+новее получает +1 к оценке.
+"""
+import base64
+import binascii
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Max
+
+from .feeds import feed_queryset
+from .models import Comment, Post, SearchTerm
+
+FTS_TABLE = "posts_search"
+# Слово в тексте поста весит больше, чем слово в комментарии.
+TEXT_WEIGHT = 2
+COMMENT_WEIGHT = 1
+MAX_TERM_LENGTH = 64
+# Насыщение частоты слова, как в BM25.
+K1 = 1.2
+WORD = re.compile(r"\w+")
+
+_fts_available = None
+
+
+def tokenize(text):
+    """Слова в нижнем регистре без диакритики, как у unicode61 в FTS5."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(
+        char for char in decomposed if not unicodedata.combining(char)
+    )
+    return [
+        word for word in WORD.findall(stripped)
+        if len(word) <= MAX_TERM_LENGTH
+    ]
+
+
+def use_fts():
+    global _fts_available
+    if settings.SEARCH_BACKEND != "auto":
+        return settings.SEARCH_BACKEND == "fts5"
+    if _fts_available is None:
+        _fts_available = FTS_TABLE in connection.introspection.table_names()
+    return _fts_available
+
+
+def index_post(post_id):
+    """Переиндексирует пост вместе с его комментариями."""
+    row = Post.objects.filter(pk=post_id).values_list(
+        "text", "pub_date"
+    ).first()
+    if row is None:
+        remove_post(post_id)
+        return
+    text, pub_date = row
+    text = tokenize(text)
+    comments = tokenize(" ".join(
+        Comment.objects.filter(post_id=post_id).values_list("text", flat=True)
+    ))
+    if use_fts():
+        # В FTS5 попадают уже нормализованные слова: unicode61 не
+        # сводит «ё» к «е», а запросы проходят через tokenize().
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id]
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, text, comments, pub_date) "
+                "VALUES (%s, %s, %s, %s)",
+                [post_id, " ".join(text), " ".join(comments),
+                 pub_date.timestamp()],
+            )
+        return
+    weights = Counter()
+    for term in text:
+        weights[term] += TEXT_WEIGHT
+    for term in comments:
+        weights[term] += COMMENT_WEIGHT
+    SearchTerm.objects.filter(post_id=post_id).delete()
+    SearchTerm.objects.bulk_create(
+        [
+            SearchTerm(term=term, post_id=post_id, weight=weight)
+            for term, weight in weights.items()
+        ],
+        batch_size=500,
+    )
+
+
+def _by_count(terms):
+    """Слова, сгруппированные по числу повторов: по UPDATE на группу."""
+    groups = defaultdict(list)
+    for term, count in Counter(terms).items():
+        groups[count].append(term)
+    return groups.items()
+
+
+def add_comment(post_id, text):
+    """Добавляет слова нового комментария в индекс поста."""
+    terms = tokenize(text)
+    if not terms:
+        return
+    if use_fts():
+        # FTS5 сам разбирает строку документа; Comment не читается.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {FTS_TABLE} SET comments = comments || ' ' || %s "
+                "WHERE rowid = %s",
+                [" ".join(terms), post_id],
+            )
+        return
+    with transaction.atomic():
+        SearchTerm.objects.bulk_create(
+            [
+                SearchTerm(term=term, post_id=post_id, weight=0)
+                for term in set(terms)
+            ],
+            ignore_conflicts=True,
+        )
+        for count, group in _by_count(terms):
+            SearchTerm.objects.filter(post_id=post_id, term__in=group).update(
+                weight=F("weight") + count * COMMENT_WEIGHT
+            )
+
+
+def remove_comment(post_id, text):
+    """Убирает слова удалённого комментария из индекса поста."""
+    terms = tokenize(text)
+    if not terms:
+        return
+    if use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT comments FROM {FTS_TABLE} WHERE rowid = %s",
+                [post_id],
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return
+            words = row[0].split()
+            size = len(terms)
+            for start in range(len(words) - size + 1):
+                if words[start:start + size] == terms:
+                    del words[start:start + size]
+                    break
+            else:
+                return
+            cursor.execute(
+                f"UPDATE {FTS_TABLE} SET comments = %s WHERE rowid = %s",
+                [" ".join(words), post_id],
+            )
+        return
+    with transaction.atomic():
+        for count, group in _by_count(terms):
+            delta = count * COMMENT_WEIGHT
+            matched = SearchTerm.objects.filter(
+                post_id=post_id, term__in=group
+            )
+            # Сначала удаляются слова, которые были только в комментарии,
+            # иначе уменьшенный вес попал бы под удаление.
+            matched.filter(weight__lte=delta).delete()
+            matched.update(weight=F("weight") - delta)
+
+
+def remove_post(post_id):
+    if use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id]
+            )
+    else:
+        SearchTerm.objects.filter(post_id=post_id).delete()
+
+
+def rebuild():
+    """Строит индекс заново для всех постов; возвращает их число."""
+    if use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    else:
+        SearchTerm.objects.all().delete()
+    count = 0
+    for post_id in Post.objects.values_list("pk", flat=True).iterator():
+        index_post(post_id)
+        count += 1
+    return count
+
+
+def _fts_candidates(terms):
+    # Слова уже состоят только из \w, кавычки защищают от синтаксиса FTS5.
+    query = " ".join(f'"{term}"' for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, -bm25({FTS_TABLE}, %s, %s), pub_date "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            "ORDER BY rowid DESC LIMIT %s",
+            [TEXT_WEIGHT, COMMENT_WEIGHT, query, settings.SEARCH_CANDIDATES],
+        )
+        return cursor.fetchall()
+
+
+def _python_candidates(terms):
+    terms = set(terms)
+    matches = SearchTerm.objects.filter(term__in=terms)
+    ids = list(
+        matches.values("post").annotate(matched=Count("term"))
+        .filter(matched=len(terms))
+        .order_by(F("post").desc())
+        .values_list("post", flat=True)[:settings.SEARCH_CANDIDATES]
+    )
+    if not ids:
+        return []
+    # Номер последнего поста вместо COUNT(*) — оценка числа документов.
+    total = Post.objects.aggregate(total=Max("pk"))["total"] or 1
+    frequencies = dict(
+        matches.values("term").annotate(count=Count("pk"))
+        .values_list("term", "count")
+    )
+    relevance = Counter()
+    for post_id, term, weight in matches.filter(post__in=ids).values_list(
+        "post", "term", "weight"
+    ):
+        frequency = frequencies[term]
+        idf = math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+        relevance[post_id] += idf * weight * (K1 + 1) / (weight + K1)
+    dates = Post.objects.filter(pk__in=ids).values_list("pk", "pub_date")
+    return [
+        (post_id, relevance[post_id], pub_date.timestamp())
+        for post_id, pub_date in dates
+    ]
+
+
+def encode_cursor(score, post_id):
+    raw = f"{score!r}|{post_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Возвращает (оценка, id поста) или None для мусора."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        score, post_id = raw.split("|")
+        return float(score), int(post_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def search(query, cursor=None, per_page=None):
+    """Посты страницы результатов и курсор следующей страницы."""
+    per_page = per_page or settings.ELEMENTS_PAGINATOR
+    terms = tokenize(query)
+    if not terms:
+        return [], None
+    candidates = _fts_candidates(terms) if use_fts() else (
+        _python_candidates(terms)
+    )
+    ranked = sorted(
+        (
+            (relevance + pub_date / settings.SEARCH_RECENCY_SCALE, post_id)
+            for post_id, relevance, pub_date in candidates
+        ),
+        reverse=True,
+    )
+    after = decode_cursor(cursor) if cursor else None
+    if after is not None:
+        ranked = [item for item in ranked if item < after]
+    ranked_page = ranked[:per_page]
+    next_cursor = None
+    if len(ranked) > per_page:
+        next_cursor = encode_cursor(*ranked_page[-1])
+    posts = feed_queryset(
+        Post.objects.filter(pk__in=[post_id for _, post_id in ranked_page])
+    ).in_bulk()
+    return [posts[post_id] for _, post_id in ranked_page], next_cursor
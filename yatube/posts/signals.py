@@ -0,0 +1,188 @@
+from django.conf import settings
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import caching, counters, graph, images, search, tasks, thumbnails
+from .models import (Comment, Follow, FollowSuggestion, Group, Post,
+                     ProfileStats, User)
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, raw=False, update_fields=None,
+                      **kwargs):
+    if update_fields and set(update_fields) == {"last_login"}:
+        return
+    if instance.pk and not raw:
+        instance._previous_username = User.objects.filter(
+            pk=instance.pk
+        ).values_list("username", flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if created and not raw:
+        ProfileStats.objects.get_or_create(user=instance)
+    if update_fields and set(update_fields) == {"last_login"}:
+        return
+    caching.bump(f"user:{instance.pk}")
+    caching.forget_authors(instance.pk)
+    previous = getattr(instance, "_previous_username", None)
+    if previous is not None and previous != instance.username:
+        tasks.enqueue("caching.bump_user_pages", instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    caching.bump(f"user:{instance.pk}")
+    caching.forget_authors(instance.pk)
+
+
+def _bump_post(post, previous_group_id=None):
+    caching.bump(
+        f"post:{post.pk}",
+        f"feed:{caching.INDEX_FEED}",
+        f"feed:{caching.profile_feed(post.author_id)}",
+        f"feed:{caching.group_feed(post.group_id)}",
+        f"feed:{caching.group_feed(previous_group_id)}",
+        *caching.post_pages(post.author_id, post.group_id, previous_group_id),
+    )
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous(sender, instance, raw=False, **kwargs):
+    if not instance.pk or raw:
+        return
+    previous = Post.objects.filter(pk=instance.pk).values_list(
+        "group_id", "image", "renditions"
+    ).first()
+    if previous is None:
+        return
+    (instance._previous_group_id, instance._previous_image,
+     instance._previous_renditions) = previous
+    if instance._previous_image != (instance.image.name or ""):
+        # Старые превью не подходят к новой картинке; в базе их
+        # стирает post_saved: save() поле renditions не пишет.
+        instance.renditions = ""
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    _bump_post(instance, getattr(instance, "_previous_group_id", None))
+    tasks.enqueue("search.index_post", instance.pk)
+    previous_image = getattr(instance, "_previous_image", "")
+    if (instance.image.name or "") != (previous_image or ""):
+        images.acquire(instance.image.name)
+        images.release(previous_image)
+        if not created:
+            Post.objects.filter(pk=instance.pk).update(renditions="")
+        tasks.enqueue("thumbnails.build", instance.pk)
+        thumbnails.release(thumbnails.paths_of(
+            getattr(instance, "_previous_renditions", "")
+        ))
+    if not created:
+        return
+    counters.change_profile(instance.author_id, "posts_count", 1)
+    caching.forget_authors(instance.author_id)
+    caching.bump(f"stats:{instance.author_id}")
+    if settings.TIMELINE_FANOUT:
+        tasks.enqueue("timeline.fan_out", instance.pk)
+
+
+@receiver(pre_delete, sender=Post)
+def read_renditions(sender, instance, **kwargs):
+    # Превью строятся после сохранения, и у объекта в памяти пути могут
+    # быть старыми.
+    instance.renditions = Post.objects.filter(pk=instance.pk).values_list(
+        "renditions", flat=True
+    ).first() or ""
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _bump_post(instance)
+    tasks.enqueue("search.index_post", instance.pk)
+    thumbnails.release(thumbnails.paths_of(instance.renditions))
+    images.release(instance.image.name)
+    counters.change_profile(instance.author_id, "posts_count", -1)
+    caching.forget_authors(instance.author_id)
+    caching.bump(f"stats:{instance.author_id}")
+
+
+def _bump_comment(comment):
+    if Comment.post.is_cached(comment):
+        author_id, group_id = comment.post.author_id, comment.post.group_id
+    else:
+        author_id, group_id = Post.objects.filter(
+            pk=comment.post_id
+        ).values_list("author_id", "group_id").first() or (None, None)
+    caching.bump(
+        f"post:{comment.post_id}", *caching.post_pages(author_id, group_id)
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    _bump_comment(instance)
+    if created:
+        counters.change_comments(instance.post_id, 1)
+        # Слова добавляются сразу, а не задачей: очередь склеивает
+        # одинаковые задачи, а два одинаковых комментария — не одно.
+        search.add_comment(instance.post_id, instance.text)
+    else:
+        # Старый текст уже перезаписан; правки редки, пост
+        # переиндексируется целиком.
+        tasks.enqueue("search.index_post", instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comments(instance.post_id, -1)
+    _bump_comment(instance)
+    search.remove_comment(instance.post_id, instance.text)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    caching.bump(
+        f"group:{instance.pk}",
+        f"feed:{caching.group_feed(instance.pk)}",
+    )
+    tasks.enqueue("caching.bump_group_pages", instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    counters.change_profile(instance.author_id, "followers_count", 1)
+    counters.change_profile(instance.user_id, "following_count", 1)
+    caching.forget_authors(instance.author_id, instance.user_id)
+    graph.forget(instance.author_id, instance.user_id)
+    caching.bump(f"stats:{instance.author_id}", f"stats:{instance.user_id}")
+    FollowSuggestion.objects.filter(
+        user=instance.user_id, author=instance.author_id
+    ).delete()
+    if settings.TIMELINE_FANOUT:
+        tasks.enqueue(
+            "timeline.sync_follow", instance.user_id, instance.author_id
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_profile(instance.author_id, "followers_count", -1)
+    counters.change_profile(instance.user_id, "following_count", -1)
+    caching.forget_authors(instance.author_id, instance.user_id)
+    graph.forget(instance.author_id, instance.user_id)
+    caching.bump(f"stats:{instance.author_id}", f"stats:{instance.user_id}")
+    if settings.TIMELINE_FANOUT:
+        tasks.enqueue(
+            "timeline.sync_follow", instance.user_id, instance.author_id
+        )
@@ -0,0 +1,180 @@
+"""Очередь работы, которая выполняется после записи.
+
+Сигналы posts.signals отдают сюда то, без чего ответ на запрос не
+нужен: поисковый индекс, раскладку постов по лентам, превью. enqueue
+пишет строку Task в той же транзакции, что и сама запись: воркер
+(manage.py run_tasks) увидит её только после коммита, а при откате
+задача пропадёт вместе с записью. С TASKS_EAGER (так работают тесты)
+задача выполняется сразу, внутри транзакции записи.
+
+Пока задача ждёт в очереди, такая же (с тем же ключом) второй раз не
+ставится: десять комментариев подряд переиндексируют пост один раз.
+Поэтому задачи идемпотентны и читают состояние из базы при выполнении.
+Упавшая задача повторяется через TASKS_RETRY_DELAY * 2 ** (попытка - 1)
+секунд, после TASKS_MAX_ATTEMPTS попыток остаётся со статусом failed.
+"""
+import json
+import logging
+import multiprocessing
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, connections, transaction
+from django.utils import timezone
+
+from . import caching, search, thumbnails, timeline
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+_eager = {}
+
+
+def register(name, function, eager=None):
+    """Регистрирует задачу; eager вместо function выполняется при
+    TASKS_EAGER.
+    """
+    TASKS[name] = function
+    _eager[name] = eager or function
+
+
+def enqueue(name, *args, key=None):
+    """Ставит задачу name(*args); key по умолчанию — имя и аргументы."""
+    if name not in TASKS:
+        raise KeyError(f"Неизвестная задача {name}")
+    if settings.TASKS_EAGER:
+        _eager[name](*args)
+        return
+    payload = json.dumps(args)
+    Task.objects.bulk_create(
+        [Task(name=name, args=payload, key=key or f"{name}:{payload}")],
+        ignore_conflicts=True,
+    )
+
+
+def _ready(limit, now):
+    return list(
+        Task.objects.select_for_update(skip_locked=True).filter(
+            status=Task.QUEUED, run_after__lte=now
+        ).order_by("run_after", "pk").values_list("pk", flat=True)[:limit]
+    )
+
+
+def _take(ids, now):
+    # SQLite не блокирует строки в select_for_update, и одни и те же id
+    # могут прочитать два воркера. Задача достаётся тому, чей UPDATE
+    # застал её ещё в очереди.
+    return [
+        task_id for task_id in ids
+        if Task.objects.filter(pk=task_id, status=Task.QUEUED).update(
+            status=Task.RUNNING, locked_at=now
+        )
+    ]
+
+
+def claim(limit):
+    """Помечает выполняемыми до limit готовых задач и возвращает их id."""
+    now = timezone.now()
+    with transaction.atomic():
+        return _take(_ready(limit, now), now)
+
+
+def _requeue(task_id, **fields):
+    try:
+        with transaction.atomic():
+            Task.objects.filter(pk=task_id).update(
+                status=Task.QUEUED, locked_at=None, **fields
+            )
+    except IntegrityError:
+        # Такая же задача уже снова в очереди и сделает ту же работу.
+        Task.objects.filter(pk=task_id).delete()
+
+
+def fail(task, error):
+    attempts = task.attempts + 1
+    if attempts >= settings.TASKS_MAX_ATTEMPTS:
+        logger.error("Задача %s не выполнена: %s", task, error)
+        Task.objects.filter(pk=task.pk).update(
+            status=Task.FAILED, attempts=attempts, locked_at=None,
+            last_error=error,
+        )
+        return
+    delay = settings.TASKS_RETRY_DELAY * 2 ** (attempts - 1)
+    _requeue(
+        task.pk,
+        attempts=attempts,
+        last_error=error,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def execute(task_id):
+    """Выполняет задачу; True, если она выполнена и удалена."""
+    task = Task.objects.filter(pk=task_id).first()
+    if task is None:
+        return False
+    try:
+        TASKS[task.name](*json.loads(task.args))
+    except Exception:
+        fail(task, traceback.format_exc())
+        return False
+    Task.objects.filter(pk=task_id).delete()
+    return True
+
+
+def release_stale():
+    """Возвращает в очередь задачи воркеров, которые упали посреди
+    выполнения.
+    """
+    deadline = timezone.now() - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    stale = list(Task.objects.filter(
+        status=Task.RUNNING, locked_at__lt=deadline
+    ).values_list("pk", flat=True))
+    for task_id in stale:
+        _requeue(task_id)
+    return len(stale)
+
+
+def work(batch_size=10, once=False, poll_interval=None):
+    """Выполняет задачи очереди и возвращает число выполненных.
+
+    С once работа заканчивается, когда готовых задач не осталось.
+    """
+    poll_interval = poll_interval or settings.TASKS_POLL_INTERVAL
+    done = 0
+    while True:
+        ids = claim(batch_size)
+        for task_id in ids:
+            done += execute(task_id)
+        if not ids:
+            if once:
+                return done
+            connection.close()
+            time.sleep(poll_interval)
+
+
+def _work_in_process(options):
+    try:
+        return work(**options)
+    finally:
+        connection.close()
+
+
+def work_in_processes(processes, **options):
+    """work() в processes процессах; задачи они делят через claim()."""
+    # Соединение родителя нельзя использовать в дочерних процессах.
+    connections.close_all()
+    with multiprocessing.get_context("fork").Pool(processes) as pool:
+        return sum(pool.map(_work_in_process, [options] * processes))
+
+
+register("caching.bump_user_pages", caching.bump_user_pages)
+register("caching.bump_group_pages", caching.bump_group_pages)
+register("search.index_post", search.index_post)
+register("timeline.fan_out", timeline.fan_out)
+register("timeline.sync_follow", timeline.sync_follow)
+# Без очереди превью строятся после коммита: thumbnails.schedule.
+register("thumbnails.build", thumbnails.build, eager=thumbnails.schedule)
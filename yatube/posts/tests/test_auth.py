@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import auth
+
+User = get_user_model()
+
+PASSWORD = "Пароль-123"
+
+
+class CachedAuthenticationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username="reader", password=PASSWORD
+        )
+
+    def setUp(self):
+        cache.clear()
+        auth.clear()
+        self.client = Client()
+        self.client.login(username="reader", password=PASSWORD)
+
+    def user_of(self, client):
+        response = client.get(reverse("index"))
+        return response.wsgi_request.user
+
+    def test_repeated_requests_do_not_load_session_or_user(self):
+        self.client.get(reverse("index"))
+        with CaptureQueriesContext(connection) as context:
+            user = self.user_of(self.client)
+        self.assertEqual(user, self.user)
+        for query in context.captured_queries:
+            self.assertNotIn("django_session", query["sql"])
+            self.assertNotIn('WHERE "auth_user"."id"', query["sql"])
+
+    def test_each_request_gets_own_user_object(self):
+        first = self.user_of(self.client)
+        first.username = "changed"
+        self.assertEqual(self.user_of(self.client).username, "reader")
+
+    def test_password_change_ends_other_sessions(self):
+        self.user_of(self.client)
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password("Новый-пароль-456")
+        user.save()
+        self.assertFalse(self.user_of(self.client).is_authenticated)
+
+    def test_logout_invalidates_copied_cookie(self):
+        self.user_of(self.client)
+        copy = Client()
+        copy.cookies[settings.SESSION_COOKIE_NAME] = (
+            self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        )
+        self.assertTrue(self.user_of(copy).is_authenticated)
+        self.client.get(reverse("logout"))
+        self.assertFalse(self.user_of(copy).is_authenticated)
+
+    def test_deleted_user_is_logged_out(self):
+        self.user_of(self.client)
+        User.objects.filter(pk=self.user.pk).delete()
+        self.assertFalse(self.user_of(self.client).is_authenticated)
+
+    def test_entries_expire(self):
+        self.user_of(self.client)
+        User.objects.filter(pk=self.user.pk).update(first_name="Новое")
+        self.assertEqual(self.user_of(self.client).first_name, "")
+        auth.clear()
+        with override_settings(AUTH_USER_CACHE_TIMEOUT=-1):
+            self.user_of(self.client)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertFalse(self.user_of(self.client).is_authenticated)
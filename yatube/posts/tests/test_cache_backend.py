@@ -0,0 +1,65 @@
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from yatube.cache import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(
+            f"{self.directory}/cache.sqlite3",
+            {"OPTIONS": {"CULL_EVERY": 1, **options}},
+        )
+
+    def test_values_are_shared_between_instances(self):
+        """Запись видна другому экземпляру, как другому воркеру."""
+        self.cache.set("feed-page:index", [1, 2, 3])
+        other = self.make_cache()
+        self.assertEqual(other.get("feed-page:index"), [1, 2, 3])
+        other.delete("feed-page:index")
+        self.assertIsNone(self.cache.get("feed-page:index"))
+
+    def test_expired_values_are_missing(self):
+        """Истёкшие записи не возвращаются."""
+        self.cache.set("author:1", "value", timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get("author:1"))
+        self.assertTrue(self.cache.add("author:1", "new"))
+        self.assertFalse(self.cache.add("author:1", "newer"))
+        self.assertEqual(self.cache.get("author:1"), "new")
+
+    def test_stats_by_prefix(self):
+        """Статистика считается по префиксам ключей."""
+        cache = self.make_cache(MAX_ENTRIES=2, CULL_FREQUENCY=2)
+        cache.set_many({"version:a": 1, "version:b": 2})
+        cache.get_many(["version:a", "version:c"])
+        cache.set("author:1", "value")
+        stats = cache.stats()
+        self.assertEqual(stats["version"]["hits"], 1)
+        self.assertEqual(stats["version"]["misses"], 1)
+        evicted = sum(row["evictions"] for row in stats.values())
+        self.assertEqual(evicted, 1)
+
+    def test_cache_stats_command(self):
+        """Команда cache_stats выводит строку для каждого префикса."""
+        with override_settings(CACHES={"default": {
+            "BACKEND": "yatube.cache.SQLiteCache",
+            "LOCATION": f"{self.directory}/command.sqlite3",
+        }}):
+            caches["default"].get("feed-page:index")
+            out = StringIO()
+            call_command("cache_stats", stdout=out)
+        self.assertIn("feed-page", out.getvalue())
@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from .. import caching
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TEXT = "Текст"
+TITLE = "Название"
+NEW_TITLE = "Новое название"
+SLUG = "test-slug"
+
+
+class CachingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="test_user")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(title=TITLE, slug=SLUG)
+        cls.post = Post.objects.create(
+            text=TEXT, author=cls.user, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_cached_index_skips_feed_queries(self):
+        """Повторный запрос главной берёт страницу и фрагменты из кэша."""
+        self.guest_client.get(reverse("index"))
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(reverse("index"))
+        self.assertContains(response, TEXT)
+
+    def test_comment_invalidates_post_fragment(self):
+        """Новый комментарий сразу виден в счётчике на главной."""
+        self.guest_client.get(reverse("index"))
+        Comment.objects.create(post=self.post, author=self.reader, text=TEXT)
+        response = self.guest_client.get(reverse("index"))
+        self.assertContains(response, "Комментариев: 1")
+
+    def test_group_rename_invalidates_fragments(self):
+        """Переименование группы сразу видно в ленте."""
+        self.guest_client.get(reverse("index"))
+        self.group.title = NEW_TITLE
+        self.group.save()
+        response = self.guest_client.get(reverse("index"))
+        self.assertContains(response, NEW_TITLE)
+
+    def test_follow_invalidates_cached_author(self):
+        """Подписка сразу меняет счётчик подписчиков в профиле."""
+        url = reverse("profile", args=[self.user.username])
+        self.guest_client.get(url)
+        Follow.objects.create(user=self.reader, author=self.user)
+        response = self.guest_client.get(url)
+        self.assertEqual(response.context["author"].stats.followers_count, 1)
+
+    def test_fragments_vary_on_viewer(self):
+        """Автор видит ссылку на редактирование, гость — нет."""
+        edit_url = reverse(
+            "post_edit", args=[self.user.username, self.post.pk]
+        )
+        response = self.guest_client.get(reverse("index"))
+        self.assertNotContains(response, edit_url)
+        author_client = Client()
+        author_client.force_login(self.user)
+        response = author_client.get(reverse("index"))
+        self.assertContains(response, edit_url)
+
+    def test_page_numbers_share_cache_entries(self):
+        """«1», «01» и мусор в ?page= читают одну запись кэша."""
+        self.guest_client.get(reverse("index"))
+        for number in ("01", "abc", "1"):
+            with self.subTest(number=number):
+                with self.assertNumQueries(1):
+                    self.guest_client.get(reverse("index"), {"page": number})
+
+    def test_cached_author_has_no_password(self):
+        """В общий кэш попадают только поля, нужные страницам."""
+        user = User.objects.create_user(
+            username="writer", password="Пароль-123"
+        )
+        Post.objects.create(text=TEXT, author=user)
+        url = reverse("profile", args=[user.username])
+        self.guest_client.get(url)
+        cached = cache.get(f"author:{user.pk}")
+        self.assertIn(user.username, cached)
+        self.assertNotIn(user.password, cached)
+        response = self.guest_client.get(url)
+        self.assertEqual(response.context["author"], user)
+        self.assertEqual(response.context["author"].stats.posts_count, 1)
+
+
+class CommitTests(TransactionTestCase):
+    def test_versions_change_again_after_commit(self):
+        """Версия, прочитанная до COMMIT, после него уже не годится."""
+        with transaction.atomic():
+            caching.bump("post:1")
+            before_commit = caching.get_versions(["post:1"])["post:1"]
+        self.assertNotEqual(
+            caching.get_versions(["post:1"])["post:1"], before_commit
+        )
@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..comments import get_comments
+from ..models import Comment, Post
+from ..paginators import NEXT, PREVIOUS, encode_key
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_FIRST_PAGE=3, COMMENTS_PER_PAGE=4)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.post = Post.objects.create(text="Текст", author=cls.author)
+        for number in range(10):
+            Comment.objects.create(
+                post=cls.post, author=cls.author, text=f"Комментарий {number}"
+            )
+        cls.expected = list(Comment.objects.order_by("-created", "-pk"))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_walks_all_comments(self):
+        comments, cursor = get_comments(self.post.pk, per_page=3)
+        walked = list(comments)
+        while cursor:
+            comments, cursor = get_comments(self.post.pk, cursor)
+            walked.extend(comments)
+        self.assertEqual(walked, self.expected)
+
+    def test_forged_cursors_give_first_portion(self):
+        last = self.expected[3]
+        for cursor in (
+            encode_key(PREVIOUS, last.created, last.pk),
+            encode_key(NEXT, last.created, 10 ** 30),
+            encode_key(NEXT, last.created, -1),
+        ):
+            with self.subTest(cursor=cursor):
+                comments, _ = get_comments(self.post.pk, cursor, per_page=3)
+                self.assertEqual(comments, self.expected[:3])
+
+    def test_endpoint_rejects_bad_cursors(self):
+        """«Показать ещё» не получает первую порцию второй раз."""
+        last = self.expected[3]
+        url = reverse("post_comments", args=["author", self.post.pk])
+        for params in (
+            {},
+            {"cursor": "не-курсор"},
+            {"cursor": encode_key(PREVIOUS, last.created, last.pk)},
+            {"cursor": encode_key(NEXT, last.created, 10 ** 30)},
+        ):
+            with self.subTest(params=params):
+                response = Client().get(url, params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_post_page_shows_first_portion(self):
+        url = reverse("post", args=["author", self.post.pk])
+        response = Client().get(url)
+        self.assertEqual(
+            response.context["comments"], self.expected[:3]
+        )
+        cursor = response.context["comments_cursor"]
+        self.assertContains(response, f"?comments={cursor}")
+
+        response = Client().get(url, {"comments": cursor})
+        self.assertEqual(response.context["comments"], self.expected[3:7])
+
+    def test_post_page_queries_do_not_grow_with_comments(self):
+        url = reverse("post", args=["author", self.post.pk])
+        client = Client()
+        client.get(url)
+        with self.assertNumQueries(2):
+            client.get(url)
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.author, text="Ещё")
+            for _ in range(50)
+        )
+        with self.assertNumQueries(2):
+            client.get(url)
+
+    def test_fragment_endpoint(self):
+        url = reverse("post_comments", args=["author", self.post.pk])
+        _, cursor = get_comments(self.post.pk, per_page=3)
+        data = Client().get(url, {"cursor": cursor}).json()
+        for comment in self.expected[3:7]:
+            self.assertIn(f'name="comment_{comment.pk}"', data["html"])
+        self.assertNotIn(f'comment_{self.expected[7].pk}"', data["html"])
+
+        data = Client().get(url, {"cursor": data["next"]}).json()
+        self.assertIsNone(data["next"])
+        self.assertIn(f'comment_{self.expected[-1].pk}"', data["html"])
+
+    def test_fragment_endpoint_redirects_to_author(self):
+        url = reverse("post_comments", args=["other", self.post.pk])
+        response = Client().get(url, {"cursor": "x"})
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(
+            response.url,
+            reverse("post_comments", args=["author", self.post.pk])
+            + "?cursor=x",
+        )
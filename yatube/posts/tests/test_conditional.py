@@ -0,0 +1,119 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        cls.post = Post.objects.create(
+            text="Текст", author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.urls = [
+            reverse("post", args=["author", self.post.pk]),
+            reverse("profile", args=["author"]),
+            reverse("group", args=["group"]),
+        ]
+
+    def test_unchanged_page_is_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)["ETag"]
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+
+    def test_changes_give_new_etag(self):
+        changes = [
+            lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text="Комментарий"
+            ),
+            lambda: Post.objects.filter(pk=self.post.pk).first().save(),
+            lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            ),
+        ]
+        for change in changes:
+            etags = [self.client.get(url)["ETag"] for url in self.urls]
+            change()
+            for url, etag in zip(self.urls, etags):
+                with self.subTest(url=url):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertNotEqual(response["ETag"], etag)
+
+    def test_renames_give_new_etag(self):
+        Comment.objects.create(
+            post=self.post, author=self.reader, text="Комментарий"
+        )
+        post_url, _, group_url = self.urls
+        renames = [
+            # Имя комментатора видно на странице поста.
+            (post_url, self.reader, "commenter"),
+            # Имя автора поста видно на странице группы.
+            (group_url, self.author, "writer"),
+        ]
+        for url, user, username in renames:
+            with self.subTest(url=url):
+                etag = self.guest.get(url)["ETag"]
+                user.username = username
+                user.save()
+                response = self.guest.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, username)
+        profile_url = reverse("profile", args=[self.author.username])
+        etag = self.guest.get(profile_url)["ETag"]
+        self.group.title = "Новое название"
+        self.group.save()
+        response = self.guest.get(profile_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_viewer(self):
+        url = self.urls[0]
+        etag = self.guest.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_last_modified_only_for_guests(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest.get(url)
+                self.assertTrue(response.has_header("Last-Modified"))
+                self.assertFalse(
+                    self.client.get(url).has_header("Last-Modified")
+                )
+                response = self.guest.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_modified_since_old_date(self):
+        response = self.guest.get(
+            self.urls[0], HTTP_IF_MODIFIED_SINCE=http_date(0)
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_pages_are_not_found(self):
+        for url in (
+            reverse("post", args=["author", self.post.pk + 1]),
+            reverse("profile", args=["nobody"]),
+            reverse("group", args=["nothing"]),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.guest.get(url).status_code, 404)
@@ -0,0 +1,77 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Post, ProfileStats
+
+User = get_user_model()
+
+TEXT = "Текст"
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+
+    def stats(self, user):
+        return ProfileStats.objects.get(user=user)
+
+    def test_counters_follow_creates_and_deletes(self):
+        """Счётчики меняются при создании и удалении записей."""
+        post = Post.objects.create(text=TEXT, author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text=TEXT)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+
+        Comment.objects.all().delete()
+        Follow.objects.all().delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_saving_loaded_post_keeps_counter(self):
+        """Сохранение поста, загруженного до комментария, не затирает
+        счётчик.
+        """
+        post = Post.objects.create(text=TEXT, author=self.author)
+        stale = Post.objects.get(pk=post.pk)
+        Comment.objects.create(post=post, author=self.reader, text=TEXT)
+        stale.text = "Новый текст"
+        stale.save()
+        post.refresh_from_db()
+        self.assertEqual(post.text, "Новый текст")
+        self.assertEqual(post.comment_count, 1)
+
+    def test_recount_command_repairs_drift(self):
+        """Команда recount_counters чинит разошедшиеся счётчики."""
+        Post.objects.bulk_create(
+            [Post(text=TEXT, author=self.author) for _ in range(3)]
+        )
+        post = Post.objects.first()
+        Comment.objects.create(post=post, author=self.reader, text=TEXT)
+        Post.objects.filter(pk=post.pk).update(comment_count=5)
+        ProfileStats.objects.filter(user=self.reader).delete()
+
+        out = StringIO()
+        call_command("recount_counters", "--dry-run", stdout=out)
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+        call_command("recount_counters", stdout=out)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 3)
+        self.assertTrue(ProfileStats.objects.filter(user=self.reader).exists())
@@ -0,0 +1,97 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from .. import graph
+from ..models import Follow, FollowSuggestion
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.alice, cls.bob, cls.carol, cls.dave, cls.erin = [
+            User.objects.create_user(username=name)
+            for name in ("alice", "bob", "carol", "dave", "erin")
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def follow(self, user, author):
+        return Follow.objects.create(user=user, author=author)
+
+    def test_adjacency_lists(self):
+        self.follow(self.alice, self.carol)
+        self.follow(self.alice, self.bob)
+        self.follow(self.bob, self.alice)
+        self.assertEqual(
+            list(graph.following(self.alice.pk)),
+            sorted([self.bob.pk, self.carol.pk]),
+        )
+        self.assertEqual(list(graph.followers(self.alice.pk)), [self.bob.pk])
+        self.assertEqual(graph.mutual(self.alice.pk), [self.bob.pk])
+        with self.assertNumQueries(0):
+            self.assertTrue(graph.is_following(self.alice.pk, self.carol.pk))
+            self.assertFalse(graph.is_following(self.alice.pk, self.dave.pk))
+
+    def test_signals_keep_cache_consistent(self):
+        self.assertFalse(graph.is_following(self.alice.pk, self.bob.pk))
+        follow = self.follow(self.alice, self.bob)
+        self.assertTrue(graph.is_following(self.alice.pk, self.bob.pk))
+        self.assertEqual(list(graph.followers(self.bob.pk)), [self.alice.pk])
+        follow.delete()
+        self.assertFalse(graph.is_following(self.alice.pk, self.bob.pk))
+        self.assertEqual(list(graph.followers(self.bob.pk)), [])
+
+    def test_friends_of_friends_suggestions(self):
+        self.follow(self.alice, self.bob)
+        self.follow(self.alice, self.carol)
+        self.follow(self.bob, self.dave)
+        self.follow(self.carol, self.dave)
+        self.follow(self.carol, self.erin)
+        self.follow(self.carol, self.alice)
+        self.assertEqual(
+            graph.compute_suggestions(self.alice.pk),
+            [(self.dave.pk, 2), (self.erin.pk, 1)],
+        )
+        call_command("rebuild_follow_suggestions", stdout=io.StringIO())
+        self.assertEqual(
+            graph.suggestions(self.alice.pk), [self.dave, self.erin]
+        )
+        self.follow(self.alice, self.dave)
+        self.assertEqual(graph.suggestions(self.alice.pk), [self.erin])
+        self.assertFalse(
+            FollowSuggestion.objects.filter(user=self.alice, author=self.dave)
+        )
+
+    def test_follow_page_shows_suggestions(self):
+        FollowSuggestion.objects.create(
+            user=self.alice, author=self.erin, score=1
+        )
+        client = Client()
+        client.force_login(self.alice)
+        response = client.get(reverse("follow_index"))
+        self.assertEqual(response.context["suggestions"], [self.erin])
+        self.assertContains(response, reverse("profile", args=["erin"]))
+
+
+class CommitTests(TransactionTestCase):
+    def test_lists_read_before_commit_are_dropped(self):
+        alice, bob = [
+            User.objects.create_user(username=name)
+            for name in ("alice", "bob")
+        ]
+        cache.clear()
+        with transaction.atomic():
+            Follow.objects.create(user=alice, author=bob)
+            graph.followers(bob.pk)
+        with self.assertNumQueries(1):
+            graph.followers(bob.pk)
@@ -0,0 +1,106 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import ImageBlob, Post
+
+User = get_user_model()
+
+MEDIA_ROOT_TEMP = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ORIENTATION = 0x0112
+
+
+def make_photo(name="photo.jpg", size=(400, 200), orientation=None):
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    exif[0x010F] = "Телефон"
+    if orientation:
+        exif[ORIENTATION] = orientation
+    Image.new("RGB", size, (200, 30, 30)).save(
+        buffer, "JPEG", exif=exif.tobytes()
+    )
+    return SimpleUploadedFile(name, buffer.getvalue(), "image/jpeg")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT_TEMP, IMAGE_MAX_SIZE=(100, 100))
+class ImageIngestTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="author")
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT_TEMP, ignore_errors=True)
+        super().tearDownClass()
+
+    def publish(self, image, text="Текст"):
+        self.client.post(reverse("post_new"), {"text": text, "image": image})
+        return Post.objects.get(text=text)
+
+    def test_upload_is_downscaled_and_stripped(self):
+        post = self.publish(make_photo(orientation=6))
+        self.assertRegex(
+            post.image.name, r"^posts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$"
+        )
+        with default_storage.open(post.image.name) as file:
+            image = Image.open(file)
+            # Поворот из EXIF применён: 400x200 стало 50x100.
+            self.assertEqual(image.size, (50, 100))
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_transparent_image_stays_png(self):
+        buffer = io.BytesIO()
+        Image.new("RGBA", (10, 10), (0, 0, 0, 0)).save(buffer, "PNG")
+        post = self.publish(
+            SimpleUploadedFile("clear.png", buffer.getvalue(), "image/png")
+        )
+        self.assertTrue(post.image.name.endswith(".png"))
+
+    def test_same_image_is_stored_once(self):
+        first = self.publish(make_photo("a.jpg"), "Первый")
+        second = self.publish(make_photo("b.jpg"), "Второй")
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(ImageBlob.objects.get().refs, 2)
+
+        first.delete()
+        self.assertEqual(ImageBlob.objects.get().refs, 1)
+        self.assertTrue(default_storage.exists(second.image.name))
+
+        second.delete()
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFalse(default_storage.exists(second.image.name))
+
+    def test_replaced_image_is_released(self):
+        post = self.publish(make_photo())
+        old_name = post.image.name
+        url = reverse("post_edit", args=["author", post.pk])
+        self.client.post(url, {
+            "text": "Текст",
+            "image": make_photo(size=(300, 300)),
+        })
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertEqual(
+            list(ImageBlob.objects.values_list("name", "refs")),
+            [(post.image.name, 1)],
+        )
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_huge_image_is_rejected(self):
+        response = self.client.post(
+            reverse("post_new"), {"text": "Текст", "image": make_photo()}
+        )
+        self.assertFormError(
+            response, "form", "image", "Слишком большое разрешение картинки"
+        )
+        self.assertFalse(ImageBlob.objects.exists())
@@ -0,0 +1,99 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from yatube import metrics
+
+from ..models import Post
+
+User = get_user_model()
+
+METRICS_DIR_TEMP = tempfile.mkdtemp()
+
+
+@override_settings(METRICS_DIR=METRICS_DIR_TEMP, METRICS_FLUSH_INTERVAL=0)
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="test_user")
+        cls.staff = User.objects.create_user(username="staff", is_staff=True)
+        Post.objects.create(text="Текст", author=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(METRICS_DIR_TEMP, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    # Промахи кэша считает только yatube.cache.SQLiteCache.
+    @override_settings(METRICS_SAMPLE_RATE=1, CACHES={"default": {
+        "BACKEND": "yatube.cache.SQLiteCache",
+        "LOCATION": f"{METRICS_DIR_TEMP}/cache.sqlite3",
+    }})
+    def test_sampled_request_is_recorded_by_url_name(self):
+        Client().get(reverse("index"))
+        index = metrics.collect()["index"]
+        self.assertEqual(index["wall_ms"].count, 1)
+        self.assertGreater(index["sql_queries"].total, 0)
+        self.assertGreater(index["template_ms"].total, 0)
+        self.assertGreater(index["cache_misses"].total, 0)
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_nothing_is_recorded_when_sampling_is_off(self):
+        Client().get(reverse("index"))
+        self.assertEqual(metrics.collect(), {})
+
+    def test_histogram_percentiles(self):
+        histogram = metrics.Histogram()
+        for value in (1, 3, 3, 40, 700):
+            histogram.add(value)
+        self.assertEqual(histogram.percentile(0.5), 5)
+        self.assertEqual(histogram.percentile(0.99), 1000)
+        self.assertEqual(histogram.summary()["max"], 700)
+
+    def test_endpoint_is_for_staff_only(self):
+        client = Client()
+        self.assertEqual(client.get(reverse("metrics")).status_code, 403)
+        client.force_login(self.user)
+        self.assertEqual(client.get(reverse("metrics")).status_code, 403)
+        client.force_login(self.staff)
+        self.assertEqual(client.get(reverse("metrics")).status_code, 200)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_endpoint_accepts_token(self):
+        response = Client().get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_snapshots_of_finished_processes_are_pruned(self):
+        finished = subprocess.Popen([sys.executable, "-c", ""])
+        finished.wait()
+        stale = os.path.join(METRICS_DIR_TEMP, f"queries-{finished.pid}.json")
+        with open(stale, "w") as snapshot:
+            snapshot.write("[]")
+        metrics.flush()
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(os.path.join(
+            METRICS_DIR_TEMP, f"histograms-{os.getpid()}.json"
+        )))
+
+    @override_settings(METRICS_SAMPLE_RATE=1)
+    def test_dump_command(self):
+        Client().get(reverse("index"))
+        out = StringIO()
+        call_command("metrics_dump", stdout=out)
+        self.assertIn("wall_ms", out.getvalue())
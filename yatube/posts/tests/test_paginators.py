@@ -0,0 +1,159 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..paginators import CursorPaginator, WindowPaginator
+
+User = get_user_model()
+
+PER_PAGE = 5
+POSTS_COUNT = 13
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="test_user")
+        for item in range(POSTS_COUNT):
+            Post.objects.create(text=f"Текст {item}", author=cls.user)
+        cls.expected = list(Post.objects.order_by("-pub_date", "-pk"))
+
+    def setUp(self):
+        cache.clear()
+
+    def paginator(self, **kwargs):
+        return CursorPaginator(Post.objects.all(), PER_PAGE, **kwargs)
+
+    def test_forward_and_backward_walk(self):
+        """Курсоры проходят ленту вперёд и назад без пропусков."""
+        pages = [self.paginator().get_page(None)]
+        while pages[-1].has_next():
+            pages.append(self.paginator().get_page(pages[-1].next_cursor))
+        walked = [post for page in pages for post in page]
+        self.assertEqual(walked, self.expected)
+        self.assertFalse(pages[0].has_previous())
+
+        previous = self.paginator().get_page(pages[-1].previous_cursor)
+        self.assertEqual(list(previous), list(pages[-2]))
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        page = self.paginator().get_page("не-курсор")
+        self.assertEqual(list(page), self.expected[:PER_PAGE])
+
+    def test_count_can_be_skipped(self):
+        """Без with_count общее количество не запрашивается."""
+        paginator = self.paginator(with_count=False)
+        with self.assertNumQueries(0):
+            self.assertIsNone(paginator.count)
+
+    @override_settings(PAGINATION_MODE="cursor")
+    def test_index_uses_cursor_links(self):
+        """В режиме cursor главная страница отдаёт ссылку с курсором."""
+        client = Client()
+        response = client.get(reverse("index"))
+        page = response.context["page"]
+        self.assertEqual(len(page), 10)
+        self.assertContains(response, f"?cursor={page.next_cursor}")
+        response = client.get(
+            reverse("index") + f"?cursor={page.next_cursor}"
+        )
+        self.assertEqual(
+            list(response.context["page"]), self.expected[10:]
+        )
+
+
+class WindowPaginatorTests(TestCase):
+    def links(self, number, pages, **kwargs):
+        paginator = WindowPaginator(range(pages), 1, window=2, **kwargs)
+        return list(paginator.elided_page_range(number))
+
+    def test_elided_page_range(self):
+        """Номера страниц: края и окно вокруг текущей."""
+        gap = WindowPaginator.ELLIPSIS
+        self.assertEqual(self.links(1, 5), [1, 2, 3, 4, 5])
+        self.assertEqual(self.links(1, 100), [1, 2, 3, gap, 100])
+        self.assertEqual(self.links(4, 100), [1, 2, 3, 4, 5, 6, gap, 100])
+        self.assertEqual(
+            self.links(50, 100), [1, gap, 48, 49, 50, 51, 52, gap, 100]
+        )
+        self.assertEqual(
+            self.links(97, 100), [1, gap, 95, 96, 97, 98, 99, 100]
+        )
+
+    def test_count_is_limited(self):
+        """С count_limit COUNT(*) не идёт дальше окна страниц."""
+        user = User.objects.create_user(username="test_user")
+        Post.objects.bulk_create(
+            Post(text=str(number), author=user) for number in range(30)
+        )
+        paginator = WindowPaginator(
+            Post.objects.all(), 2, count_limit=5, window=2
+        )
+        page = paginator.get_page(3)
+        self.assertEqual(paginator.count, 11)
+        self.assertFalse(paginator.count_exact)
+        self.assertEqual(
+            page.page_links, [1, 2, 3, 4, 5, WindowPaginator.ELLIPSIS]
+        )
+        self.assertTrue(page.has_next())
+
+        paginator = WindowPaginator(Post.objects.all(), 2, count_limit=100)
+        paginator.get_page(3)
+        self.assertEqual(paginator.count, 30)
+        self.assertTrue(paginator.count_exact)
+
+    def test_index_renders_window(self):
+        """Главная выводит окно номеров, а не все страницы."""
+        cache.clear()
+        user = User.objects.create_user(username="test_user")
+        Post.objects.bulk_create(
+            Post(text=str(number), author=user) for number in range(200)
+        )
+        response = Client().get(reverse("index"), {"page": 10})
+        self.assertContains(response, "?page=12")
+        self.assertNotContains(response, "?page=13\"")
+        self.assertContains(response, "?page=20\"")
+        self.assertContains(response, WindowPaginator.ELLIPSIS, count=2)
+
+    def test_huge_page_number_gives_last_page(self):
+        """Огромный номер страницы не ломает запрос и ведёт на последнюю."""
+        cache.clear()
+        user = User.objects.create_user(username="test_user")
+        Post.objects.bulk_create(
+            Post(text=str(number), author=user) for number in range(30)
+        )
+        response = Client().get(
+            reverse("index"), {"page": "99999999999999999999999"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["page"].number, 3)
+
+        paginator = WindowPaginator(
+            Post.objects.all(), 2, count_limit=5, window=2
+        )
+        page = paginator.get_page(10 ** 30)
+        self.assertEqual(page.number, 15)
+        self.assertTrue(paginator.count_exact)
+
+    def test_pages_past_count_limit_are_reachable(self):
+        """Приблизительный count не мешает листать дальше count_limit."""
+        user = User.objects.create_user(username="test_user")
+        Post.objects.bulk_create(
+            Post(text=str(number), author=user) for number in range(30)
+        )
+        posts = list(Post.objects.order_by("-pk"))
+        for number in range(1, 16):
+            with self.subTest(number=number):
+                paginator = WindowPaginator(
+                    Post.objects.order_by("-pk"), 2, count_limit=5, window=2
+                )
+                page = paginator.get_page(number)
+                self.assertEqual(page.number, number)
+                self.assertEqual(
+                    list(page), posts[(number - 1) * 2:number * 2]
+                )
+                self.assertEqual(page.has_next(), number < 15)
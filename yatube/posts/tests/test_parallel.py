@@ -0,0 +1,172 @@
+import asyncio
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Page
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings
+)
+from django.urls import reverse
+
+from yatube.asgi_handler import ASGIHandler
+
+from .. import parallel
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+URL_NAMES = frozenset(("index", "group", "profile", "post", "follow_index"))
+
+
+class ParallelViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        for number in range(13):
+            cls.post = Post.objects.create(
+                text=f"Пост {number}", author=cls.author, group=cls.group
+            )
+        Comment.objects.create(post=cls.post, author=cls.reader, text="Да")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def get_context(self, url, *keys):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        values = []
+        for key in keys:
+            value = response.context[key]
+            if isinstance(value, Page):
+                value = (value.number, list(value.object_list))
+            elif isinstance(value, QuerySet):
+                value = list(value)
+            values.append(value)
+        return values
+
+    def test_parallel_views_match_sequential(self):
+        pages = [
+            (reverse("index"), ("page",)),
+            (reverse("index") + "?page=2", ("page",)),
+            (reverse("index") + "?page=99", ("page",)),
+            (reverse("group", args=["group"]), ("group", "page")),
+            (reverse("profile", args=["author"]), ("page", "following")),
+            (
+                reverse("post", args=["author", self.post.pk]),
+                ("author", "post", "comments"),
+            ),
+            (reverse("follow_index"), ("page",)),
+        ]
+        for url, keys in pages:
+            with self.subTest(url=url):
+                cache.clear()
+                expected = self.get_context(url, *keys)
+                cache.clear()
+                with override_settings(PARALLEL_VIEWS=URL_NAMES):
+                    self.assertEqual(self.get_context(url, *keys), expected)
+
+    @override_settings(PARALLEL_VIEWS=URL_NAMES)
+    def test_parallel_post_view_redirects_to_author(self):
+        response = self.client.get(
+            reverse("post", args=["reader", self.post.pk])
+        )
+        self.assertRedirects(
+            response, reverse("post", args=["author", self.post.pk]),
+            status_code=301,
+        )
+
+
+class GatherTests(TransactionTestCase):
+    def test_calls_run_in_pool_and_see_committed_rows(self):
+        User.objects.create_user(username="author")
+        threads, counts = zip(*parallel.gather(
+            lambda: (threading.get_ident(), User.objects.count()),
+            lambda: (threading.get_ident(), User.objects.count()),
+        ))
+        self.assertNotIn(threading.get_ident(), threads)
+        self.assertEqual(counts, (1, 1))
+
+    def test_pool_threads_keep_their_connections(self):
+        def connection_of_thread():
+            User.objects.exists()
+            return threading.get_ident(), id(connection.connection)
+
+        seen = {}
+        for _ in range(3):
+            for thread, connection_id in parallel.gather(
+                connection_of_thread, connection_of_thread
+            ):
+                seen.setdefault(thread, set()).add(connection_id)
+        self.assertEqual([len(ids) for ids in seen.values()], [1] * len(seen))
+
+    def test_huge_page_number_gives_last_page(self):
+        author = User.objects.create_user(username="author")
+        Post.objects.bulk_create(
+            Post(text=str(number), author=author) for number in range(3)
+        )
+        request = RequestFactory().get("/", {"page": "9" * 30})
+        page = parallel.get_page(request, Post.objects.all(), 2)
+        self.assertEqual(page.number, 2)
+
+    def test_page_past_the_end_is_the_last_page(self):
+        author = User.objects.create_user(username="author")
+        Post.objects.bulk_create(
+            Post(text=str(number), author=author) for number in range(3)
+        )
+        request = RequestFactory().get("/", {"page": 5})
+        page = parallel.get_page(request, Post.objects.all(), 2)
+        self.assertEqual(page.number, 2)
+        self.assertEqual(len(page.object_list), 1)
+
+
+class ASGIHandlerTests(SimpleTestCase):
+    def test_runs_wsgi_application(self):
+        seen = {}
+
+        def application(environ, start_response):
+            seen.update(environ)
+            start_response("201 Created", [("X-Test", "да".encode().decode(
+                "latin-1"
+            ))])
+            return [environ["wsgi.input"].read(), b"!"]
+
+        messages = iter([
+            {"type": "http.request", "body": b"te", "more_body": True},
+            {"type": "http.request", "body": b"xt"},
+        ])
+        sent = []
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/группа/",
+            "query_string": b"page=2",
+            "headers": [(b"content-type", b"text/plain"),
+                        (b"cookie", b"a=1"), (b"cookie", b"b=2")],
+        }
+        asyncio.run(ASGIHandler(application)(scope, receive, send))
+        self.assertEqual(sent[0]["status"], 201)
+        self.assertEqual(sent[0]["headers"], [(b"x-test", "да".encode())])
+        self.assertEqual(sent[1]["body"], b"text!")
+        self.assertEqual(
+            seen["PATH_INFO"].encode("latin-1").decode(), "/группа/"
+        )
+        self.assertEqual(seen["QUERY_STRING"], "page=2")
+        self.assertEqual(seen["CONTENT_TYPE"], "text/plain")
+        self.assertEqual(seen["HTTP_COOKIE"], "a=1; b=2")
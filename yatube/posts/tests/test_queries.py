@@ -0,0 +1,65 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+TEXT = "Текст"
+SLUG = "test-slug"
+POSTS_COUNT = 15
+LISTING_QUERY_BUDGET = 10
+
+
+class ListingQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(title=TEXT, slug=SLUG)
+        for item in range(POSTS_COUNT):
+            author = User.objects.create_user(username=f"author_{item}")
+            Follow.objects.create(user=cls.reader, author=author)
+            post = Post.objects.create(
+                text=TEXT, author=author, group=cls.group
+            )
+            Comment.objects.create(post=post, author=cls.reader, text=TEXT)
+        cls.author = author
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_listings_fit_query_budget(self):
+        """Число запросов страниц лент не зависит от числа постов."""
+        urls = (
+            reverse("index"),
+            reverse("group", args=[SLUG]),
+            reverse("profile", args=[self.author.username]),
+            reverse("follow_index"),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with self.assertQueryBudget(LISTING_QUERY_BUDGET):
+                    response = self.authorized_client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_comment_count_is_stored(self):
+        """Количество комментариев берётся из Post.comment_count."""
+        response = self.authorized_client.get(reverse("index"))
+        post = response.context["page"][0]
+        self.assertEqual(post.comment_count, 1)
+        self.assertContains(response, "Комментариев: 1")
+
+    def test_feed_queries_use_indexes(self):
+        """EXPLAIN запросов лент не находит полных сканирований."""
+        out = StringIO()
+        call_command("explain_feeds", "--strict", stdout=out)
+        self.assertIn("Полных сканирований нет", out.getvalue())
@@ -0,0 +1,85 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from yatube import querylog
+
+from ..models import Post
+
+User = get_user_model()
+
+METRICS_DIR_TEMP = tempfile.mkdtemp()
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_literals_are_replaced(self):
+        self.assertEqual(
+            querylog.fingerprint(
+                'SELECT "posts_post"."id" FROM "posts_post" '
+                "WHERE \"posts_post\".\"text\" = 'it''s'\n"
+                "  LIMIT 21 OFFSET 40"
+            ),
+            'SELECT "posts_post"."id" FROM "posts_post" '
+            'WHERE "posts_post"."text" = ? LIMIT ? OFFSET ?',
+        )
+
+    def test_in_lists_of_any_length_match(self):
+        self.assertEqual(
+            querylog.fingerprint("SELECT 1 FROM t2 WHERE id IN (%s, %s)"),
+            querylog.fingerprint("SELECT 1 FROM t2 WHERE id IN (%s)"),
+        )
+
+
+@override_settings(
+    METRICS_DIR=METRICS_DIR_TEMP,
+    METRICS_FLUSH_INTERVAL=0,
+    QUERYLOG_SAMPLE_RATE=1,
+)
+class QueryLogTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="test_user")
+        cls.post = Post.objects.create(text="Текст", author=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(METRICS_DIR_TEMP, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        querylog.reset()
+
+    def test_queries_are_counted_per_view(self):
+        url = reverse("post", args=[self.user.username, self.post.pk])
+        Client().get(url)
+        Client().get(url)
+        comments = [
+            row for row in querylog.collect()
+            if row["view"] == "post" and "posts_comment" in row["fingerprint"]
+        ]
+        self.assertEqual(len(comments), 1)
+        self.assertEqual(comments[0]["count"], 2)
+
+    @override_settings(QUERYLOG_SLOW_MS=0)
+    def test_slow_queries_are_logged_with_caller(self):
+        with self.assertLogs("yatube.slow_queries", "WARNING") as logs:
+            Client().get(reverse("profile", args=[self.user.username]))
+        self.assertIn("profile", logs.output[0])
+        self.assertIn("posts/", logs.output[0])
+
+    def test_command_filters_by_view(self):
+        Client().get(reverse("index"))
+        Client().get(reverse("profile", args=[self.user.username]))
+        out = StringIO()
+        call_command("query_stats", view="index", stdout=out)
+        lines = out.getvalue().splitlines()[1:]
+        self.assertTrue(lines)
+        self.assertTrue(all(" index " in line for line in lines))
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+from ..resolvers import find_post
+
+User = get_user_model()
+
+
+class PostResolverTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        cls.post = Post.objects.create(
+            text="Текст", author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_post_author_and_group_in_one_query(self):
+        with self.assertNumQueries(1):
+            post = find_post(self.post.pk)
+            self.assertEqual(post.author.username, "author")
+            self.assertEqual(post.author.stats.posts_count, 1)
+            self.assertEqual(post.group.slug, "group")
+
+    def test_stale_username_redirects_to_canonical_url(self):
+        for name in ("post", "post_edit"):
+            with self.subTest(name=name):
+                response = self.client.get(
+                    reverse(name, args=["old-name", self.post.pk]),
+                    {"comments": "x"},
+                )
+                self.assertEqual(response.status_code, 301)
+                self.assertEqual(
+                    response.url,
+                    reverse(name, args=["author", self.post.pk])
+                    + "?comments=x",
+                )
+
+    def test_post_with_stale_username_is_handled(self):
+        response = self.client.post(
+            reverse("add_comment", args=["old-name", self.post.pk]),
+            {"text": "Комментарий"},
+        )
+        self.assertRedirects(
+            response, reverse("post", args=["author", self.post.pk])
+        )
+        self.assertTrue(Comment.objects.filter(post=self.post).exists())
+
+    def test_missing_posts_are_not_found(self):
+        orphan = Post.objects.create(text="Без автора")
+        for post_id in (self.post.pk + 100, orphan.pk):
+            with self.subTest(post_id=post_id):
+                response = self.client.get(
+                    reverse("post", args=["author", post_id])
+                )
+                self.assertEqual(response.status_code, 404)
@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Post, SearchTerm
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="test_user")
+
+    def create_post(self, text, days_ago=0):
+        post = Post.objects.create(text=text, author=self.user)
+        if days_ago:
+            # pub_date с auto_now_add задаётся только через update().
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=post.pub_date - timedelta(days=days_ago)
+            )
+            search.index_post(post.pk)
+        return post
+
+    def found(self, query, **kwargs):
+        posts, _ = search.search(query, **kwargs)
+        return [post.pk for post in posts]
+
+    def test_finds_posts_by_text_and_comments(self):
+        by_text = self.create_post("Ёжик в тумане")
+        by_comment = self.create_post("Кино")
+        self.create_post("Другое")
+        Comment.objects.create(
+            post=by_comment, author=self.user, text="там был ЕЖИК"
+        )
+        self.assertEqual(
+            set(self.found("ежик")), {by_text.pk, by_comment.pk}
+        )
+
+    def test_all_words_must_match(self):
+        both = self.create_post("красный кот")
+        self.create_post("красный пёс")
+        self.assertEqual(self.found("кот красный"), [both.pk])
+
+    def test_edit_and_delete_update_index(self):
+        post = self.create_post("старый текст")
+        post.text = "новый текст"
+        post.save()
+        self.assertEqual(self.found("старый"), [])
+        self.assertEqual(self.found("новый"), [post.pk])
+        post.delete()
+        self.assertEqual(self.found("новый"), [])
+
+    def test_comments_are_indexed_one_by_one(self):
+        post = self.create_post("Кино")
+        Comment.objects.create(post=post, author=self.user, text="ёжик")
+        with CaptureQueriesContext(connection) as queries:
+            same = Comment.objects.create(
+                post=post, author=self.user, text="ёжик"
+            )
+        self.assertFalse([
+            query for query in queries
+            if query["sql"].startswith('SELECT "posts_comment"')
+        ])
+        same.delete()
+        self.assertEqual(self.found("ежик"), [post.pk])
+        Comment.objects.get().delete()
+        self.assertEqual(self.found("ежик"), [])
+        self.assertEqual(self.found("кино"), [post.pk])
+
+    def test_relevant_and_recent_posts_go_first(self):
+        old = self.create_post("кот", days_ago=365)
+        weak = self.create_post("кот и много других слов в этом посте")
+        strong = self.create_post("кот кот кот")
+        self.assertEqual(self.found("кот"), [strong.pk, weak.pk, old.pk])
+
+    def test_cursor_pages_do_not_overlap(self):
+        posts = [self.create_post(f"кот {number}") for number in range(5)]
+        first, cursor = search.search("кот", per_page=3)
+        second, last_cursor = search.search("кот", cursor=cursor, per_page=3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertIsNone(last_cursor)
+        self.assertEqual(
+            {post.pk for post in first + second},
+            {post.pk for post in posts},
+        )
+
+    def test_search_page(self):
+        post = self.create_post("Ёжик в тумане")
+        response = Client().get(reverse("search"), {"q": "ёжик"})
+        self.assertEqual(response.context["posts"], [post])
+        self.assertContains(response, "Ёжик в тумане")
+
+
+@override_settings(SEARCH_BACKEND="python")
+class PythonSearchTests(SearchTests):
+    def test_terms_are_stored_with_weights(self):
+        post = self.create_post("кот и кот")
+        Comment.objects.create(post=post, author=self.user, text="кот")
+        self.assertEqual(
+            SearchTerm.objects.get(post=post, term="кот").weight,
+            2 * search.TEXT_WEIGHT + search.COMMENT_WEIGHT,
+        )
@@ -0,0 +1,84 @@
+import shutil
+import sqlite3
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from yatube.sqlite import base
+
+
+class SQLiteBackendTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.wrapper = base.DatabaseWrapper(
+            {**connection.settings_dict,
+             "NAME": f"{self.directory}/db.sqlite3"},
+            alias="tuned",
+        )
+
+    def tearDown(self):
+        self.wrapper.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def pragma(self, name):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_new_connection_gets_pragmas(self):
+        self.assertEqual(self.pragma("journal_mode"), "wal")
+        self.assertEqual(self.pragma("synchronous"), 1)
+        self.assertEqual(self.pragma("busy_timeout"), 5000)
+        self.assertEqual(self.pragma("cache_size"), -64000)
+
+    @override_settings(SQLITE_PRAGMAS={"synchronous": "full"})
+    def test_pragmas_come_from_settings(self):
+        self.assertEqual(self.pragma("journal_mode"), "delete")
+        self.assertEqual(self.pragma("synchronous"), 2)
+
+    def test_optimize_on_close_respects_interval(self):
+        base._optimized_at = None
+        self.pragma("journal_mode")
+        self.wrapper.close()
+        optimized_at = base._optimized_at
+        self.assertIsNotNone(optimized_at)
+        self.pragma("journal_mode")
+        self.wrapper.close()
+        self.assertEqual(base._optimized_at, optimized_at)
+
+    def test_transactions_take_write_lock_immediately(self):
+        self.wrapper.ensure_connection()
+        self.wrapper._start_transaction_under_autocommit()
+        other = sqlite3.connect(self.wrapper.settings_dict["NAME"], timeout=0)
+        with self.assertRaisesMessage(sqlite3.OperationalError, "locked"):
+            other.execute("BEGIN IMMEDIATE")
+        other.close()
+        self.wrapper.connection.rollback()
+
+    @override_settings(SQLITE_OPTIMIZE_INTERVAL=None)
+    def test_optimize_can_be_disabled(self):
+        base._optimized_at = None
+        self.assertFalse(base.optimize_due())
+
+
+class SQLiteConnectionTests(TestCase):
+    def test_default_connection_uses_backend(self):
+        """Django-соединение тестов тоже идёт через yatube.sqlite."""
+        self.assertIsInstance(connections["default"], base.DatabaseWrapper)
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+
+class SQLiteBenchmarkTests(SimpleTestCase):
+    def test_benchmark_reports_both_modes(self):
+        out = StringIO()
+        call_command(
+            "sqlite_benchmark", workers=2, duration=0.2, posts=100,
+            stdout=out,
+        )
+        self.assertIn("default", out.getvalue())
+        self.assertIn("tuned", out.getvalue())
@@ -0,0 +1,80 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+CSS = "body { color: #333; }\n" * 100
+
+
+class StaticPipelineTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.source = tempfile.mkdtemp()
+        cls.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.source, "css"))
+        with open(os.path.join(cls.source, "css", "site.css"), "w") as file:
+            file.write(CSS)
+        with open(os.path.join(cls.source, "css", "tiny.css"), "w") as file:
+            file.write("p{}")
+        cls.settings = override_settings(
+            STATIC_ROOT=cls.root, STATICFILES_DIRS=[cls.source]
+        )
+        cls.settings.enable()
+        call_command("collectstatic", interactive=False, stdout=StringIO())
+        cls.hashed = staticfiles_storage.stored_name("css/site.css")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.source)
+        shutil.rmtree(cls.root)
+        super().tearDownClass()
+
+    def test_collectstatic_hashes_and_compresses(self):
+        self.assertRegex(self.hashed, r"^css/site\.[0-9a-f]{12}\.css$")
+        self.assertTrue(
+            os.path.exists(os.path.join(self.root, "staticfiles.json"))
+        )
+        with gzip.open(os.path.join(self.root, self.hashed + ".gz")) as file:
+            self.assertEqual(file.read().decode(), CSS)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.root, "css", "tiny.css.gz"))
+        )
+
+    def test_static_tag_uses_hashed_name(self):
+        rendered = Template(
+            "{% load static %}{% static 'css/site.css' %}"
+        ).render(Context())
+        self.assertEqual(rendered, f"/static/{self.hashed}")
+
+    def test_hashed_file_is_served_compressed_and_immutable(self):
+        response = self.client.get(
+            f"/static/{self.hashed}", HTTP_ACCEPT_ENCODING="gzip, deflate"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("Accept-Encoding", response["Vary"])
+        body = b"".join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body).decode(), CSS)
+
+    def test_plain_file_without_accept_encoding(self):
+        response = self.client.get(
+            "/static/css/site.css", HTTP_ACCEPT_ENCODING="gzip;q=0"
+        )
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertNotIn("immutable", response["Cache-Control"])
+        self.assertEqual(b"".join(response.streaming_content).decode(), CSS)
+
+    def test_missing_and_outside_files_are_not_found(self):
+        for url in ("/static/css/none.css", "/static/../settings.py"):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
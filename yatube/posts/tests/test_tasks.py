@@ -0,0 +1,95 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import tasks
+from ..models import Comment, Follow, Post, Task, TimelineEntry
+from ..search import search
+
+User = get_user_model()
+
+
+def broken():
+    raise RuntimeError("Сломалось")
+
+
+@override_settings(TASKS_EAGER=False, TASKS_MAX_ATTEMPTS=2)
+class TaskQueueTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        tasks.register("tests.broken", broken)
+
+    @classmethod
+    def tearDownClass(cls):
+        del tasks.TASKS["tests.broken"]
+        super().tearDownClass()
+
+    def test_side_effects_wait_for_worker(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text="Котики", author=self.author)
+        self.assertEqual(search("котики")[0], [])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+        self.assertEqual(tasks.work(once=True), 3)
+        self.assertEqual(search("котики")[0], [post])
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertFalse(Task.objects.exists())
+
+    def test_same_task_is_queued_once(self):
+        post = Post.objects.create(text="Текст", author=self.author)
+        for _ in range(3):
+            Comment.objects.create(post=post, author=self.reader, text="Да")
+        self.assertEqual(
+            Task.objects.filter(name="search.index_post").count(), 1
+        )
+
+    def test_follow_and_unfollow_leave_no_timeline(self):
+        Post.objects.create(text="Текст", author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author).delete()
+        tasks.work(once=True)
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_failed_task_is_retried_then_kept(self):
+        tasks.enqueue("tests.broken")
+        self.assertEqual(tasks.work(once=True), 0)
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.QUEUED)
+        self.assertEqual(task.attempts, 1)
+        self.assertGreater(task.run_after, timezone.now())
+        self.assertIn("Сломалось", task.last_error)
+
+        Task.objects.update(run_after=timezone.now())
+        tasks.work(once=True)
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(task.attempts, 2)
+
+    def test_stale_tasks_are_released(self):
+        tasks.enqueue("tests.broken")
+        tasks.claim(10)
+        Task.objects.update(locked_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(tasks.release_stale(), 1)
+        self.assertEqual(Task.objects.get().status, Task.QUEUED)
+
+    def test_task_is_claimed_once(self):
+        tasks.enqueue("tests.broken")
+        # Другой воркер прочитал очередь, но ещё не забрал задачи.
+        seen = tasks._ready(10, timezone.now())
+        self.assertEqual(tasks.claim(10), seen)
+        self.assertEqual(tasks._take(seen, timezone.now()), [])
+
+    def test_run_tasks_command(self):
+        Post.objects.create(text="Текст", author=self.author)
+        output = StringIO()
+        call_command("run_tasks", "--once", "--processes=1", stdout=output)
+        self.assertIn("Выполнено задач: 2", output.getvalue())
+        self.assertFalse(Task.objects.exists())
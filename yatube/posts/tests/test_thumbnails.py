@@ -0,0 +1,153 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+from PIL import Image
+
+from .. import thumbnails
+from ..models import Post, ThumbnailSet
+
+User = get_user_model()
+
+MEDIA_ROOT_TEMP = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEXT = "Текст"
+
+
+def make_image(name="photo.png", size=(1200, 800)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), "image/png")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT_TEMP)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="test_user")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT_TEMP, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.post = Post.objects.create(
+            text=TEXT, author=self.user, image=make_image()
+        )
+
+    def test_build_creates_all_renditions(self):
+        thumbnails.build(self.post.pk)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(set(post.thumbnails), {"feed", "detail"})
+        with default_storage.open(
+            post.thumbnails["feed"]["jpg"].replace(settings.MEDIA_URL, "")
+        ) as feed:
+            self.assertEqual(Image.open(feed).size, (960, 339))
+        with default_storage.open(
+            post.thumbnails["detail"]["webp"].replace(settings.MEDIA_URL, "")
+        ) as detail:
+            image = Image.open(detail)
+            self.assertEqual(image.format, "WEBP")
+            self.assertEqual(image.size, (960, 640))
+
+    def test_feed_renders_precomputed_urls(self):
+        thumbnails.build(self.post.pk)
+        post = Post.objects.get(pk=self.post.pk)
+        response = Client().get(reverse("index"))
+        self.assertContains(response, post.thumbnails["feed"]["webp"])
+        self.assertContains(response, post.thumbnails["feed"]["jpg"])
+
+    def test_original_is_shown_until_renditions_are_ready(self):
+        response = Client().get(reverse("index"))
+        self.assertContains(response, self.post.image.url)
+
+    def test_new_image_resets_renditions(self):
+        thumbnails.build(self.post.pk)
+        post = Post.objects.get(pk=self.post.pk)
+        post.image = make_image("other.png")
+        post.save()
+        self.assertEqual(Post.objects.get(pk=post.pk).thumbnails, {})
+
+    def test_editing_text_keeps_renditions(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        thumbnails.build(self.post.pk)
+        stale.text = "Новый текст"
+        stale.save()
+        self.assertEqual(
+            set(Post.objects.get(pk=self.post.pk).thumbnails),
+            {"feed", "detail"},
+        )
+        self.assertEqual(ThumbnailSet.objects.get().refs, 1)
+
+    def test_same_image_shares_renditions(self):
+        thumbnails.build(self.post.pk)
+        other = Post.objects.create(
+            text=TEXT, author=self.user, image=make_image("copy.png")
+        )
+        thumbnails.build(other.pk)
+        first = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(
+            Post.objects.get(pk=other.pk).renditions, first.renditions
+        )
+        thumbnail_set = ThumbnailSet.objects.get()
+        self.assertEqual(thumbnail_set.refs, 2)
+        other.delete()
+        thumbnail_set.refresh_from_db()
+        self.assertEqual(thumbnail_set.refs, 1)
+
+    def test_rebuild_and_sweep(self):
+        thumbnails.build(self.post.pk)
+        stale = default_storage.save(
+            "thumbnails/1/feed-old.jpg", ContentFile(b"old")
+        )
+        Post.objects.filter(pk=self.post.pk).update(renditions="")
+        self.assertEqual(thumbnails.rebuild_all(), 1)
+        self.assertEqual(thumbnails.sweep(min_age=0), 1)
+        self.assertFalse(default_storage.exists(stale))
+        for path in thumbnails.paths_of(
+            Post.objects.get(pk=self.post.pk).renditions
+        ):
+            self.assertTrue(default_storage.exists(path))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT_TEMP, THUMBNAIL_BACKGROUND=False)
+class ThumbnailScheduleTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT_TEMP, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_saving_image_builds_renditions_after_commit(self):
+        user = User.objects.create_user(username="test_user")
+        post = Post.objects.create(text=TEXT, author=user, image=make_image())
+        self.assertIn("feed", Post.objects.get(pk=post.pk).thumbnails)
+
+    def test_unreferenced_files_are_removed(self):
+        user = User.objects.create_user(username="test_user")
+        first, second, third = (
+            Post.objects.create(text=TEXT, author=user, image=make_image())
+            for _ in range(3)
+        )
+        paths = thumbnails.paths_of(
+            Post.objects.get(pk=first.pk).renditions
+        )
+        first.delete()
+        Post.objects.filter(pk=second.pk).update(image="")
+        thumbnails.build(second.pk)
+        self.assertEqual(Post.objects.get(pk=second.pk).renditions, "")
+        for path in paths:
+            self.assertTrue(default_storage.exists(path))
+        third.delete()
+        self.assertFalse(ThumbnailSet.objects.exists())
+        for path in paths:
+            self.assertFalse(default_storage.exists(path))
@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import tasks
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+TEXT = "Текст"
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.post = Post.objects.create(text=TEXT, author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed(self):
+        response = self.reader_client.get(reverse("follow_index"))
+        return list(response.context["page"])
+
+    def test_follow_backfills_timeline(self):
+        """После подписки старые посты автора попадают в ленту."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.reader, post=self.post
+            ).exists()
+        )
+        self.assertEqual(self.feed(), [self.post])
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост раскладывается по лентам подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text=TEXT, author=self.author)
+        self.assertEqual(self.feed(), [new_post, self.post])
+
+    def test_unfollow_purges_timeline(self):
+        """После отписки посты автора убираются из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=0)
+    def test_prolific_author_is_read_on_request(self):
+        """Посты популярного автора не раскладываются, но видны в ленте."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text=TEXT, author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [new_post, self.post])
+
+    @override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=2, TASKS_EAGER=False)
+    def test_author_returns_to_fan_out_after_many_unfollows(self):
+        """Если подписчиков сразу стало меньше порога, их ленты
+        заполняются заново.
+        """
+        others = [
+            User.objects.create_user(username=f"other{number}")
+            for number in range(3)
+        ]
+        for user in [self.reader, *others]:
+            Follow.objects.create(user=user, author=self.author)
+        tasks.work(once=True)
+        self.assertFalse(TimelineEntry.objects.exists())
+        Follow.objects.filter(user__in=others).delete()
+        tasks.work(once=True)
+        self.assertEqual(self.feed(), [self.post])
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+
+    @override_settings(TIMELINE_FANOUT=False)
+    def test_fanout_can_be_disabled(self):
+        """Без fan-out лента строится запросом по подпискам."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [self.post])
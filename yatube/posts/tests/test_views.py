@@ -201,7 +201,7 @@ class TaskPagesTests(TestCase):
         self.assertEqual(image.name.split("/")[-1], self.image.name)
 
     def test_main_page_cache(self):
-        """Тестирование работы кэширования на главной странице."""
+        """Кэш главной страницы сбрасывается при создании поста."""
         response = self.authorized_client.get(reverse("index"))
         Post.objects.create(
             text=TEXT,
@@ -213,7 +213,7 @@ class TaskPagesTests(TestCase):
         count_posts_cache = len(html_string.findAll("small"))
         self.assertEqual(
             count_posts_cache,
-            len(response.context.get("page").object_list)
+            len(response.context.get("page").object_list) + 1
         )
 
     def test_authorized_user_can_follow_unfollow_another_users(self):
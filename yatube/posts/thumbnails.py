@@ -0,0 +1,288 @@
+"""Превью картинок постов, которые готовятся при сохранении.
+
+После сохранения поста с новой картинкой строятся все версии из
+THUMBNAIL_RENDITIONS во всех THUMBNAIL_FORMATS, а их пути пишутся в
+Post.renditions. Шаблоны берут готовые URL из Post.thumbnails: ни
+запросов к базе, ни обращений к хранилищу при показе.
+
+Путь превью зависит только от содержимого исходной картинки и
+параметров версии: thumbnails/ab/<sha256>/960x339c-q85.webp. Посты с
+одинаковой картинкой делят одни файлы, а готовое превью повторно не
+строится. ThumbnailSet.refs считает посты, которые ссылаются на превью
+исходника с этим sha256; когда ссылок не остаётся, его превью
+удаляются после коммита. Пока превью не готовы, показывается исходная
+картинка.
+"""
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, connections, transaction
+from django.db.models import F
+from PIL import Image, ImageOps
+
+from yatube import metrics
+
+from . import caching
+from .models import Post, ThumbnailSet
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp", "PNG": "png"}
+ROOT = "thumbnails"
+# Минимальный возраст файла превью, который sweep может удалить, секунды.
+SWEEP_MIN_AGE = 60 * 60
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix="thumbnails",
+        )
+    return _executor
+
+
+def rendition_path(digest, spec, image_format):
+    """Путь превью по хэшу исходника и параметрам версии."""
+    width, height = spec["size"]
+    crop = "c" if spec["crop"] else ""
+    return (
+        f"{ROOT}/{digest[:2]}/{digest}/{width}x{height}{crop}"
+        f"-q{settings.THUMBNAIL_QUALITY}.{EXTENSIONS[image_format]}"
+    )
+
+
+def paths_of(renditions):
+    """Пути файлов из значения Post.renditions."""
+    if not renditions:
+        return []
+    return [
+        path for formats in json.loads(renditions).values()
+        for path in formats.values()
+    ]
+
+
+def digests_of(paths):
+    """sha256 исходников из путей превью."""
+    return {path.split("/")[2] for path in paths}
+
+
+def render(image, size, crop):
+    """Вписывает картинку в size; с crop — обрезает по центру."""
+    if crop:
+        return ImageOps.fit(image, size, Image.LANCZOS)
+    image = image.copy()
+    image.thumbnail(size, Image.LANCZOS)
+    return image
+
+
+def generate(post, force=False):
+    """Сохраняет недостающие версии картинки поста и возвращает пути.
+
+    С force версии строятся заново, даже если файлы уже есть.
+    """
+    with post.image.open("rb") as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()
+    image = None
+    paths = {}
+    for name, spec in settings.THUMBNAIL_RENDITIONS.items():
+        rendered = None
+        for image_format in settings.THUMBNAIL_FORMATS:
+            path = rendition_path(digest, spec, image_format)
+            extension = EXTENSIONS[image_format]
+            paths.setdefault(name, {})[extension] = path
+            if not force and default_storage.exists(path):
+                continue
+            if image is None:
+                image = Image.open(io.BytesIO(data))
+                image = ImageOps.exif_transpose(image).convert("RGB")
+            if rendered is None:
+                rendered = render(image, spec["size"], spec["crop"])
+            buffer = io.BytesIO()
+            rendered.save(
+                buffer, image_format, quality=settings.THUMBNAIL_QUALITY
+            )
+            default_storage.delete(path)
+            saved = default_storage.save(path, ContentFile(buffer.getvalue()))
+            if saved != path:
+                # Такое же превью только что сохранил другой процесс.
+                default_storage.delete(saved)
+    return paths
+
+
+def acquire(paths):
+    """Пост стал ссылаться на превью с путями paths."""
+    digests = digests_of(paths)
+    if not digests:
+        return
+    ThumbnailSet.objects.bulk_create(
+        [ThumbnailSet(digest=digest) for digest in digests],
+        ignore_conflicts=True,
+    )
+    ThumbnailSet.objects.filter(digest__in=digests).update(
+        refs=F("refs") + 1
+    )
+
+
+def release(paths):
+    """Пост перестал ссылаться на превью с путями paths; превью, на
+    которые больше никто не ссылается, удаляются после коммита.
+    """
+    digests = digests_of(paths)
+    if not digests:
+        return
+    ThumbnailSet.objects.filter(digest__in=digests, refs__gt=0).update(
+        refs=F("refs") - 1
+    )
+    unused = list(ThumbnailSet.objects.filter(
+        digest__in=digests, refs=0
+    ).values_list("digest", flat=True))
+    ThumbnailSet.objects.filter(digest__in=unused, refs=0).delete()
+    for digest in unused:
+        transaction.on_commit(lambda digest=digest: _delete_files(digest))
+
+
+def _delete_files(digest):
+    # Пока ждали коммита, ту же картинку могли сохранить снова.
+    if ThumbnailSet.objects.filter(digest=digest).exists():
+        return
+    for path in _walk(f"{ROOT}/{digest[:2]}/{digest}"):
+        default_storage.delete(path)
+
+
+def build(post_id, force=False):
+    """Готовит превью поста и сохраняет их пути в Post.renditions."""
+    post = Post.objects.filter(pk=post_id).only(
+        "image", "author", "group", "renditions"
+    ).first()
+    if post is None:
+        return
+    old_paths = paths_of(post.renditions)
+    if not post.image:
+        if old_paths:
+            with transaction.atomic():
+                if Post.objects.filter(
+                    pk=post_id, image="", renditions=post.renditions
+                ).update(renditions=""):
+                    release(old_paths)
+        return
+    started = time.perf_counter()
+    try:
+        paths = generate(post, force)
+    except (OSError, ValueError):
+        logger.warning("Не удалось подготовить превью поста %s", post_id)
+        return
+    metrics.observe_thumbnail(time.perf_counter() - started)
+    renditions = json.dumps(paths, sort_keys=True)
+    with transaction.atomic():
+        # Если картинку успели заменить, её превью построит следующий
+        # вызов.
+        updated = Post.objects.filter(
+            pk=post_id, image=post.image.name, renditions=post.renditions
+        ).exclude(renditions=renditions).update(renditions=renditions)
+        if not updated:
+            return
+        acquire(paths_of(renditions))
+        release(old_paths)
+    caching.bump(
+        f"post:{post_id}",
+        *caching.post_pages(post.author_id, post.group_id),
+    )
+
+
+def _rebuild(job):
+    post_id, force = job
+    try:
+        build(post_id, force)
+    except Exception:
+        logger.exception("Ошибка при подготовке превью поста %s", post_id)
+        return False
+    return True
+
+
+def rebuild_all(processes=1, force=False):
+    """Строит превью всех постов с картинками в processes процессах и
+    возвращает число постов, для которых это удалось.
+    """
+    jobs = [
+        (post_id, force) for post_id in Post.objects.exclude(
+            image=""
+        ).exclude(image__isnull=True).values_list("pk", flat=True)
+    ]
+    if processes <= 1:
+        return sum(map(_rebuild, jobs))
+    # Соединение родителя нельзя использовать в дочерних процессах.
+    connections.close_all()
+    with multiprocessing.get_context("fork").Pool(processes) as pool:
+        return sum(pool.imap_unordered(_rebuild, jobs, chunksize=16))
+
+
+def _walk(directory):
+    try:
+        directories, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in files:
+        yield f"{directory}/{name}"
+    for name in directories:
+        yield from _walk(f"{directory}/{name}")
+
+
+def sweep(min_age=SWEEP_MIN_AGE):
+    """Удаляет файлы превью, на которые не ссылается ни один пост.
+
+    Файлы моложе min_age секунд не трогаются: их пути могут ещё не
+    успеть записаться в Post.renditions.
+    """
+    referenced = set()
+    for renditions in Post.objects.exclude(renditions="").values_list(
+        "renditions", flat=True
+    ).iterator():
+        referenced.update(paths_of(renditions))
+    deadline = time.time() - min_age
+    removed = 0
+    for path in _walk(ROOT):
+        if path in referenced:
+            continue
+        if default_storage.get_modified_time(path).timestamp() > deadline:
+            continue
+        default_storage.delete(path)
+        removed += 1
+    return removed
+
+
+def _build_logged(post_id):
+    # Ошибка превью не должна ломать запрос, который сохранил пост.
+    try:
+        build(post_id)
+    except Exception:
+        logger.exception("Ошибка при подготовке превью поста %s", post_id)
+
+
+def _build_in_background(post_id):
+    try:
+        _build_logged(post_id)
+    finally:
+        connection.close()
+
+
+def schedule(post_id):
+    """Запускает подготовку превью после коммита транзакции."""
+    if settings.THUMBNAIL_BACKGROUND:
+        transaction.on_commit(
+            lambda: _get_executor().submit(_build_in_background, post_id)
+        )
+    else:
+        transaction.on_commit(lambda: _build_logged(post_id))
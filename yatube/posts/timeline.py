@@ -0,0 +1,149 @@
+"""Материализованная лента подписок (fan-out-on-write).
+
+Новый пост сразу раскладывается по лентам подписчиков автора, поэтому
+страница подписок читает готовый отсортированный срез TimelineEntry.
+Посты авторов, у которых подписчиков больше
+TIMELINE_FANOUT_MAX_FOLLOWERS, не раскладываются, а подмешиваются
+при чтении (fan-out-on-read). Режим автора хранится в
+ProfileStats.timeline_pulled и меняет его только sync_mode, поэтому
+возврат к раскладыванию не зависит от того, на сколько сразу
+уменьшилось число подписчиков.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+
+from .models import Follow, Post, ProfileStats, TimelineEntry
+
+BATCH_SIZE = 500
+
+
+def followers_count(author_id):
+    stats = ProfileStats.objects.filter(user_id=author_id).first()
+    return stats.followers_count if stats else 0
+
+
+def is_prolific(author_id):
+    """Посты автора читаются при запросе, а не раскладываются по лентам."""
+    return ProfileStats.objects.filter(
+        user_id=author_id, timeline_pulled=True
+    ).exists()
+
+
+def sync_mode(*author_ids):
+    """Переводит авторов в режим, который соответствует числу подписчиков.
+
+    При возврате к раскладыванию посты автора раскладываются по лентам
+    всех подписчиков в той же транзакции, что и смена режима: до её
+    конца ленты ещё подмешивают посты при чтении.
+    """
+    for author_id in author_ids:
+        _sync_mode(author_id)
+
+
+def _sync_mode(author_id):
+    pulled = followers_count(author_id) > (
+        settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+    )
+    with transaction.atomic():
+        changed = ProfileStats.objects.filter(
+            user_id=author_id, timeline_pulled=not pulled
+        ).update(timeline_pulled=pulled)
+        if changed and not pulled:
+            followers = Follow.objects.filter(
+                author_id=author_id
+            ).values_list("user_id", flat=True)
+            for follower_id in followers.iterator():
+                backfill(follower_id, author_id)
+
+
+def _insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out_post(post):
+    """Добавляет новый пост в ленты подписчиков его автора."""
+    if post.author_id is None or is_prolific(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list("user_id", flat=True)
+    _insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def fan_out(post_id):
+    """fan_out_post по id: для очереди задач posts.tasks."""
+    post = Post.objects.filter(pk=post_id).only(
+        "author", "pub_date"
+    ).first()
+    if post is not None:
+        fan_out_post(post)
+
+
+def sync_follow(user_id, author_id):
+    """Приводит ленту пользователя к текущему состоянию подписки.
+
+    Задачи очереди могут выполниться не в том порядке, в котором
+    пользователь подписывался и отписывался, поэтому смотрим на Follow.
+    """
+    sync_mode(author_id)
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        backfill(user_id, author_id)
+    else:
+        purge(user_id, author_id)
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту пользователя постами автора после подписки."""
+    if is_prolific(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        "pk", "pub_date"
+    )
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def purge(user_id, author_id):
+    """Убирает посты автора из ленты пользователя после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(user_id):
+    """Пересобирает ленту пользователя с нуля."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    authors = Follow.objects.filter(user_id=user_id).values_list(
+        "author_id", flat=True
+    )
+    for author_id in authors:
+        backfill(user_id, author_id)
+
+
+def get_follow_feed(user):
+    """Посты авторов, на которых подписан пользователь."""
+    if not settings.TIMELINE_FANOUT:
+        return Post.objects.filter(author__following__user=user)
+    followed = Follow.objects.filter(user=user).values("author")
+    pulled = list(
+        ProfileStats.objects.filter(
+            user__in=followed, timeline_pulled=True
+        ).values_list("user", flat=True)
+    )
+    if not pulled:
+        # F() вместо строк: иначе Django сортирует по Meta.ordering
+        # поста через лишний JOIN и индекс ленты не используется.
+        return Post.objects.filter(timeline_entries__user=user).order_by(
+            F("timeline_entries__pub_date").desc(),
+            F("timeline_entries__post").desc(),
+        )
+    entries = TimelineEntry.objects.filter(user=user).values("post")
+    return Post.objects.filter(Q(pk__in=entries) | Q(author__in=pulled))
@@ -0,0 +1,438 @@
+"""Потоковый импорт и экспорт пользователей, групп, постов,
+комментариев и подписок в NDJSON и CSV.
+
+Экспорт читает базу через iterator(), импорт пишет пачками
+bulk_create, поэтому память не зависит от объёма данных. Внешние
+ключи записываются как username и slug и при импорте разрешаются
+через кэш Lookup. Пост или комментарий с уже занятым id — ошибка:
+комментарии ссылаются на посты по id и попали бы к чужому посту.
+Пользователи, группы и подписки, которые уже есть, пропускаются.
+bulk_create обходит сигналы posts.signals, поэтому после импорта
+счётчики, ленты подписок, поисковый индекс, превью и версии кэша
+обновляются отдельно, см. Importer.finish.
+"""
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import caching, counters, graph, search, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, ProfileStats, User
+
+FORMATS = ("ndjson", "csv")
+
+# Поля файла и соответствующие им выражения для values_list().
+EXPORT_FIELDS = {
+    "users": {
+        "username": "username",
+        "email": "email",
+        "first_name": "first_name",
+        "last_name": "last_name",
+        "password": "password",
+        "date_joined": "date_joined",
+    },
+    "groups": {
+        "slug": "slug",
+        "title": "title",
+        "description": "description",
+    },
+    "posts": {
+        "id": "pk",
+        "author": "author__username",
+        "group": "group__slug",
+        "text": "text",
+        "pub_date": "pub_date",
+        "image": "image",
+    },
+    "comments": {
+        "id": "pk",
+        "post": "post_id",
+        "author": "author__username",
+        "text": "text",
+        "created": "created",
+    },
+    "follows": {
+        "user": "user__username",
+        "author": "author__username",
+    },
+}
+MODELS = {
+    "users": User,
+    "groups": Group,
+    "posts": Post,
+    "comments": Comment,
+    "follows": Follow,
+}
+KINDS = tuple(EXPORT_FIELDS)
+# Поля, по которым запись из файла совпадает с записью в базе.
+NATURAL_KEYS = {
+    "users": ("username",),
+    "groups": ("slug",),
+    "posts": ("pk",),
+    "comments": ("pk",),
+    "follows": ("user_id", "author_id"),
+}
+# Для них совпадение — ошибка, а не повторный импорт.
+STRICT_KINDS = ("posts", "comments")
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_rows(kind, batch_size):
+    """Записи модели по одной, без загрузки таблицы в память."""
+    fields = EXPORT_FIELDS[kind]
+    rows = MODELS[kind].objects.order_by("pk").values_list(*fields.values())
+    for row in rows.iterator(chunk_size=batch_size):
+        yield dict(zip(fields, map(_serialize, row)))
+
+
+def write_records(stream, fmt, kind, records):
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=list(EXPORT_FIELDS[kind]))
+        writer.writeheader()
+        for count, record in enumerate(records, 1):
+            writer.writerow(record)
+        return count
+    for count, record in enumerate(records, 1):
+        stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return count
+
+
+def read_records(stream, fmt):
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+class Lookup:
+    """Кэш «natural key → pk» с догрузкой недостающих ключей пачкой."""
+
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+        self.cache = {}
+
+    def prefetch(self, keys):
+        missing = {key for key in keys if key and key not in self.cache}
+        if missing:
+            self.cache.update(
+                self.model.objects.filter(
+                    **{f"{self.field}__in": missing}
+                ).values_list(self.field, "pk")
+            )
+
+    def __getitem__(self, key):
+        if not key:
+            return None
+        try:
+            return self.cache[key]
+        except KeyError:
+            raise ValueError(
+                f"{self.model.__name__} с {self.field}={key!r} не найден"
+            ) from None
+
+
+def _value(record, field):
+    """Значение поля записи; пустая строка CSV считается отсутствием."""
+    value = record.get(field)
+    return None if value == "" else value
+
+
+def _id(record, field):
+    value = _value(record, field)
+    return int(value) if value is not None else None
+
+
+def _date(record, field):
+    value = _value(record, field)
+    return parse_datetime(value) if value else None
+
+
+@contextmanager
+def keep_dates(*fields):
+    """Отключает auto_now_add, чтобы сохранить даты из файла."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+class Importer:
+    """Импорт записей одного вида пачками по batch_size."""
+
+    def __init__(self, kind, batch_size=1000, images_dir=None, workers=1):
+        self.kind = kind
+        self.batch_size = batch_size
+        self.images_dir = images_dir
+        self.workers = workers
+        self.users = Lookup(User, "username")
+        self.groups = Lookup(Group, "slug")
+        self.authors = set()
+        self.group_ids = set()
+        self.post_ids = set()
+        self.skipped = 0
+        self.max_post_id = Post.objects.aggregate(top=Max("pk"))["top"] or 0
+
+    def build_users(self, batch):
+        return [
+            User(
+                username=record["username"],
+                email=_value(record, "email") or "",
+                first_name=_value(record, "first_name") or "",
+                last_name=_value(record, "last_name") or "",
+                password=_value(record, "password") or make_password(None),
+                date_joined=_date(record, "date_joined") or timezone.now(),
+            )
+            for record in batch
+        ]
+
+    def build_groups(self, batch):
+        return [
+            Group(
+                slug=record["slug"],
+                title=record["title"],
+                description=_value(record, "description") or "",
+            )
+            for record in batch
+        ]
+
+    def build_posts(self, batch):
+        self.users.prefetch(record.get("author") for record in batch)
+        self.groups.prefetch(record.get("group") for record in batch)
+        posts = []
+        for record in batch:
+            post = Post(
+                pk=_id(record, "id"),
+                author_id=self.users[_value(record, "author")],
+                group_id=self.groups[_value(record, "group")],
+                text=record["text"],
+                image=_value(record, "image") or "",
+            )
+            post.pub_date = _date(record, "pub_date") or timezone.now()
+            posts.append(post)
+        return posts
+
+    def build_comments(self, batch):
+        self.users.prefetch(record.get("author") for record in batch)
+        comments = []
+        for record in batch:
+            comment = Comment(
+                pk=_id(record, "id"),
+                post_id=_id(record, "post"),
+                author_id=self.users[_value(record, "author")],
+                text=record["text"],
+            )
+            comment.created = _date(record, "created") or timezone.now()
+            comments.append(comment)
+        return comments
+
+    def build_follows(self, batch):
+        self.users.prefetch(
+            key for record in batch for key in (record["user"],
+                                                record["author"])
+        )
+        return [
+            Follow(
+                user_id=self.users[record["user"]],
+                author_id=self.users[record["author"]],
+            )
+            for record in batch
+        ]
+
+    def copy_images(self, posts):
+        """Копирует картинки постов из images_dir в хранилище."""
+        def copy(name):
+            if default_storage.exists(name):
+                return
+            with open(os.path.join(self.images_dir, name), "rb") as source:
+                default_storage.save(name, source)
+
+        names = {post.image.name for post in posts if post.image}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(copy, names))
+
+    def new_objects(self, objects):
+        """Объекты пачки без тех, что уже есть в базе или в файле выше."""
+        model = MODELS[self.kind]
+        fields = NATURAL_KEYS[self.kind]
+
+        def key(obj):
+            return tuple(getattr(obj, field) for field in fields)
+
+        keyed = [obj for obj in objects if None not in key(obj)]
+        seen = set()
+        if keyed:
+            seen.update(model.objects.filter(**{
+                f"{field}__in": {getattr(obj, field) for obj in keyed}
+                for field in fields
+            }).values_list(*fields))
+        fresh = []
+        for obj in objects:
+            obj_key = key(obj)
+            if None in obj_key:
+                fresh.append(obj)
+            elif obj_key not in seen:
+                seen.add(obj_key)
+                fresh.append(obj)
+            elif self.kind in STRICT_KINDS:
+                raise ValueError(
+                    f"{model.__name__} с id={obj_key[0]} уже есть"
+                )
+            else:
+                self.skipped += 1
+        return fresh
+
+    def run(self, records):
+        """Импортирует записи и возвращает число добавленных.
+
+        Пропущенные записи считаются в self.skipped.
+        """
+        model = MODELS[self.kind]
+        build = getattr(self, f"build_{self.kind}")
+        total = 0
+        date_fields = [
+            field for field in model._meta.concrete_fields
+            if getattr(field, "auto_now_add", False)
+        ]
+        with keep_dates(*date_fields):
+            for batch in batched(records, self.batch_size):
+                objects = self.new_objects(build(batch))
+                if self.kind == "posts" and self.images_dir:
+                    self.copy_images(objects)
+                model.objects.bulk_create(objects, batch_size=self.batch_size)
+                self.after_batch(objects)
+                total += len(objects)
+        self.finish()
+        return total
+
+    def after_batch(self, objects):
+        if self.kind == "posts":
+            self.authors.update(post.author_id for post in objects)
+            self.group_ids.update(post.group_id for post in objects)
+            # Id постов, вставленных без id, SQLite не возвращает: их
+            # находит imported_posts. Посты с id в занятом диапазоне
+            # обрабатываются сразу.
+            self.process_posts([
+                post.pk for post in objects
+                if post.pk and post.pk <= self.max_post_id
+            ])
+        elif self.kind == "comments":
+            post_ids = {comment.post_id for comment in objects}
+            for post_id in post_ids:
+                search.index_post(post_id)
+            pages = Post.objects.filter(pk__in=post_ids).values_list(
+                "author_id", "group_id"
+            )
+            caching.bump(
+                *(f"post:{post_id}" for post_id in post_ids),
+                *(name for author_id, group_id in pages
+                  for name in caching.post_pages(author_id, group_id)),
+            )
+            self.post_ids.update(post_ids)
+        elif self.kind == "follows":
+            for follow in objects:
+                timeline.backfill(follow.user_id, follow.author_id)
+            self.authors.update(
+                user_id for follow in objects
+                for user_id in (follow.user_id, follow.author_id)
+            )
+
+    def imported_posts(self):
+        """Пачки id постов с id больше, чем были до импорта."""
+        new = Post.objects.filter(pk__gt=self.max_post_id)
+        yield from batched(
+            new.values_list("pk", flat=True).iterator(), self.batch_size
+        )
+
+    def process_posts(self, post_ids):
+        """Индексирует посты и строит их превью."""
+        for post_id in post_ids:
+            search.index_post(post_id)
+        self.build_thumbnails(
+            Post.objects.filter(pk__in=post_ids, renditions="")
+            .exclude(image="").values_list("pk", flat=True)
+        )
+
+    def finish(self):
+        """Обновляет то, что при обычном save() делают сигналы."""
+        if self.kind == "users":
+            users = User.objects.filter(stats__isnull=True)
+            for batch in batched(users.iterator(), self.batch_size):
+                ProfileStats.objects.bulk_create(
+                    [ProfileStats(user=user) for user in batch],
+                    ignore_conflicts=True,
+                )
+        if self.kind in ("posts", "follows"):
+            counters.recount_profiles(
+                User.objects.filter(pk__in=self.authors)
+            )
+            caching.forget_authors(*self.authors)
+            caching.bump(*(f"stats:{pk}" for pk in self.authors))
+        if self.kind == "follows":
+            graph.forget(*self.authors)
+            timeline.sync_mode(*self.authors)
+        if self.kind == "comments":
+            counters.recount_comments(
+                Post.objects.filter(pk__in=self.post_ids)
+            )
+        if self.kind == "posts":
+            follows = Follow.objects.filter(author__in=self.authors)
+            for user_id, author_id in follows.values_list(
+                "user", "author"
+            ).iterator():
+                timeline.backfill(user_id, author_id)
+            for post_ids in self.imported_posts():
+                self.process_posts(post_ids)
+            caching.bump(
+                f"feed:{caching.INDEX_FEED}",
+                *(f"feed:{caching.profile_feed(pk)}" for pk in self.authors),
+                *(f"feed:{caching.group_feed(pk)}" for pk in self.group_ids),
+                *map(caching.profile_page, self.authors),
+                *map(caching.group_page, filter(None, self.group_ids)),
+            )
+
+    def build_thumbnails(self, post_ids):
+        """Строит превью в self.workers потоках."""
+        def build(post_id):
+            try:
+                thumbnails.build(post_id)
+            finally:
+                connection.close()
+
+        if self.workers <= 1:
+            for post_id in post_ids:
+                thumbnails.build(post_id)
+            return
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(build, list(post_ids)))
@@ -1,6 +1,7 @@
 from django.urls import path
 
 from . import views
+from .parallel import switchable
 
 urlpatterns = [
     path("new/", views.new_post, name="post_new"),
@@ -8,11 +9,37 @@ urlpatterns = [
         "<str:username>/<int:post_id>/edit/",
         views.post_edit,
         name="post_edit"),
-    path("", views.index, name="index"),
-    path("group/<slug:slug>/", views.group_posts, name="group"),
-    path("follow/", views.follow_index, name="follow_index"),
-    path("<str:username>/", views.profile, name="profile"),
-    path("<str:username>/<int:post_id>/", views.post_view, name="post"),
+    path(
+        "",
+        switchable(views.index),
+        name="index"
+    ),
+    path(
+        "group/<slug:slug>/",
+        switchable(views.group_posts),
+        name="group"
+    ),
+    path(
+        "follow/",
+        switchable(views.follow_index),
+        name="follow_index"
+    ),
+    path("search/", views.search_posts, name="search"),
+    path(
+        "<str:username>/",
+        switchable(views.profile),
+        name="profile"
+    ),
+    path(
+        "<str:username>/<int:post_id>/",
+        switchable(views.post_view),
+        name="post"
+    ),
+    path(
+        "<str:username>/<int:post_id>/comments/",
+        views.post_comments,
+        name="post_comments"
+    ),
     path(
         "<str:username>/<int:post_id>/comment/",
         views.add_comment,
@@ -1,46 +1,63 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.template.loader import render_to_string
 
+from . import conditional, graph
+from .caching import (INDEX_FEED, get_author_or_404, get_feed_page,
+                      group_feed, prepare_posts, profile_feed)
+from .comments import get_comments, parse_cursor
+from .feeds import feed_queryset
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Follow, Group, User
+from .paginators import get_page
+from .parallel import SEQUENTIAL
+from .resolvers import resolved_post
+from .search import search
+from .timeline import get_follow_feed
 
 
-def get_items_paginator(request, item, item_per_page):
-    posts_list = item.posts.all()
-    paginator = Paginator(posts_list, item_per_page)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    return page
+def get_items_paginator(request, item, item_per_page, feed,
+                        paginate=get_page):
+    posts_list = feed_queryset(item.posts.all())
+    return get_feed_page(request, feed, posts_list, item_per_page, paginate)
 
 
-@cache_page(20)
-def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, settings.ELEMENTS_PAGINATOR)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+def index(request, strategy=SEQUENTIAL):
+    post_list = feed_queryset()
+    page = get_feed_page(
+        request, INDEX_FEED, post_list, paginate=strategy.paginate
+    )
     return render(request, "posts/index.html", {"page": page})
 
 
-def group_posts(request, slug):
+@conditional.group_page
+def group_posts(request, slug, strategy=SEQUENTIAL):
     """Функция get_object_or_404 получает по заданным критериям
     объект из базы данных или возвращает сообщение об ошибке,
     если объект не найден.
     """
     group = get_object_or_404(Group, slug=slug)
-    page = get_items_paginator(request, group, settings.ELEMENTS_PAGINATOR)
+    page = get_items_paginator(
+        request, group, settings.ELEMENTS_PAGINATOR, group_feed(group.pk),
+        strategy.paginate,
+    )
     return render(request, "posts/group.html", {"group": group, "page": page})
 
 
-def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    page = get_items_paginator(request, author, settings.ELEMENTS_PAGINATOR)
+@conditional.profile_page
+def profile(request, username, strategy=SEQUENTIAL):
+    author = get_author_or_404(username)
     user = request.user
-    following = user.is_authenticated and (
-        Follow.objects.filter(user=user, author=author).exists()
+    page, following = strategy.gather(
+        lambda: get_items_paginator(
+            request, author, settings.ELEMENTS_PAGINATOR,
+            profile_feed(author.pk), strategy.paginate,
+        ),
+        lambda: user.is_authenticated and graph.is_following(
+            user.pk, author.pk
+        ),
     )
     user_client = request.user
     return render(
@@ -55,16 +72,48 @@ def profile(request, username):
     )
 
 
-def post_view(request, username, post_id):
-    author = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, author=author, pk=post_id)
-    comments = post.comments.all()
+def comments_page(request, post_id):
+    """Комментарии для страницы поста: первая порция или по курсору
+    из ?comments= (так ссылка «Показать ещё» работает и без JS).
+    """
+    cursor = request.GET.get("comments")
+    per_page = None if cursor else settings.COMMENTS_FIRST_PAGE
+    return get_comments(post_id, cursor, per_page)
+
+
+@conditional.post_page
+@resolved_post(along=comments_page)
+def post_view(request, post, first_comments):
+    comments, comments_cursor = first_comments
     form = CommentForm()
     return render(
         request,
         "posts/post.html",
-        {"author": author, "post": post, "comments": comments, "form": form}
+        {
+            "author": post.author,
+            "post": post,
+            "comments": comments,
+            "comments_cursor": comments_cursor,
+            "form": form,
+        }
+    )
+
+
+@resolved_post
+def post_comments(request, post):
+    """Следующая порция комментариев: HTML-фрагмент и курсор в JSON.
+
+    Без верного курсора — 400: первую порцию клиент уже показал, и она
+    попала бы на страницу дважды.
+    """
+    cursor = request.GET.get("cursor")
+    if parse_cursor(cursor) is None:
+        return HttpResponseBadRequest()
+    comments, cursor = get_comments(post.pk, cursor)
+    html = render_to_string(
+        "posts/comment_items.html", {"comments": comments}, request
     )
+    return JsonResponse({"html": html, "next": cursor})
 
 
 @login_required
@@ -88,11 +137,12 @@ def new_post(request):
 
 
 @login_required
-def post_edit(request, username, post_id):
-    profile = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, pk=post_id, author=profile)
-    if request.user != profile:
-        return redirect("post", username=username, post_id=post_id)
+@resolved_post
+def post_edit(request, post):
+    if request.user != post.author:
+        return redirect(
+            "post", username=post.author.username, post_id=post.pk
+        )
     form = PostForm(request.POST or None, files=request.FILES or None,
                     instance=post)
 
@@ -102,7 +152,7 @@ def post_edit(request, username, post_id):
             post.author = request.user
             post.save()
             return redirect("post", username=request.user.username,
-                            post_id=post_id)
+                            post_id=post.pk)
 
     return render(
         request, "users/new_post.html", {"form": form, "post": post},
@@ -123,30 +173,27 @@ def server_error(request):
 
 
 @login_required
-def add_comment(request, username, post_id):
-    author = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, author=author, pk=post_id)
+@resolved_post
+def add_comment(request, post):
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
         comment.save()
-        return redirect(
-            "post",
-            post_id=post_id,
-            username=username
-        )
-    return redirect("post", post_id=post_id, username=username)
+    return redirect("post", post_id=post.pk, username=post.author.username)
 
 
 @login_required
-def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, settings.ELEMENTS_PAGINATOR)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    return render(request, "posts/follow.html", {"page": page})
+def follow_index(request, strategy=SEQUENTIAL):
+    post_list = feed_queryset(get_follow_feed(request.user))
+    page = strategy.paginate(request, post_list)
+    prepare_posts(page.object_list, request.user)
+    return render(
+        request,
+        "posts/follow.html",
+        {"page": page, "suggestions": graph.suggestions(request.user.pk)},
+    )
 
 
 @login_required
@@ -164,3 +211,14 @@ def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(author=author, user=request.user).delete()
     return redirect("profile", username=username)
+
+
+def search_posts(request):
+    query = request.GET.get("q", "").strip()
+    posts, next_cursor = search(query, request.GET.get("cursor"))
+    prepare_posts(posts, request.user)
+    return render(
+        request,
+        "posts/search.html",
+        {"query": query, "posts": posts, "next_cursor": next_cursor},
+    )
@@ -0,0 +1,119 @@
+"""ASGI-приложение поверх WSGI-обработчика Django.
+
+В Django 2.2 нет django.core.asgi, поэтому ASGIHandler принимает
+запрос ASGI-сервера (uvicorn, daphne, hypercorn), собирает environ и
+выполняет обычный WSGI-обработчик в пуле потоков, не блокируя цикл
+событий. Тело ответа отправляется после того, как представление его
+вернуло целиком.
+"""
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.wsgi import get_wsgi_application
+
+ASGI_THREADS = 8
+
+
+class ASGIHandler:
+    def __init__(self, wsgi_application, threads=ASGI_THREADS):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="asgi"
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f"Неподдерживаемый тип ASGI: {scope['type']}")
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def http(self, scope, receive, send):
+        body = io.BytesIO()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body.write(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body.seek(0)
+        status, headers, content = await asyncio.get_running_loop(
+        ).run_in_executor(
+            self.executor, self.run_wsgi, self.environ(scope, body)
+        )
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": headers,
+        })
+        await send({"type": "http.response.body", "body": content})
+
+    @staticmethod
+    def environ(scope, body):
+        # WSGI передаёт путь байтами UTF-8, декодированными как latin-1.
+        path = scope["path"].encode().decode("latin-1")
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", ""),
+            "PATH_INFO": path,
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                name = f"HTTP_{name}"
+            if name in environ:
+                separator = "; " if name == "HTTP_COOKIE" else ","
+                value = f"{environ[name]}{separator}{value}"
+            environ[name] = value
+        return environ
+
+    def run_wsgi(self, environ):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers
+            ]
+
+        chunks = self.wsgi_application(environ, start_response)
+        try:
+            content = b"".join(chunks)
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+        return response["status"], response["headers"], content
+
+
+def get_asgi_application():
+    return ASGIHandler(get_wsgi_application())
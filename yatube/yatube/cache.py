@@ -0,0 +1,275 @@
+"""Кэш в файле SQLite, общий для всех процессов на одном хосте.
+
+В отличие от LocMemCache, записи и инвалидация видны всем
+WSGI-воркерам. Бэкенд считает попадания, промахи и вытеснения по
+префиксу ключа и периодически сбрасывает счётчики в тот же файл,
+чтобы команда cache_stats видела статистику всех процессов.
+"""
+import os
+import pickle
+import sqlite3
+import time
+from collections import Counter
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    prefix TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires REAL
+);
+CREATE INDEX IF NOT EXISTS cache_entries_expires
+    ON cache_entries (expires);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    prefix TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (prefix, kind)
+);
+"""
+
+HIT = "hits"
+MISS = "misses"
+EVICTION = "evictions"
+
+
+def key_prefix(key):
+    """Группа ключа для статистики: "feed-page", "version", ..."""
+    if key.startswith("template.cache."):
+        return ".".join(key.split(".")[:3])
+    return key.split(":", 1)[0]
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get("OPTIONS", {})
+        self._busy_timeout = options.get("BUSY_TIMEOUT", 5)
+        self._cull_every = options.get("CULL_EVERY", 100)
+        self._stats_interval = options.get("STATS_FLUSH_INTERVAL", 10)
+        self._connection = None
+        self._pid = None
+        self._writes = 0
+        self._stats = Counter()
+        self._stats_flushed_at = time.monotonic()
+
+    @property
+    def _db(self):
+        # Соединение создаётся заново после fork воркера.
+        if self._connection is None or self._pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path,
+                timeout=self._busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def _record(self, key, kind, count=1):
+        self._stats[(key_prefix(key), kind)] += count
+        if kind == HIT:
+            metrics.count("cache_hits", count)
+        elif kind == MISS:
+            metrics.count("cache_misses", count)
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        made_key = self.make_key(key, version=version)
+        self.validate_key(made_key)
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "DELETE FROM cache_entries WHERE key = ? AND expires <= ?",
+                (made_key, time.time()),
+            )
+            added = db.execute(
+                "INSERT OR IGNORE INTO cache_entries VALUES (?, ?, ?, ?)",
+                (made_key, key_prefix(key), self._dumps(value),
+                 self._expires(timeout)),
+            ).rowcount > 0
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        self._after_write()
+        return added
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        made_keys = {}
+        for key in keys:
+            made_key = self.make_key(key, version=version)
+            self.validate_key(made_key)
+            made_keys[made_key] = key
+        placeholders = ", ".join("?" * len(made_keys))
+        rows = self._db.execute(
+            "SELECT key, value, expires FROM cache_entries "
+            f"WHERE key IN ({placeholders})",
+            list(made_keys),
+        ).fetchall()
+        now = time.time()
+        found = {
+            made_keys[made_key]: pickle.loads(value)
+            for made_key, value, expires in rows
+            if expires is None or expires > now
+        }
+        for key in keys:
+            self._record(key, HIT if key in found else MISS)
+        self._maybe_flush_stats()
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if not data:
+            return []
+        expires = self._expires(timeout)
+        rows = []
+        for key, value in data.items():
+            made_key = self.make_key(key, version=version)
+            self.validate_key(made_key)
+            rows.append(
+                (made_key, key_prefix(key), self._dumps(value), expires)
+            )
+        self._db.executemany(
+            "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?)", rows
+        )
+        self._after_write(len(rows))
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        made_key = self.make_key(key, version=version)
+        self.validate_key(made_key)
+        return self._db.execute(
+            "UPDATE cache_entries SET expires = ? "
+            "WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (self._expires(timeout), made_key, time.time()),
+        ).rowcount > 0
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        made_keys = []
+        for key in keys:
+            made_key = self.make_key(key, version=version)
+            self.validate_key(made_key)
+            made_keys.append((made_key,))
+        self._db.executemany(
+            "DELETE FROM cache_entries WHERE key = ?", made_keys
+        )
+
+    def has_key(self, key, version=None):
+        made_key = self.make_key(key, version=version)
+        self.validate_key(made_key)
+        row = self._db.execute(
+            "SELECT 1 FROM cache_entries "
+            "WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (made_key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def clear(self):
+        self._db.execute("DELETE FROM cache_entries")
+
+    def close(self, **kwargs):
+        self._maybe_flush_stats()
+
+    def _dumps(self, value):
+        return sqlite3.Binary(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+    def _after_write(self, count=1):
+        self._writes += count
+        if self._writes >= self._cull_every:
+            self._writes = 0
+            self._cull()
+
+    def _cull(self):
+        db = self._db
+        db.execute(
+            "DELETE FROM cache_entries WHERE expires <= ?", (time.time(),)
+        )
+        total = db.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        if total <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            victims = total
+        else:
+            victims = total // self._cull_frequency
+        # Первыми вытесняются записи, которые раньше всех истекают.
+        selection = (
+            "SELECT key FROM cache_entries "
+            "ORDER BY expires IS NULL, expires LIMIT ?"
+        )
+        evicted = db.execute(
+            "SELECT prefix, COUNT(*) FROM cache_entries "
+            f"WHERE key IN ({selection}) GROUP BY prefix",
+            (victims,),
+        ).fetchall()
+        db.execute(
+            f"DELETE FROM cache_entries WHERE key IN ({selection})",
+            (victims,),
+        )
+        for prefix, count in evicted:
+            self._stats[(prefix, EVICTION)] += count
+
+    def _maybe_flush_stats(self):
+        if time.monotonic() - self._stats_flushed_at >= self._stats_interval:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Переносит накопленные в процессе счётчики в файл кэша."""
+        self._stats_flushed_at = time.monotonic()
+        if not self._stats:
+            return
+        self._db.executemany(
+            "INSERT INTO cache_stats VALUES (?, ?, ?) "
+            "ON CONFLICT (prefix, kind) "
+            "DO UPDATE SET count = count + excluded.count",
+            [(prefix, kind, count)
+             for (prefix, kind), count in self._stats.items()],
+        )
+        self._stats.clear()
+
+    def stats(self):
+        """Статистика по префиксам ключей для всех процессов."""
+        self.flush_stats()
+        report = {}
+        for prefix, kind, count in self._db.execute(
+            "SELECT prefix, kind, count FROM cache_stats"
+        ):
+            report.setdefault(prefix, Counter())[kind] = count
+        for prefix, entries, size in self._db.execute(
+            "SELECT prefix, COUNT(*), SUM(LENGTH(value)) "
+            "FROM cache_entries GROUP BY prefix"
+        ):
+            row = report.setdefault(prefix, Counter())
+            row["entries"] = entries
+            row["bytes"] = size
+        return report
+
+    def reset_stats(self):
+        self._stats.clear()
+        self._db.execute("DELETE FROM cache_stats")
@@ -0,0 +1,283 @@
+"""Метрики производительности запросов по именам URL.
+
+MetricsMiddleware для доли запросов METRICS_SAMPLE_RATE замеряет
+время ответа, число и время SQL-запросов, время рендеринга шаблонов,
+попадания и промахи кэша и время подготовки превью. Значения копятся
+в гистограммах в памяти процесса и раз в METRICS_FLUSH_INTERVAL
+секунд сбрасываются в METRICS_DIR, чтобы эндпоинт /metrics/ и
+команда metrics_dump видели все процессы. Снимки завершившихся
+процессов удаляются при следующей записи. Когда выборка выключена,
+middleware только сравнивает METRICS_SAMPLE_RATE с нулём.
+"""
+import contextvars
+import json
+import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import connection
+from django.http import JsonResponse
+from django.template.backends.django import DjangoTemplates, Template
+
+# Верхние границы корзин: миллисекунды для времени, штуки для счётчиков.
+BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+METRICS = (
+    "wall_ms", "sql_queries", "sql_ms", "template_ms",
+    "cache_hits", "cache_misses", "thumbnail_ms",
+)
+
+SNAPSHOT = re.compile(r"^(?P<kind>\w+)-(?P<pid>\d+)\.json(?:\.tmp)?$")
+
+_sample = contextvars.ContextVar("metrics_sample", default=None)
+_lock = threading.Lock()
+_histograms = defaultdict(dict)
+_flushed_at = time.monotonic()
+
+
+class Histogram:
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.buckets[bisect_left(BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, data):
+        for index, count in enumerate(data["buckets"]):
+            self.buckets[index] += count
+        self.count += data["count"]
+        self.total += data["total"]
+        self.max = max(self.max, data["max"])
+
+    def percentile(self, share):
+        """Верхняя граница корзины, в которую попадает перцентиль."""
+        rank = share * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return BOUNDS[index] if index < len(BOUNDS) else self.max
+        return 0
+
+    def to_dict(self):
+        return {
+            "buckets": self.buckets,
+            "count": self.count,
+            "total": self.total,
+            "max": self.max,
+        }
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+def _add(name, values):
+    with _lock:
+        histograms = _histograms[name]
+        for metric, value in values.items():
+            histograms.setdefault(metric, Histogram()).add(value)
+
+
+def count(metric, value=1):
+    """Добавляет значение к метрике текущего замеряемого запроса."""
+    sample = _sample.get()
+    if sample is not None:
+        sample[metric] += value
+
+
+def observe_thumbnail(seconds):
+    """Время подготовки превью: в запросе и в общей гистограмме."""
+    count("thumbnail_ms", seconds * 1000)
+    if settings.METRICS_SAMPLE_RATE:
+        _add("thumbnails", {"thumbnail_ms": seconds * 1000})
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def prune_snapshots():
+    """Удаляет снимки процессов, которых больше нет."""
+    try:
+        filenames = os.listdir(settings.METRICS_DIR)
+    except FileNotFoundError:
+        return
+    for filename in filenames:
+        match = SNAPSHOT.match(filename)
+        if match is None or _alive(int(match["pid"])):
+            continue
+        try:
+            os.remove(os.path.join(settings.METRICS_DIR, filename))
+        except FileNotFoundError:
+            pass
+
+
+def save_snapshot(kind, data):
+    """Записывает данные процесса в METRICS_DIR/<kind>-<pid>.json."""
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    path = os.path.join(settings.METRICS_DIR, f"{kind}-{os.getpid()}.json")
+    with open(f"{path}.tmp", "w") as snapshot:
+        json.dump(data, snapshot)
+    os.replace(f"{path}.tmp", path)
+    prune_snapshots()
+
+
+def _snapshot_files(kind):
+    try:
+        filenames = os.listdir(settings.METRICS_DIR)
+    except FileNotFoundError:
+        return []
+    return [
+        os.path.join(settings.METRICS_DIR, filename)
+        for filename in filenames
+        if filename.startswith(f"{kind}-") and filename.endswith(".json")
+    ]
+
+
+def load_snapshots(kind):
+    """Данные всех процессов, записанные save_snapshot."""
+    for path in _snapshot_files(kind):
+        try:
+            with open(path) as snapshot:
+                yield json.load(snapshot)
+        except (OSError, ValueError):
+            continue
+
+
+def remove_snapshots(kind):
+    for path in _snapshot_files(kind):
+        os.remove(path)
+
+
+def flush():
+    """Записывает гистограммы процесса в METRICS_DIR."""
+    global _flushed_at
+    _flushed_at = time.monotonic()
+    with _lock:
+        data = {
+            name: {
+                metric: histogram.to_dict()
+                for metric, histogram in histograms.items()
+            }
+            for name, histograms in _histograms.items()
+        }
+    save_snapshot("histograms", data)
+
+
+def _maybe_flush():
+    if time.monotonic() - _flushed_at >= settings.METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+def collect():
+    """Гистограммы всех процессов: {имя URL: {метрика: Histogram}}."""
+    merged = defaultdict(dict)
+    for data in load_snapshots("histograms"):
+        for name, metrics in data.items():
+            for metric, histogram in metrics.items():
+                merged[name].setdefault(metric, Histogram()).merge(histogram)
+    return merged
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+    remove_snapshots("histograms")
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.METRICS_SAMPLE_RATE
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+        sample = Counter()
+        token = _sample.set(sample)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(self.time_query):
+                response = self.get_response(request)
+        finally:
+            _sample.reset(token)
+        sample["wall_ms"] = (time.perf_counter() - started) * 1000
+        match = getattr(request, "resolver_match", None)
+        name = (match.url_name or match.view_name) if match else "unresolved"
+        _add(name, {metric: sample[metric] for metric in METRICS})
+        _maybe_flush()
+        return response
+
+    @staticmethod
+    def time_query(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            count("sql_queries")
+            count("sql_ms", (time.perf_counter() - started) * 1000)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        if _sample.get() is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            count("template_ms", (time.perf_counter() - started) * 1000)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблонизатор Django, который замеряет время рендеринга."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def metrics_view(request):
+    """Сводка метрик: персоналу или по METRICS_TOKEN в заголовке."""
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get("HTTP_AUTHORIZATION")
+    if not (token and authorization == f"Bearer {token}"
+            or request.user.is_staff):
+        raise PermissionDenied
+    flush()
+    return JsonResponse({
+        name: {
+            metric: histogram.summary()
+            for metric, histogram in metrics.items()
+        }
+        for name, metrics in collect().items()
+    })
@@ -0,0 +1,144 @@
+"""Отпечатки SQL-запросов и журнал медленных запросов.
+
+Для доли запросов QUERYLOG_SAMPLE_RATE (по умолчанию 0 — выключено)
+QueryLogMiddleware оборачивает запросы к базе через
+connection.execute_wrapper. Каждый SQL сводится к отпечатку: литералы
+заменяются на «?», списки IN — на «(...)». По паре (имя URL, отпечаток)
+копятся число выполнений, суммарное и максимальное время. Запросы
+дольше QUERYLOG_SLOW_MS пишутся в логгер yatube.slow_queries вместе с
+представлением и строкой кода проекта, которая их выполнила.
+"""
+import contextvars
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import time
+import traceback
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+
+from . import metrics
+
+logger = logging.getLogger("yatube.slow_queries")
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+IN_LIST = re.compile(r"\bIN \((?:\?|%s)(?:, (?:\?|%s))*\)", re.IGNORECASE)
+SPACES = re.compile(r"\s+")
+
+_request = contextvars.ContextVar("querylog_request", default=None)
+_lock = threading.Lock()
+_stats = {}
+_flushed_at = time.monotonic()
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """SQL без конкретных значений: одинаков для запросов одного вида."""
+    normalized = STRING.sub("?", sql)
+    normalized = NUMBER.sub("?", normalized)
+    normalized = IN_LIST.sub("IN (...)", normalized)
+    return SPACES.sub(" ", normalized).strip()
+
+
+def fingerprint_id(text):
+    return hashlib.md5(text.encode()).hexdigest()[:12]
+
+
+def _caller():
+    """Последняя строка кода проекта в стеке, например views.py:57."""
+    root = settings.BASE_DIR + os.sep
+    for frame in reversed(traceback.extract_stack()):
+        if (
+            frame.filename.startswith(root)
+            and frame.filename != __file__
+            and f"{os.sep}site-packages{os.sep}" not in frame.filename
+        ):
+            path = os.path.relpath(frame.filename, settings.BASE_DIR)
+            return f"{path}:{frame.lineno} in {frame.name}"
+    return "-"
+
+
+def _record(view, sql, duration):
+    text = fingerprint(sql)
+    with _lock:
+        row = _stats.get((view, text))
+        if row is None:
+            row = _stats[(view, text)] = {
+                "view": view, "fingerprint": text,
+                "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+            }
+        row["count"] += 1
+        row["total_ms"] += duration
+        row["max_ms"] = max(row["max_ms"], duration)
+    if duration >= settings.QUERYLOG_SLOW_MS:
+        logger.warning(
+            "Медленный запрос %.1f мс [%s] %s из %s: %s",
+            duration, fingerprint_id(text), view, _caller(), sql,
+        )
+
+
+def flush():
+    """Записывает статистику процесса в METRICS_DIR."""
+    global _flushed_at
+    _flushed_at = time.monotonic()
+    with _lock:
+        rows = [dict(row) for row in _stats.values()]
+    metrics.save_snapshot("queries", rows)
+
+
+def collect():
+    """Статистика всех процессов по (имя URL, отпечаток)."""
+    merged = {}
+    for rows in metrics.load_snapshots("queries"):
+        for row in rows:
+            key = (row["view"], row["fingerprint"])
+            total = merged.setdefault(key, {**row, "count": 0,
+                                            "total_ms": 0.0, "max_ms": 0.0})
+            total["count"] += row["count"]
+            total["total_ms"] += row["total_ms"]
+            total["max_ms"] = max(total["max_ms"], row["max_ms"])
+    for row in merged.values():
+        row["id"] = fingerprint_id(row["fingerprint"])
+    return sorted(merged.values(), key=lambda row: -row["total_ms"])
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+    metrics.remove_snapshots("queries")
+
+
+class QueryLogMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.QUERYLOG_SAMPLE_RATE
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+        token = _request.set(request)
+        try:
+            with connection.execute_wrapper(self.log_query):
+                response = self.get_response(request)
+        finally:
+            _request.reset(token)
+        if time.monotonic() - _flushed_at >= settings.METRICS_FLUSH_INTERVAL:
+            flush()
+        return response
+
+    @staticmethod
+    def log_query(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            match = getattr(_request.get(), "resolver_match", None)
+            view = (match.url_name or match.view_name) if match else "-"
+            _record(view, sql, duration)
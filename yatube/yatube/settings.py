@@ -1,4 +1,5 @@
 import os
+import sys
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -7,6 +8,38 @@ SECRET_KEY = "3tm+kv3w*_k%t+e^+&acipi%+=r3x-4^d9ga6w+v-^fheev(9_"
 DEBUG = False
 
 ELEMENTS_PAGINATOR = 10
+# "offset" — номера страниц, "cursor" — keyset-пагинация по (pub_date, id)
+PAGINATION_MODE = "offset"
+PAGINATION_COUNT = True
+# Номера страниц выводятся по PAGINATION_WINDOW с каждой стороны от текущей.
+PAGINATION_WINDOW = 2
+# В режиме "offset" COUNT(*) не считает дальше этого числа строк (и конца
+# окна страниц); None — точный подсчёт.
+PAGINATION_COUNT_LIMIT = 10000
+
+# Имена URL, представления которых выполняют независимые запросы
+# параллельно (стратегия PARALLEL из posts.parallel), например "index,post".
+PARALLEL_VIEWS = frozenset(
+    name for name in os.environ.get("YATUBE_PARALLEL_VIEWS", "").split(",")
+    if name
+)
+PARALLEL_QUERY_WORKERS = 4
+
+# Комментарии на странице поста и в каждой следующей порции (posts.comments).
+COMMENTS_FIRST_PAGE = 20
+COMMENTS_PER_PAGE = 50
+
+TIMELINE_FANOUT = True
+TIMELINE_FANOUT_MAX_FOLLOWERS = 1000
+
+# Списки подписок в кэше (posts.graph) и число рекомендаций «кого почитать».
+GRAPH_CACHE_TIMEOUT = 60 * 60 * 24
+FOLLOW_SUGGESTIONS = 10
+
+# "auto" — FTS5, если есть таблица posts_search, иначе "python"
+SEARCH_BACKEND = "auto"
+SEARCH_CANDIDATES = 500
+SEARCH_RECENCY_SCALE = 60 * 60 * 24 * 7
 
 ALLOWED_HOSTS = [
     "localhost",
@@ -25,15 +58,16 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-    "sorl.thumbnail",
 ]
 
 MIDDLEWARE = [
+    "yatube.metrics.MetricsMiddleware",
+    "yatube.querylog.QueryLogMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "posts.auth.CachedAuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -43,7 +77,7 @@ ROOT_URLCONF = "yatube.urls"
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "yatube.metrics.TimedDjangoTemplates",
         "DIRS": [
             TEMPLATES_DIR,
             "/Users/georgijatoan/Desktop/Dev/hw02_community/yatube/users/templates/registration"
@@ -55,6 +89,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "posts.context_processors.cache_timeouts",
             ],
         },
     },
@@ -65,11 +100,26 @@ WSGI_APPLICATION = "yatube.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "yatube.sqlite",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
     }
 }
 
+# Прагмы, которые yatube.sqlite выполняет на каждом новом соединении.
+# WAL позволяет читать во время записи; synchronous=NORMAL в режиме WAL
+# не теряет целостность, но не делает fsync на каждый коммит.
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 5000,
+    "cache_size": -64000,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "memory",
+}
+SQLITE_IMMEDIATE_TRANSACTIONS = True
+# Не чаще, чем раз в столько секунд на процесс; None отключает.
+SQLITE_OPTIMIZE_INTERVAL = 60 * 60
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -100,11 +150,33 @@ USE_TZ = True
 
 STATIC_URL = "/static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
+# Исходные CSS и JS (bootstrap, jquery) лежат в assets/; collectstatic
+# переносит их в STATIC_ROOT с хэшем в имени и сжатыми копиями.
+STATIC_SOURCE_DIR = os.path.join(BASE_DIR, "assets")
+STATICFILES_DIRS = [
+    path for path in (STATIC_SOURCE_DIR,) if os.path.isdir(path)
+]
+STATICFILES_STORAGE = "yatube.staticfiles.CompressedManifestStorage"
+# Кэш статики без хэша в имени, секунды; файлы с хэшем кэшируются на год.
+STATIC_MAX_AGE = 60 * 10
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
 
+# Сессии читаются из кэша и пишутся ещё и в базу. С
+# YATUBE_SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies
+# сессия целиком живёт в подписанной cookie, но такую сессию нельзя
+# отозвать на сервере: cookie, скопированная до выхода, работает и после.
+SESSION_ENGINE = os.environ.get(
+    "YATUBE_SESSION_ENGINE", "django.contrib.sessions.backends.cached_db"
+)
+# Сколько пользователей posts.auth держит в памяти процесса.
+AUTH_USER_CACHE_SIZE = 10000
+# Через столько секунд пользователь перечитывается из базы, даже если его
+# не сохраняли: так доходят изменения, сделанные в обход сигналов.
+AUTH_USER_CACHE_TIMEOUT = 60
+
 LOGIN_URL = "/auth/login/"
 LOGIN_REDIRECT_URL = "index"
 
@@ -112,8 +184,103 @@ LOGIN_REDIRECT_URL = "index"
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
-CACHES = {
-    "default": {
+# Кэш по умолчанию — файл SQLite, общий для всех воркеров на хосте.
+# Другой бэкенд выбирается переменной окружения YATUBE_CACHE_BACKEND.
+CACHE_BACKENDS = {
+    "sqlite": {
+        "BACKEND": "yatube.cache.SQLiteCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache", "cache.sqlite3"),
+        "OPTIONS": {
+            "MAX_ENTRIES": 100000,
+        },
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache", "files"),
+        "OPTIONS": {
+            "MAX_ENTRIES": 100000,
+        },
+    },
+    "memcached": {
+        "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+        "LOCATION": os.environ.get("YATUBE_CACHE_LOCATION", "127.0.0.1:11211"),
+    },
+    "locmem": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-    }
+    },
+}
+CACHES = {
+    "default": CACHE_BACKENDS[os.environ.get("YATUBE_CACHE_BACKEND", "sqlite")],
+}
+
+# Ключи кэша содержат версии объектов и инвалидируются сигналами,
+# поэтому TTL ограничивает только объём кэша, а не свежесть данных.
+FEED_CACHE_TIMEOUT = 60 * 60
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Картинки из формы поста (posts.images) уменьшаются до IMAGE_MAX_SIZE и
+# кодируются заново; больше IMAGE_MAX_PIXELS пикселей не принимаются.
+IMAGE_MAX_SIZE = (2048, 2048)
+IMAGE_MAX_PIXELS = 50000000
+IMAGE_QUALITY = 85
+
+# Превью картинок постов готовятся при сохранении поста (posts.thumbnails).
+# crop=True обрезает по центру до точного размера, иначе картинка
+# только вписывается в него.
+THUMBNAIL_RENDITIONS = {
+    "feed": {"size": (960, 339), "crop": True},
+    "detail": {"size": (960, 960), "crop": False},
 }
+THUMBNAIL_FORMATS = ("JPEG", "WEBP")
+THUMBNAIL_QUALITY = 85
+# Превью строит пул потоков процесса после коммита; с
+# YATUBE_THUMBNAIL_BACKGROUND=0 — сам запрос, сохранивший пост.
+THUMBNAIL_BACKGROUND = os.environ.get("YATUBE_THUMBNAIL_BACKGROUND") != "0"
+THUMBNAIL_WORKERS = 2
+
+# Работа после записи (posts.tasks): поиск, ленты, превью. Она ставится
+# в очередь, которую разбирает manage.py run_tasks; с YATUBE_TASKS_EAGER=1
+# выполняется сразу, в запросе, который сделал запись.
+TASKS_EAGER = os.environ.get("YATUBE_TASKS_EAGER") == "1"
+TASKS_WORKERS = 2
+TASKS_MAX_ATTEMPTS = 5
+# Задержка перед первым повтором, секунды; дальше она удваивается.
+TASKS_RETRY_DELAY = 30
+# Задача, которая выполняется дольше, считается брошенной упавшим воркером.
+TASKS_LOCK_TIMEOUT = 60 * 10
+TASKS_POLL_INTERVAL = 1
+
+# Доля запросов, для которых yatube.metrics собирает метрики; 0 — выключено.
+METRICS_SAMPLE_RATE = float(os.environ.get("YATUBE_METRICS_SAMPLE_RATE", 0))
+# Токен для /metrics/ без входа под персоналом: "Authorization: Bearer ...".
+METRICS_TOKEN = os.environ.get("YATUBE_METRICS_TOKEN")
+METRICS_DIR = os.path.join(BASE_DIR, "cache", "metrics")
+METRICS_FLUSH_INTERVAL = 10
+
+# Доля запросов, для которых yatube.querylog собирает отпечатки SQL по
+# представлениям и пишет медленные запросы в журнал; 0 — выключено.
+# Статистика сбрасывается в METRICS_DIR.
+QUERYLOG_SAMPLE_RATE = float(os.environ.get("YATUBE_QUERYLOG_SAMPLE_RATE", 0))
+QUERYLOG_SLOW_MS = 100
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "yatube.slow_queries": {"handlers": ["console"], "level": "WARNING"},
+    },
+}
+
+# manage.py test и pytest работают с отдельным кэшем в памяти: тесты
+# очищают кэш и не должны трогать кэш разработчика в BASE_DIR/cache.
+# Превью в тестах строятся в том же потоке: пул продолжал бы писать в
+# MEDIA_ROOT после конца теста. Задачи posts.tasks выполняются сразу,
+# без воркера.
+TESTING = sys.argv[1:2] == ["test"] or "pytest" in sys.modules
+if TESTING:
+    CACHES = {"default": CACHE_BACKENDS["locmem"]}
+    THUMBNAIL_BACKGROUND = False
+    TASKS_EAGER = True
@@ -0,0 +1,67 @@
+"""Бэкенд SQLite с настройкой соединения под конкурентную нагрузку.
+
+Стандартный бэкенд Django открывает файл в режиме журнала DELETE:
+пока идёт запись комментария или поста, читатели ждут, а параллельные
+записи получают «database is locked». Здесь каждое новое соединение
+получает прагмы из settings.SQLITE_PRAGMAS (WAL, synchronous,
+cache_size, mmap_size, busy_timeout), транзакции начинаются с
+BEGIN IMMEDIATE, а при закрытии соединения не чаще раза в
+SQLITE_OPTIMIZE_INTERVAL секунд выполняется PRAGMA optimize.
+"""
+import time
+
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+_optimized_at = None
+
+
+def apply_pragmas(connection, pragmas):
+    """Выполняет прагмы на соединении sqlite3 и возвращает их значения."""
+    applied = {}
+    for name, value in pragmas.items():
+        row = connection.execute(f"PRAGMA {name} = {value}").fetchone()
+        if row is None:
+            row = connection.execute(f"PRAGMA {name}").fetchone()
+        applied[name] = row[0] if row else None
+    return applied
+
+
+def optimize_due(now=None):
+    """Пора ли выполнить PRAGMA optimize в этом процессе."""
+    interval = settings.SQLITE_OPTIMIZE_INTERVAL
+    if interval is None:
+        return False
+    now = time.monotonic() if now is None else now
+    return _optimized_at is None or now - _optimized_at >= interval
+
+
+def optimize(connection):
+    """Обновляет статистику планировщика для таблиц, где она устарела."""
+    global _optimized_at
+    _optimized_at = time.monotonic()
+    connection.execute("PRAGMA optimize")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        apply_pragmas(connection, settings.SQLITE_PRAGMAS)
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        # С BEGIN (DEFERRED) транзакция берёт блокировку на запись только
+        # при первом INSERT/UPDATE и может сразу получить SQLITE_BUSY, не
+        # дожидаясь busy_timeout. IMMEDIATE ждёт блокировку в начале.
+        if settings.SQLITE_IMMEDIATE_TRANSACTIONS:
+            self.cursor().execute("BEGIN IMMEDIATE")
+        else:
+            super()._start_transaction_under_autocommit()
+
+    def _close(self):
+        if self.connection is not None and optimize_due():
+            try:
+                optimize(self.connection)
+            except base.Database.Error:
+                pass
+        super()._close()
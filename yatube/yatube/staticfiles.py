@@ -0,0 +1,147 @@
+"""Статика с хэшем содержимого в имени и заранее сжатыми копиями.
+
+collectstatic с CompressedManifestStorage кладёт в STATIC_ROOT файлы
+вида bootstrap.min.3f1c9a2e.css, манифест staticfiles.json и рядом с
+текстовыми файлами их сжатые копии .gz (и .br, если установлен пакет
+brotli). {% static %} ссылается на имя с хэшем, поэтому serve отдаёт
+такие файлы с «immutable» на год: браузер не перепроверяет их, а после
+изменения файла получает новое имя.
+"""
+import gzip
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage, staticfiles_storage
+)
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.functional import cached_property
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (".css", ".js", ".map", ".svg", ".json", ".txt", ".xml")
+# Файлы меньше этого размера сжатием почти не уменьшаются.
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def _gzip(data):
+    # mtime=0: одинаковые файлы дают одинаковый архив при каждой сборке.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+# (Content-Encoding, суффикс файла, функция сжатия) в порядке
+# предпочтения.
+ENCODINGS = [("gzip", ".gz", _gzip)]
+if brotli is not None:
+    ENCODINGS.insert(0, ("br", ".br", _brotli))
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # collectstatic ещё не запускался (тесты, свежая копия
+            # репозитория): ссылка без хэша.
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            for compressed in self.compress(name):
+                yield name, compressed, True
+
+    def compress(self, name):
+        """Пишет сжатые копии файла; возвращает их имена."""
+        if not name.endswith(COMPRESSIBLE) or not self.exists(name):
+            return []
+        with self.open(name) as source:
+            data = source.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return []
+        written = []
+        for _, suffix, compress in ENCODINGS:
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            written.append(self._save(name + suffix, ContentFile(compressed)))
+        return written
+
+    @cached_property
+    def hashed_names(self):
+        return frozenset(self.hashed_files.values())
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for item in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        coding, _, params = item.partition(";")
+        params = params.strip()
+        try:
+            quality = float(params[2:]) if params.startswith("q=") else 1
+        except ValueError:
+            quality = 1
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def serve(request, path):
+    """Файл из STATIC_ROOT; сжатая копия выбирается по Accept-Encoding."""
+    try:
+        fullpath = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+    content_type = mimetypes.guess_type(fullpath)[0]
+    chosen, encoding = fullpath, None
+    accepted = _accepted_encodings(request)
+    for name, suffix, _ in ENCODINGS:
+        if name in accepted and os.path.isfile(fullpath + suffix):
+            chosen, encoding = fullpath + suffix, name
+            break
+    stat = os.stat(chosen)
+    if not was_modified_since(
+        request.META.get("HTTP_IF_MODIFIED_SINCE"), stat.st_mtime,
+        stat.st_size,
+    ):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(
+            open(chosen, "rb"),
+            content_type=content_type or "application/octet-stream",
+        )
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        if encoding:
+            response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ["Accept-Encoding"])
+    if path in getattr(staticfiles_storage, "hashed_names", ()):
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.STATIC_MAX_AGE
+        )
+    return response
@@ -4,6 +4,9 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from .metrics import metrics_view
+from .staticfiles import serve as serve_static
+
 handler404 = "posts.views.page_not_found"  # noqa
 handler500 = "posts.views.server_error"  # noqa
 
@@ -12,6 +15,12 @@ urlpatterns = [
     path("auth/", include("django.contrib.auth.urls")),
     path("admin/", admin.site.urls),
     path("about/", include("about.urls", namespace="about")),
+    path("metrics/", metrics_view, name="metrics"),
+    path(
+        f"{settings.STATIC_URL.lstrip('/')}<path:path>",
+        serve_static,
+        name="static",
+    ),
     path("", include("posts.urls")),
 ]
 
@@ -20,7 +29,3 @@ if settings.DEBUG:
         settings.MEDIA_URL,
         document_root=settings.MEDIA_ROOT
     )
-    urlpatterns += static(
-        settings.STATIC_URL,
-        document_root=settings.STATIC_ROOT
-    )